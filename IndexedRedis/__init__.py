@@ -8,18 +8,35 @@
 
 import copy
 import codecs
+import os
 import pprint
-import random
 import redis
 import sys
+import threading
+import time
 import uuid
 
 from collections import defaultdict, OrderedDict
 
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
 from . import fields
 from .fields import IRField, IRFieldChain, IRClassicField, IRNullType, irNull, IR_NULL_STR, IRForeignLinkFieldBase
 from .compat_str import to_unicode, tobytes, setDefaultIREncoding, getDefaultIREncoding
 from .utils import hashDictOneLevel, KeyList
+from .compact import PACKED_FIELD_NAME, packValues, unpackValues
+from .coalesce import CoalescingRedis, getCoalescer, clearCoalescers, resetCoalescersAfterFork
+from .connection_pool import IRConnectionPool
+from .expiry import ExpiryReaper
+from .resp import encodeCommand
+from .snapshot import SnapshotWriter, SnapshotReader, InvalidSnapshotException
+from .instrumentation import OperationEvent, OperationStatsAggregator, addOperationObserver, removeOperationObserver, clearOperationObservers, startOperation
+from . import scripts
+from .scripts import PLANNER_SCRIPT, DELETE_SCRIPT, UPDATE_SCRIPT, INCREMENT_SCRIPT, VERSION_CHECK_SCRIPT, RAISE_NEXT_ID_SCRIPT, PACKED_MERGE_SCRIPT
+from .slowlog import SlowQueryEntry, enableSlowQueryLog, disableSlowQueryLog, getSlowQueryLog, clearSlowQueryLog, getSlowQueryThreshold, recordSlowQuery
 
 from .IRQueryableList import IRQueryableList
 
@@ -30,10 +47,14 @@ from .deprecated import deprecated, toggleDeprecatedMessages, deprecatedMessage
 # * imports
 __all__ = ('INDEXED_REDIS_PREFIX', 'INDEXED_REDIS_VERSION', 'INDEXED_REDIS_VERSION_STR', 
 	'IndexedRedisDelete', 'IndexedRedisHelper', 'IndexedRedisModel', 'IndexedRedisQuery', 'IndexedRedisSave',
-	'isIndexedRedisModel', 'setIndexedRedisEncoding', 'getIndexedRedisEncoding', 'InvalidModelException',
+	'isIndexedRedisModel', 'Or', 'setIndexedRedisEncoding', 'getIndexedRedisEncoding', 'InvalidModelException', 'VersionConflictError', 'InvalidSnapshotException',
 	'fields', 'IRField', 'IRFieldChain', 'IRForeignLinkFieldBase', 'irNull',
 	'setDefaultIREncoding', 'getDefaultIREncoding',
 	'setDefaultRedisConnectionParams', 'getDefaultRedisConnectionParams',
+	'getPoolStats', 'resetPoolStats',
+	'OperationEvent', 'OperationStatsAggregator', 'addOperationObserver', 'removeOperationObserver', 'clearOperationObservers',
+	'SlowQueryEntry', 'enableSlowQueryLog', 'disableSlowQueryLog', 'getSlowQueryLog', 'clearSlowQueryLog',
+	'ExpiryReaper',
 	'toggleDeprecatedMessages',
 	 )
 
@@ -54,6 +75,31 @@ __version__ = INDEXED_REDIS_VERSION_STR
 #   In a network-outage scenario, python-redis can quickly leak connections and exhaust all private ports
 REDIS_DEFAULT_POOL_MAX_SIZE = 32
 
+# Prefix of the hidden hash fields which hold the index value (toIndex) of each indexed field on an object,
+#   so the object's index keys can be found on the server (@see IndexedRedis.scripts.DELETE_SCRIPT)
+INDEX_VALUE_FIELD_PREFIX = '_ir_i_'
+
+# Name of the hidden hash field which holds the version of each object of a VERSIONED model (@see IndexedRedisModel.VERSIONED)
+VERSION_FIELD_NAME = '_ir_v'
+
+# Default number of objects deleted per server-side call, when deleting the results of a query (@see IndexedRedisQuery.delete)
+DELETE_BATCH_SIZE = 1000
+
+# Default number of objects updated per server-side call, when updating the results of a query (@see IndexedRedisQuery.update)
+UPDATE_BATCH_SIZE = 1000
+
+# Default number of objects sent per pipeline by IndexedRedisSave.bulkLoad
+BULK_LOAD_BATCH_SIZE = 5000
+
+# Default number of objects fetched and reindexed at a time by IndexedRedisQuery.reindex
+REINDEX_BATCH_SIZE = 1000
+
+# Default number of objects per chunk of a snapshot (@see IndexedRedisQuery.export and IndexedRedisSave.importFrom)
+SNAPSHOT_BATCH_SIZE = 2000
+
+# Max number of random primary keys IndexedRedisQuery.random will try, if the picked objects are deleted before they can be fetched
+RANDOM_FETCH_ATTEMPTS = 5
+
 global _defaultRedisConnectionParams
 _defaultRedisConnectionParams = { 'host' : '127.0.0.1', 'port' : 6379, 'db' : 0 }
 
@@ -63,6 +109,28 @@ RedisPools = {}
 global _redisManagedConnectionParams
 _redisManagedConnectionParams = {}
 
+# Get the plain function of a method (an unbound method on python2)
+_getFunction = lambda method : getattr(method, '__func__', method)
+
+# Cache of (model, connection pool) -> ( fieldName -> code, code -> fieldName ) for models with COMPRESS_FIELD_NAMES.
+#   Entries for a model are dropped by its destroyModel, and all entries by clearRedisPools.
+global _modelFieldCodes
+_modelFieldCodes = {}
+
+# Lock protecting RedisPools and _redisManagedConnectionParams
+_redisPoolsLock = threading.RLock()
+
+# Per-thread cache of redis.Redis connections and helpers (@see _getThreadLocalCache)
+_threadLocalData = threading.local()
+
+# Incremented whenever the pools are cleared, which invalidates every thread's cache
+global _threadLocalGeneration
+_threadLocalGeneration = 0
+
+# The pid of the process which created the pools in RedisPools. Pools inherited through a fork are never reused.
+global _redisPoolsPid
+_redisPoolsPid = os.getpid()
+
 def setDefaultRedisConnectionParams( connectionParams ):
 	'''
 		setDefaultRedisConnectionParams - Sets the default parameters used when connecting to Redis.
@@ -98,12 +166,14 @@ def setDefaultRedisConnectionParams( connectionParams ):
 		     @see clearRedisPools   for more info
 	'''
 	global _defaultRedisConnectionParams
-	_defaultRedisConnectionParams.clear()
 
-	for key, value in connectionParams.items():
-		_defaultRedisConnectionParams[key] = value
+	with _redisPoolsLock:
+		_defaultRedisConnectionParams.clear()
+
+		for key, value in connectionParams.items():
+			_defaultRedisConnectionParams[key] = value
 	
-	clearRedisPools()
+		clearRedisPools()
 
 def getDefaultRedisConnectionParams():
 	'''
@@ -130,21 +200,70 @@ def clearRedisPools():
 	'''
 	global RedisPools
 	global _redisManagedConnectionParams
+	global _modelFieldCodes
+	global _threadLocalGeneration
 
-	for pool in RedisPools.values():
-		try:
-			pool.disconnect()
-		except:
-			pass
-	
-	for paramsList in _redisManagedConnectionParams.values():
-		for params in paramsList:
-			if 'connection_pool' in params:
-				del params['connection_pool']
-	
-	RedisPools.clear()
-	_redisManagedConnectionParams.clear()
+	with _redisPoolsLock:
+		for pool in RedisPools.values():
+			try:
+				pool.disconnect()
+			except:
+				pass
+		
+		for paramsList in _redisManagedConnectionParams.values():
+			for params in paramsList:
+				if 'connection_pool' in params:
+					del params['connection_pool']
 		
+		RedisPools.clear()
+		_redisManagedConnectionParams.clear()
+
+		# Field codes are per-server, so must be reloaded
+		_modelFieldCodes.clear()
+
+		clearCoalescers()
+
+		# Connections cached by each thread reference the old pools
+		_threadLocalGeneration += 1
+		
+
+def _resetRedisPoolsAfterFork():
+	'''
+		_resetRedisPoolsAfterFork - Called in a child process after a fork. Forgets (without disconnecting, as the sockets
+		  are shared with the parent) all the managed pools inherited from the parent process, so that the
+		  child will create its own on next use.
+
+		  This is registered as an "after fork in child" hook where supported (python 3.7+), and is otherwise
+		  called by getRedisPool the first time it is used in a new process.
+
+		  internal
+	'''
+	global RedisPools
+	global _redisManagedConnectionParams
+	global _redisPoolsLock
+	global _threadLocalGeneration
+	global _redisPoolsPid
+
+	# Another thread in the parent may have held the lock at the time of fork, and it will never be released in the child.
+	_redisPoolsLock = threading.RLock()
+
+	with _redisPoolsLock:
+		for paramsList in _redisManagedConnectionParams.values():
+			for params in paramsList:
+				if 'connection_pool' in params:
+					del params['connection_pool']
+
+		RedisPools.clear()
+		_redisManagedConnectionParams.clear()
+
+		resetCoalescersAfterFork()
+
+		_threadLocalGeneration += 1
+		_redisPoolsPid = os.getpid()
+
+if hasattr(os, 'register_at_fork'):
+	os.register_at_fork(after_in_child=_resetRedisPoolsAfterFork)
+
 
 def getRedisPool(params):
 	'''
@@ -162,14 +281,20 @@ def getRedisPool(params):
 			on params, which will allow immediate return on the next call,
 			and allow access to the pool directly from the model object.
 
+			Pools are per-process. If this is called in a process forked from the one which created
+			the pools, new pools will be created for this process.
+
 			@param params <dict> - REDIS_CONNECTION_PARAMS - kwargs to redis.Redis
 
-			@return redis.ConnectionPool corrosponding to this unique server.
+			@return IRConnectionPool (a redis.ConnectionPool) corrosponding to this unique server.
 	'''
 	global RedisPools
 	global _defaultRedisConnectionParams
 	global _redisManagedConnectionParams
 
+	if _redisPoolsPid != os.getpid():
+		_resetRedisPoolsAfterFork()
+
 	if not params:
 		params = _defaultRedisConnectionParams
 		isDefaultParams = True
@@ -179,70 +304,137 @@ def getRedisPool(params):
 	if 'connection_pool' in params:
 		return params['connection_pool']
 
-	hashValue = hashDictOneLevel(params)
+	with _redisPoolsLock:
+		# Check again now that we hold the lock, another thread may have just created the pool
+		if 'connection_pool' in params:
+			return params['connection_pool']
 
-	if hashValue in RedisPools:
-		params['connection_pool'] = RedisPools[hashValue]
-		return RedisPools[hashValue]
-	
-	# Copy the params, so that we don't modify the original dict
-	if not isDefaultParams:
-		origParams = params
-		params = copy.copy(params)
-	else:
-		origParams = params
+		hashValue = hashDictOneLevel(params)
 
-	checkAgain = False
-	if 'host' not in params:
-		if not isDefaultParams and 'host' in _defaultRedisConnectionParams:
-			params['host'] = _defaultRedisConnectionParams['host']
-		else:
-			params['host'] = '127.0.0.1'
-		checkAgain = True
-	if 'port' not in params:
-		if not isDefaultParams and 'port' in _defaultRedisConnectionParams:
-			params['port'] = _defaultRedisConnectionParams['port']
-		else:
-			params['port'] = 6379
-		checkAgain = True
+		if hashValue in RedisPools:
+			params['connection_pool'] = RedisPools[hashValue]
+			_addManagedConnectionParams(params)
+			return RedisPools[hashValue]
 	
-	if 'db' not in params:
-		if not isDefaultParams and 'db' in _defaultRedisConnectionParams:
-			params['db'] = _defaultRedisConnectionParams['db']
+		# Copy the params, so that we don't modify the original dict
+		if not isDefaultParams:
+			origParams = params
+			params = copy.copy(params)
 		else:
-			params['db'] = 0
-		checkAgain = True
+			origParams = params
 
-
-	if not isDefaultParams:
-		otherGlobalKeys = set(_defaultRedisConnectionParams.keys()) - set(params.keys())
-		for otherKey in otherGlobalKeys:
-			if otherKey == 'connection_pool':
-				continue
-			params[otherKey] = _defaultRedisConnectionParams[otherKey]
+		checkAgain = False
+		if 'host' not in params:
+			if not isDefaultParams and 'host' in _defaultRedisConnectionParams:
+				params['host'] = _defaultRedisConnectionParams['host']
+			else:
+				params['host'] = '127.0.0.1'
+			checkAgain = True
+		if 'port' not in params:
+			if not isDefaultParams and 'port' in _defaultRedisConnectionParams:
+				params['port'] = _defaultRedisConnectionParams['port']
+			else:
+				params['port'] = 6379
+			checkAgain = True
+	
+		if 'db' not in params:
+			if not isDefaultParams and 'db' in _defaultRedisConnectionParams:
+				params['db'] = _defaultRedisConnectionParams['db']
+			else:
+				params['db'] = 0
 			checkAgain = True
 
-	if checkAgain:
-		hashValue = hashDictOneLevel(params)
-		if hashValue in RedisPools:
-			params['connection_pool'] = RedisPools[hashValue]
-			return RedisPools[hashValue]
 
-	connectionPool = redis.ConnectionPool(**params)
-	origParams['connection_pool'] = params['connection_pool'] = connectionPool
-	RedisPools[hashValue] = connectionPool
+		if not isDefaultParams:
+			otherGlobalKeys = set(_defaultRedisConnectionParams.keys()) - set(params.keys())
+			for otherKey in otherGlobalKeys:
+				if otherKey == 'connection_pool':
+					continue
+				params[otherKey] = _defaultRedisConnectionParams[otherKey]
+				checkAgain = True
+
+		if checkAgain:
+			hashValue = hashDictOneLevel(params)
+			if hashValue in RedisPools:
+				origParams['connection_pool'] = params['connection_pool'] = RedisPools[hashValue]
+				_addManagedConnectionParams(origParams)
+				return RedisPools[hashValue]
+
+		connectionPool = IRConnectionPool(**params)
+		origParams['connection_pool'] = params['connection_pool'] = connectionPool
+		RedisPools[hashValue] = connectionPool
+
+		_addManagedConnectionParams(origParams)
+
+		return connectionPool
+
+
+def getPoolStats():
+	'''
+		getPoolStats - Get the checkout latency and usage statistics of every managed connection pool
+		   (those created by getRedisPool), which can be used to size pools under load.
+
+		   Pools given by the user via "connection_pool" in REDIS_CONNECTION_PARAMS are not included.
+
+		@return dict< str : dict > - Map of the unique server hash (from hashDictOneLevel) to that pool's stats.
+		   @see IRConnectionPool.getStats for the keys of each stats dict.
+	'''
+	with _redisPoolsLock:
+		pools = list(RedisPools.items())
+
+	return dict( [ (hashValue, pool.getStats()) for hashValue, pool in pools ] )
+
+def resetPoolStats():
+	'''
+		resetPoolStats - Reset the statistics of every managed connection pool. @see getPoolStats
+	'''
+	with _redisPoolsLock:
+		pools = list(RedisPools.values())
+
+	for pool in pools:
+		pool.resetStats()
+
+
+def _addManagedConnectionParams(origParams):
+	'''
+		_addManagedConnectionParams - Add the original params as a "managed" redis connection (they did not provide their own pool)
+		   such that if the defaults change, we make sure to re-inherit any keys, and can disconnect
+		   from clearRedisPools.
+
+		   Must be called holding _redisPoolsLock
+
+		   internal
+
+		@param origParams <dict> - The params dict which has had "connection_pool" set on it
+	'''
+	global _redisManagedConnectionParams
 
-	# Add the original as a "managed" redis connection (they did not provide their own pool)
-	#   such that if the defaults change, we make sure to re-inherit any keys, and can disconnect
-	#   from clearRedisPools
 	origParamsHash = hashDictOneLevel(origParams)
 	if origParamsHash not in _redisManagedConnectionParams:
 		_redisManagedConnectionParams[origParamsHash] = [origParams]
-	elif origParams not in _redisManagedConnectionParams[origParamsHash]:
+	elif not [ params for params in _redisManagedConnectionParams[origParamsHash] if params is origParams ]:
 		_redisManagedConnectionParams[origParamsHash].append(origParams)
 
 
-	return connectionPool
+def _getThreadLocalCache():
+	'''
+		_getThreadLocalCache - Get the calling thread's cache dict, which holds the redis.Redis
+		  connections and model helpers (saver/deleter) that are reused by that thread.
+
+		  The cache is reset if the pools have been cleared since it was created.
+
+		  internal
+
+		@return <dict> - This thread's cache
+	'''
+	global _threadLocalGeneration
+
+	cache = getattr(_threadLocalData, 'cache', None)
+	if cache is None or _threadLocalData.generation != _threadLocalGeneration:
+		cache = _threadLocalData.cache = {}
+		_threadLocalData.generation = _threadLocalGeneration
+
+	return cache
 
 
 
@@ -279,6 +471,18 @@ class InvalidModelException(Exception):
 	'''
 	pass
 
+class VersionConflictError(Exception):
+	'''
+		VersionConflictError - Raised when saving objects of a VERSIONED model which have been changed in Redis
+		  since they were fetched (@see IndexedRedisModel.VERSIONED). Nothing is saved.
+
+		  The primary keys of the objects are in the "pks" attribute.
+	'''
+
+	def __init__(self, msg, pks):
+		Exception.__init__(self, msg)
+		self.pks = pks
+
 class IndexedRedisModel(object):
 	'''
            IndexedRedisModel - This is the model you should extend.
@@ -343,6 +547,73 @@ class IndexedRedisModel(object):
 	'''
 	REDIS_CONNECTION_PARAMS = {}
 
+	'''
+		COMPACT_STORAGE - If True, all fields which are not in INDEXED_FIELDS are packed together into a single
+			binary value within the object's hash, instead of one hash entry per field. Indexed fields remain
+			as separate entries. This reduces memory in Redis and the bytes transferred on fetch, at the cost
+			that updating any non-indexed field rewrites the packed value. The changed values are merged into the
+			stored packed value on the server, so saving a partial object (i.e. one fetched with allOnlyFields /
+			getOnlyFields) keeps the stored values of the packed fields it did not fetch.
+
+			Changing this value on a model with existing data requires a re-save of every object, i.e.
+
+			   Model.reset( Model.objects.all() )   (with the old value), then fetch/reset again with the new value.
+	'''
+	COMPACT_STORAGE = False
+
+	'''
+		COMPRESS_FIELD_NAMES - If True, each field is stored in the object's hash under a short code (like "0", "1", "a")
+			instead of its full name. The codes are assigned once and persisted in Redis (under _ir_|KEY_NAME:schema),
+			so they remain stable as fields are added, removed, or reordered. The python API is unchanged.
+
+			Changing this value on a model with existing data requires a re-save of every object
+			 (@see COMPACT_STORAGE for how).
+	'''
+	COMPRESS_FIELD_NAMES = False
+
+	'''
+		COALESCE_WINDOW - If not None, a number of seconds (like 0.002). Operations issued on this model
+			(through Model.objects, Model.saver, obj.save(), etc) from all threads within this window are gathered
+			and sent to Redis as a single pipeline, and the replies are handed back to each caller.
+
+			Use this for models that are hit by many threads concurrently with single-object operations, to trade
+			  a small amount of latency for throughput that scales with the batch size rather than the round-trip time.
+
+			Each caller's commands are still applied atomically. Default None (disabled).
+	'''
+	COALESCE_WINDOW = None
+
+	'''
+		COALESCE_MAX_COMMANDS - When COALESCE_WINDOW is set, a batch is sent right away (without waiting for the rest of the
+			window) once at least this many commands are pending.
+	'''
+	COALESCE_MAX_COMMANDS = 256
+
+	'''
+		DEFAULT_TTL - If not None, a number of seconds. Every save of an object of this model (re)sets its deadline to
+			that many seconds from now, unless a ttl is passed to save. @see IndexedRedisModel.save
+
+			Once the deadline passes, the object is removed (along with its index entries) by Model.objects.reapExpired,
+			  which should be called periodically (or use an IndexedRedis.ExpiryReaper thread). Until reaped, expired
+			  objects are still returned by queries.
+
+			Default None (objects do not expire, unless saved with a ttl).
+	'''
+	DEFAULT_TTL = None
+
+	'''
+		VERSIONED - If True, each object carries a version number (the "_version" attribute, 0 if never saved), which is bumped
+			on every save that changes it (and by Model.objects.update / increment).
+
+			Saving changes to objects fetched at an older version than is in Redis (because another process saved them
+			  since) raises a VersionConflictError, instead of silently overwriting the other changes. The versions are checked
+			  (all at once, for multiple objects) and the changes written atomically, using WATCH and a Lua script.
+			  Reload (or re-fetch) the object, re-apply the change, and save again to resolve the conflict.
+
+			Foreign objects saved by cascade are not checked. Default False.
+	'''
+	VERSIONED = False
+
 	# Internal property to check inheritance
 	_is_ir_model = True
 
@@ -409,6 +680,8 @@ class IndexedRedisModel(object):
 			_id = int(_id)
 		object.__setattr__(self, '_id', _id)
 
+		object.__setattr__(self, '_version', int(kwargs.get('_version', None) or 0))
+
 
 	def __setattr__(self, keyName, value):
 		'''
@@ -625,20 +898,42 @@ class IndexedRedisModel(object):
 	@classproperty
 	def saver(cls):
 		'''
-			saver - Get an IndexedRedisSave associated with this model
+			saver - Get an IndexedRedisSave associated with this model.
+			  The same object is reused for each access within a thread.
 		'''
-		return IndexedRedisSave(cls)
+		return cls._getThreadLocalHelper(IndexedRedisSave)
 
 	@classproperty
 	def deleter(cls):
 		'''
 			deleter - Get access to IndexedRedisDelete for this model.
+			  The same object is reused for each access within a thread.
 			@see IndexedRedisDelete.
 			Usually you'll probably just do Model.objects.filter(...).delete()
 		'''
-		return IndexedRedisDelete(cls)
+		return cls._getThreadLocalHelper(IndexedRedisDelete)
 
-	def save(self, cascadeSave=True):
+	@classmethod
+	def _getThreadLocalHelper(cls, helperClass):
+		'''
+			_getThreadLocalHelper - Get (and create if needed) the calling thread's instance of a
+			  stateless helper (IndexedRedisSave / IndexedRedisDelete) for this model.
+			internal
+
+			@param helperClass <type> - The helper class
+
+			@return <helperClass> - This thread's helper for this model
+		'''
+		cache = _getThreadLocalCache()
+		cacheKey = (cls, helperClass)
+
+		helper = cache.get(cacheKey, None)
+		if helper is None:
+			helper = cache[cacheKey] = helperClass(cls)
+
+		return helper
+
+	def save(self, cascadeSave=True, ttl=None):
 		'''
 			save - Save this object.
 			
@@ -656,19 +951,20 @@ class IndexedRedisModel(object):
 			@param cascadeSave <bool> Default True - If True, any Foreign models linked as attributes that have been altered
 			   or created will be saved with this object. If False, only this object (and the reference to an already-saved foreign model) will be saved.
 
+			@param ttl <None/float> - If not None, the object expires this many seconds from now (@see DEFAULT_TTL).
+			   If None, the model's DEFAULT_TTL is used, if set. Otherwise, the object does not expire (any deadline from an earlier save is removed).
+
 			@see #IndexedRedisSave.save
 
 			@return <list> - Single element list, id of saved object (if successful)
 		'''
-		saver = IndexedRedisSave(self.__class__)
-		return saver.save(self, cascadeSave=cascadeSave)
+		return self.saver.save(self, cascadeSave=cascadeSave, ttl=ttl)
 	
 	def delete(self):
 		'''
 			delete - Delete this object
 		'''
-		deleter = IndexedRedisDelete(self.__class__)
-		return deleter.deleteOne(self)
+		return self.deleter.deleteOne(self)
 
 	def getPk(self):
 		'''
@@ -698,15 +994,18 @@ class IndexedRedisModel(object):
 		'''
 		conn = cls.objects._get_new_connection()
 
+		saver = IndexedRedisSave(cls)
+
 		transaction = conn.pipeline()
 		transaction.eval("""
 		local matchingKeys = redis.call('KEYS', '%s*')
 
 		for _,key in ipairs(matchingKeys) do
-			redis.call('DEL', key)
+			if key ~= ARGV[1] then
+				redis.call('DEL', key)
+			end
 		end
-		""" %( ''.join([INDEXED_REDIS_PREFIX, cls.KEY_NAME, ':']), ), 0)
-		saver = IndexedRedisSave(cls)
+		""" %( ''.join([INDEXED_REDIS_PREFIX, cls.KEY_NAME, ':']), ), 0, saver._get_schema_key())
 		nextID = 1
 		for newObj in newObjs:
 			saver.save(newObj, False, forceID=nextID, conn=transaction)
@@ -868,6 +1167,8 @@ class IndexedRedisModel(object):
 		    If you need a copy that IS linked, @see IndexedRedisModel.copy
 		'''
 		cpy = self.__class__(**self.asDict(copyPrimaryKey, forStorage=False))
+		if copyPrimaryKey is True:
+			object.__setattr__(cpy, '_version', self._version)
 		if copyValues is True:
 			for fieldName in cpy.FIELDS:
 				setattr(cpy, fieldName, copy.deepcopy(getattr(cpy, fieldName)))
@@ -962,6 +1263,8 @@ class IndexedRedisModel(object):
 		if not newDataObj:
 			raise KeyError('Object with id=%d is not in database. Cannot reload.' %(_id,))
 
+		object.__setattr__(self, '_version', newDataObj._version)
+
 		newData = newDataObj.asDict(False, forStorage=False)
 		if currentData == newData and not self.foreignFields:
 			return []
@@ -1021,6 +1324,7 @@ class IndexedRedisModel(object):
 		'''
 		myData = self.asDict(True, forStorage=False)
 		myData['_origData'] = self._origData
+		myData['_version'] = self._version
 		return myData
 
 	def __setstate__(self, stateDict):
@@ -1113,6 +1417,9 @@ class IndexedRedisModel(object):
 			if thisField == '_id':
 				raise InvalidModelException('%s You cannot have a field named _id, it is reserved for the primary key.' %(failedValidationStr,))
 
+			if str(thisField).startswith('_ir_'):
+				raise InvalidModelException('%s Field names starting with "_ir_" are reserved for IndexedRedis. Got: %s' %(failedValidationStr, str(thisField)))
+
 			# XXX: Is this ascii requirement still needed since all is unicode now?
 			try:
 				codecs.ascii_encode(thisField)
@@ -1153,6 +1460,9 @@ class IndexedRedisModel(object):
 		if bool(indexedFieldSet - fieldSet):
 			raise InvalidModelException('%s All INDEXED_FIELDS must also be present in FIELDS. %s exist only in INDEXED_FIELDS' %(failedValidationStr, str(list(indexedFieldSet - fieldSet)), ) )
 
+		if model.DEFAULT_TTL is not None and not model.DEFAULT_TTL > 0:
+			raise InvalidModelException('%s DEFAULT_TTL must be None or a number of seconds > 0. Got: %s' %(failedValidationStr, repr(model.DEFAULT_TTL)))
+
 		model.foreignFields = foreignFields
 		
 		validatedModels.add(model)
@@ -1216,6 +1526,12 @@ class IndexedRedisHelper(object):
 		self.fields = mdl.FIELDS
 
 		self.indexedFields = [fields[fieldName] for fieldName in mdl.INDEXED_FIELDS]
+
+		# On COMPACT_STORAGE models, all non-indexed fields are packed together (in FIELDS order)
+		if mdl.COMPACT_STORAGE:
+			self.packedFields = [thisField for thisField in fields if thisField not in self.indexedFields]
+		else:
+			self.packedFields = []
 			
 		self._connection = None
 
@@ -1232,15 +1548,273 @@ class IndexedRedisHelper(object):
 		pool = getRedisPool(self.mdl.REDIS_CONNECTION_PARAMS)
 		return redis.Redis(connection_pool=pool)
 
+	def _runInWorkers(self, workers, func):
+		'''
+			_runInWorkers - Run #func on each item given to "put", in #workers threads each with its own connection from the pool.
+			  Items are passed through a bounded queue, so only a few are held at a time. With 1 worker, each item is run in the calling thread.
+			internal
+
+			@param workers <int> - Number of worker threads
+			@param func <callable> - Called as func(conn, *args) for each item
+
+			@return tuple( put<callable>, close<callable> ) - put(*args) runs or queues an item, raising the first error from a worker (if any)
+			  so the caller stops producing. close(raiseErrors=True) stops the workers and waits for them, then raises the first error
+			  from a worker (if any, and #raiseErrors). close must always be called.
+		'''
+		if workers == 1:
+			conn = self._get_connection()
+			return ( lambda *args : func(conn, *args), lambda raiseErrors=True : None )
+
+		errors = []
+		itemQueue = queue.Queue(maxsize=workers * 2)
+
+		def runWorker():
+			workerConn = self._get_new_connection()
+			while True:
+				item = itemQueue.get()
+				if item is None:
+					return
+				if errors:
+					# Keep draining, so the producer is never blocked
+					continue
+				try:
+					func(workerConn, *item)
+				except Exception as e:
+					errors.append(e)
+
+		workerThreads = [ threading.Thread(target=runWorker) for i in range(workers) ]
+		for workerThread in workerThreads:
+			workerThread.daemon = True
+			workerThread.start()
+
+		def put(*args):
+			if errors:
+				raise errors[0]
+			itemQueue.put(args)
+
+		def close(raiseErrors=True):
+			for workerThread in workerThreads:
+				itemQueue.put(None)
+			for workerThread in workerThreads:
+				workerThread.join()
+
+			if errors and raiseErrors:
+				raise errors[0]
+
+		return (put, close)
+
 	def _get_connection(self):
 		'''
-			_get_connection - Maybe get a new connection, or reuse if passed in.
-				Will share a connection with a model
+			_get_connection - Get the connection used by this helper.
+				The connection (redis.Redis object) is shared by all helpers of all models using
+				the same pool within the calling thread.
+				If the model sets COALESCE_WINDOW, this connection will coalesce commands with other threads.
+			internal
+		'''
+		if self._connection is not None:
+			return self._connection
+
+		pool = getRedisPool(self.mdl.REDIS_CONNECTION_PARAMS)
+		if self.mdl.COALESCE_WINDOW is not None:
+			coalescer = getCoalescer(pool, self.mdl.COALESCE_WINDOW, self.mdl.COALESCE_MAX_COMMANDS)
+		else:
+			coalescer = None
+
+		# Reuse this thread's connection to the pool
+		cache = _getThreadLocalCache()
+		cacheKey = (pool, coalescer)
+
+		connection = cache.get(cacheKey, None)
+		if connection is None:
+			if coalescer is not None:
+				connection = CoalescingRedis(coalescer, connection_pool=pool)
+			else:
+				connection = redis.Redis(connection_pool=pool)
+			cache[cacheKey] = connection
+
+		self._connection = connection
+		return connection
+
+	def _getFieldCodes(self):
+		'''
+			_getFieldCodes - Get the field name <-> code tables for a COMPRESS_FIELD_NAMES model,
+			  loading them from Redis (and assigning codes to any new fields) on first use.
+			internal
+
+			@return tuple( dict<str, str>, dict<str, str> ) - ( fieldName -> code , code -> fieldName ) or None if
+			  this model does not use COMPRESS_FIELD_NAMES
+		'''
+		if not self.mdl.COMPRESS_FIELD_NAMES:
+			return None
+
+		global _modelFieldCodes
+		# Codes are per-server, so cached per pool
+		cacheKey = (self.mdl, self._get_connection().connection_pool)
+		fieldCodes = _modelFieldCodes.get(cacheKey, None)
+		if fieldCodes is not None:
+			return fieldCodes
+
+		conn = self._get_new_connection()
+
+		# Assign the next code (base-36 of the number of codes already assigned) to any field without one.
+		#  Codes are never reused or removed, so they are stable across model changes.
+		res = conn.eval("""
+		local schemaKey = KEYS[1]
+		local codeChars = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+		for _,fieldName in ipairs(ARGV) do
+			if redis.call('HEXISTS', schemaKey, fieldName) == 0 then
+				local num = redis.call('HLEN', schemaKey)
+				local code = ''
+				repeat
+					local digit = num % 36
+					code = string.sub(codeChars, digit + 1, digit + 1) .. code
+					num = math.floor(num / 36)
+				until num == 0
+				redis.call('HSET', schemaKey, fieldName, code)
+			end
+		end
+
+		return redis.call('HGETALL', schemaKey)
+		""", 1, self._get_schema_key(), *[str(thisField) for thisField in self.fields])
+
+		nameToCode = {}
+		codeToName = {}
+		i = 0
+		resLen = len(res)
+		while i < resLen:
+			fieldName = to_unicode(res[i])
+			code = to_unicode(res[i+1])
+
+			nameToCode[fieldName] = code
+			codeToName[code] = fieldName
+			i += 2
+
+		fieldCodes = _modelFieldCodes[cacheKey] = (nameToCode, codeToName)
+		return fieldCodes
+
+	def _getHashFieldName(self, fieldName):
+		'''
+			_getHashFieldName - Get the name a field is stored under within the object's hash
+			internal
+
+			@param fieldName <str> - Field name
+
+			@return <str> - The hash field name (a code, on COMPRESS_FIELD_NAMES models)
+		'''
+		fieldCodes = self._getFieldCodes()
+		if fieldCodes is None:
+			return str(fieldName)
+
+		return fieldCodes[0][str(fieldName)]
+
+	def _getHashMapping(self, storageDict):
+		'''
+			_getHashMapping - Convert a dict of field name -> storage value into the
+			  hash field name -> value mapping that is actually stored in Redis.
+
+			  On COMPACT_STORAGE models, this packs all the non-indexed fields into one value.
+			  On COMPRESS_FIELD_NAMES models, the field codes are used as names.
+			internal
+
+			@param storageDict <dict> - Field names to storage-form values (like from asDict(forStorage=True))
+
+			@return <dict> - Hash field name -> value
+		'''
+		packedFields = self.packedFields
+
+		ret = {}
+		for fieldName, value in storageDict.items():
+			if not packedFields or fieldName not in packedFields:
+				ret[self._getHashFieldName(fieldName)] = value
+
+		if packedFields:
+			ret[PACKED_FIELD_NAME] = packValues( [ storageDict[thisField] for thisField in packedFields ] )
+
+		return ret
+
+	def _getHashFieldsForFields(self, fields):
+		'''
+			_getHashFieldsForFields - Get the names of the hash fields which must be fetched to get the given fields.
+			internal
+
+			@param fields list<str> - Field names
+
+			@return list<str> - Hash field names (no duplicates)
+		'''
+		packedFields = self.packedFields
+
+		ret = []
+		hasPacked = False
+		for fieldName in fields:
+			if packedFields and fieldName in packedFields:
+				if hasPacked is False:
+					ret.append(PACKED_FIELD_NAME)
+					hasPacked = True
+			else:
+				ret.append(self._getHashFieldName(fieldName))
+
+		if self.mdl.VERSIONED:
+			ret.append(VERSION_FIELD_NAME)
+
+		return ret
+
+	def _decodeHashDict(self, hashDict):
+		'''
+			_decodeHashDict - Inline on a dict of hash field name -> value as fetched from Redis (with str keys),
+			  replace the packed value (if present) with the individual field values, and any field codes
+			  with the field names.
+			internal
+
+			@param hashDict <dict> - Hash values, modified inline
+
+			@return <dict> - hashDict
+		'''
+		if self.indexedFields:
+			for hashFieldName in [ hashFieldName for hashFieldName in hashDict.keys() if hashFieldName.startswith(INDEX_VALUE_FIELD_PREFIX) ]:
+				del hashDict[hashFieldName]
+
+		fieldCodes = self._getFieldCodes()
+		if fieldCodes is not None:
+			codeToName = fieldCodes[1]
+			for code in list(hashDict.keys()):
+				if code in codeToName:
+					hashDict[codeToName[code]] = hashDict.pop(code)
+
+		packedValue = hashDict.pop(PACKED_FIELD_NAME, None)
+		if packedValue is None:
+			return hashDict
+
+		for thisField, value in zip(self.packedFields, unpackValues(packedValue)):
+			hashDict[str(thisField)] = value
+
+		return hashDict
+
+	def _hsetMultiple(self, key, mapping, conn):
+		'''
+			_hsetMultiple - Set several fields in a hash with a single command.
+			internal
+
+			@param key <str> - Hash key
+			@param mapping <dict> - Hash field name -> value
+			@param conn - Connection or pipeline to use
+		'''
+		if not mapping:
+			return
+
+		args = []
+		for fieldName, value in mapping.items():
+			args.append(fieldName)
+			args.append(value)
+
+		conn.execute_command('HMSET', key, *args)
+
+	def _get_schema_key(self):
+		'''
+			_get_schema_key - Gets the key holding the field code table (for COMPRESS_FIELD_NAMES models)
 			internal
 		'''
-		if self._connection is None:
-			self._connection = self._get_new_connection() 
-		return self._connection
+		return ''.join([INDEXED_REDIS_PREFIX, self.keyName, ':schema'])
 
 	def _get_ids_key(self):
 		'''
@@ -1249,6 +1823,13 @@ class IndexedRedisHelper(object):
 		'''
 		return ''.join([INDEXED_REDIS_PREFIX, self.keyName + ':keys'])
 
+	def _get_expires_key(self):
+		'''
+			_get_expires_key - Gets the key holding the deadline (as the score) of each expiring primary key (@see DEFAULT_TTL)
+			internal
+		'''
+		return ''.join([INDEXED_REDIS_PREFIX, self.keyName, ':expires'])
+
 	def _add_id_to_keys(self, pk, conn=None):
 		'''
 			_add_id_to_keys - Adds primary key to table
@@ -1269,12 +1850,17 @@ class IndexedRedisHelper(object):
 
 	def _add_id_to_index(self, indexedField, pk, val, conn=None):
 		'''
-			_add_id_to_index - Adds an id to an index
+			_add_id_to_index - Adds an id to an index, and records the index value on the object if needed
+			  (@see _recordsIndexValue)
 			internal
 		'''
 		if conn is None:
 			conn = self._get_connection()
-		conn.sadd(self._get_key_for_index(indexedField, val), pk)
+
+		indexValue = self._getIndexValue(indexedField, val)
+		conn.sadd(self._get_key_for_index_value(indexedField, indexValue), pk)
+		if self._recordsIndexValue(indexedField):
+			conn.hset(self._get_key_for_id(pk), self._getIndexValueFieldName(indexedField), indexValue)
 
 	def _rem_id_from_index(self, indexedField, pk, val, conn=None):
 		'''
@@ -1295,34 +1881,111 @@ class IndexedRedisHelper(object):
 
 			@return - Key name string, potentially hashed.
 		'''
-		# If provided an IRField, use the toIndex from that (to support compat_ methods
-		if hasattr(indexedField, 'toIndex'):
-			val = indexedField.toIndex(val)
-		else:
-		# Otherwise, look up the indexed field from the model
-			val = self.fields[indexedField].toIndex(val)
-
+		return self._get_key_for_index_value(indexedField, self._getIndexValue(indexedField, val))
 
-		return ''.join( [INDEXED_REDIS_PREFIX, self.keyName, ':idx:', indexedField, ':', val] )
-
-	def _compat_get_str_key_for_index(self, indexedField, val):
+	def _get_key_for_index_value(self, indexedField, indexValue):
 		'''
-			_compat_get_str_key_for_index - Return the key name as a string, even if it is a hashed index field.
-			  This is used in converting unhashed fields to a hashed index (called by _compat_rem_str_id_from_index which is called by compat_convertHashedIndexes)
+			_get_key_for_index_value - Returns the key name of an index, given the value already prepped for index
+			Internal
 
-			  @param inde
 			@param indexedField - string of field name
-			@param val - Value of field
+			@param indexValue <str> - Value returned by the field's toIndex
 
-			@return - Key name string, always a string regardless of hash
+			@return - Key name string
 		'''
-		return ''.join([INDEXED_REDIS_PREFIX, self.keyName, ':idx:', indexedField, ':', getattr(indexedField, 'toStorage', to_unicode)(val)])
+		return ''.join( [INDEXED_REDIS_PREFIX, self.keyName, ':idx:', indexedField, ':', indexValue] )
 
-	@deprecated('_compat_rem_str_id_from_index is deprecated.')
-	def _compat_rem_str_id_from_index(self, indexedField, pk, val, conn=None):
+	def _getIndexValue(self, indexedField, val):
 		'''
-			_compat_rem_str_id_from_index - Used in compat_convertHashedIndexes to remove the old string repr of a field,
-				in order to later add the hashed value,
+			_getIndexValue - Get a value prepped for index (potentially hashed)
+			Internal
+
+			@param indexedField - string of field name, or IRField
+			@param val - Value of field
+
+			@return <str> - The index value
+		'''
+		# If provided an IRField, use the toIndex from that (to support compat_ methods
+		if hasattr(indexedField, 'toIndex'):
+			return indexedField.toIndex(val)
+
+		# Otherwise, look up the indexed field from the model
+		return self.fields[indexedField].toIndex(val)
+
+	def _getIndexValueFieldName(self, indexedField):
+		'''
+			_getIndexValueFieldName - Get the name of the hidden hash field holding the index value of an indexed field.
+
+			  Each object records the index value (toIndex, so hashed for hashIndex fields) of each of its indexed fields
+			    whose index value can differ from the stored value (@see _recordsIndexValue),
+			    so its index keys can be found on the server without decoding the object (@see IndexedRedisDelete.deleteMultipleByPks)
+			Internal
+
+			@param indexedField - string of field name
+
+			@return <str> - The hash field name
+		'''
+		return INDEX_VALUE_FIELD_PREFIX + self._getHashFieldName(indexedField)
+
+	def _recordsIndexValue(self, indexedField):
+		'''
+			_recordsIndexValue - Check if objects record the index value of an indexed field in a hidden hash field (@see _getIndexValueFieldName).
+
+			  Only hashIndex fields, and field types with their own toIndex / toStorage, have index values which can differ from the stored value.
+			    For all other fields, the stored value is the index value, so it is not copied.
+			Internal
+
+			@param indexedField - string of field name, or IRField
+
+			@return <bool>
+		'''
+		if not hasattr(indexedField, 'toIndex'):
+			indexedField = self.fields[indexedField]
+
+		if indexedField.isIndexHashed:
+			return True
+
+		fieldClass = indexedField.__class__
+		for methodName in ('toIndex', '_toIndex', 'toStorage'):
+			if _getFunction(getattr(fieldClass, methodName)) is not _getFunction(getattr(IRField, methodName)):
+				return True
+
+		return False
+
+	def _getIndexValueSourceFieldName(self, indexedField):
+		'''
+			_getIndexValueSourceFieldName - Get the name of the hash field holding the index value of an indexed field on each object:
+			  the recorded index value if there is one (@see _recordsIndexValue), otherwise the field's stored value.
+			  Used by the Lua scripts, to find an object's index keys on the server.
+			Internal
+
+			@param indexedField - string of field name, or IRField
+
+			@return <str> - The hash field name
+		'''
+		if self._recordsIndexValue(indexedField):
+			return self._getIndexValueFieldName(indexedField)
+
+		return self._getHashFieldName(indexedField)
+
+	def _compat_get_str_key_for_index(self, indexedField, val):
+		'''
+			_compat_get_str_key_for_index - Return the key name as a string, even if it is a hashed index field.
+			  This is used in converting unhashed fields to a hashed index (called by _compat_rem_str_id_from_index which is called by compat_convertHashedIndexes)
+
+			  @param inde
+			@param indexedField - string of field name
+			@param val - Value of field
+
+			@return - Key name string, always a string regardless of hash
+		'''
+		return ''.join([INDEXED_REDIS_PREFIX, self.keyName, ':idx:', indexedField, ':', getattr(indexedField, 'toStorage', to_unicode)(val)])
+
+	@deprecated('_compat_rem_str_id_from_index is deprecated.')
+	def _compat_rem_str_id_from_index(self, indexedField, pk, val, conn=None):
+		'''
+			_compat_rem_str_id_from_index - Used in compat_convertHashedIndexes to remove the old string repr of a field,
+				in order to later add the hashed value,
 		'''
 		if conn is None:
 			conn = self._get_connection()
@@ -1379,6 +2042,37 @@ class IndexedRedisHelper(object):
 		'''
 		return self._get_ids_key() + '__' + uuid.uuid4().__str__()
 
+class Or(object):
+	'''
+		Or - A filter matching objects where ANY of its conditions are true. Pass to IndexedRedisQuery.filter / filterInline,
+		  where it is ANDed together with the other filters.
+
+		  Each condition is an indexed field name and a value (equals), or an indexed field name suffixed with "__in" and a list of values (equals any).
+		  Negative (__ne) conditions are not supported within an Or.
+
+		  Example:
+			objs = Model.objects.filter(Or(status='open', priority__in=['high', 'critical']), owner='tim').all()
+	'''
+
+	def __init__(self, **kwargs):
+		'''
+			__init__ - Create an Or filter
+
+			@param kwargs - Conditions, field=value or field__in=[value1, value2]
+		'''
+		if not kwargs:
+			raise ValueError('Or requires at least one condition.')
+
+		for key in kwargs.keys():
+			if key.endswith('__ne'):
+				raise ValueError('Negative (__ne) filters are not supported within Or. Got: ' + key)
+
+		self.conditions = kwargs
+
+	def __repr__(self):
+		return 'Or(%s)' %(', '.join( [ '%s=%s' %(key, repr(value)) for key, value in self.conditions.items() ] ), )
+
+
 class IndexedRedisQuery(IndexedRedisHelper):
 	'''
 		IndexedRedisQuery - The query object. This is the return of "Model.objects" and "Model.objects.filter*"
@@ -1389,11 +2083,27 @@ class IndexedRedisQuery(IndexedRedisHelper):
 
 		self.filters = [] # Filters are ordered for optimization
 		self.notFilters = []
+		self.orFilters = [] # Each is a list of (key, value) , any of which may match
+
+		# Paging, @see limit, offset, afterPk
+		self.limitNum = None
+		self.offsetNum = 0
+		self.afterPkValue = None
+
+		# Ordering, @see orderBy
+		self.orderByField = None
+		self.orderByDesc = False
 
 	def __copy__(self):
 		ret = self.__class__(self.mdl)
 		ret.filters = self.filters[:]
 		ret.notFilters = self.notFilters[:]
+		ret.orFilters = self.orFilters[:]
+		ret.limitNum = self.limitNum
+		ret.offsetNum = self.offsetNum
+		ret.afterPkValue = self.afterPkValue
+		ret.orderByField = self.orderByField
+		ret.orderByDesc = self.orderByDesc
 
 		return ret
 	
@@ -1405,46 +2115,243 @@ class IndexedRedisQuery(IndexedRedisHelper):
 			theDict['_id'] = int(theDict['_id'])
 
 		decodedDict = decodeDict(theDict)
+		version = decodedDict.pop(VERSION_FIELD_NAME, None)
+
+		decodedDict = self._decodeHashDict(decodedDict)
 		decodedDict['__fromRedis'] = True
+		decodedDict['_version'] = version
 
 		obj = self.mdl(**decodedDict)
 
 		return obj
 	
 
-	def filter(self, **kwargs):
+	def filter(self, *orFilters, **kwargs):
 		'''
 			filter - Add filters based on INDEXED_FIELDS having or not having a value.
 			  Note, no objects are actually fetched until .all() is called
 
 				Use the field name [ model.objects.filter(some_field='value')] to filter on items containing that value.
 				Use the field name suffxed with '__ne' for a negation filter [ model.objects.filter(some_field__ne='value') ]
+				Use the field name suffixed with '__in' and a list of values to filter on items containing any of those values
+				  [ model.objects.filter(some_field__in=['value1', 'value2']) ]
+				Pass "Or" objects to filter on items matching any of several conditions
+				  [ model.objects.filter(Or(some_field='value', other_field='value2')) ]
 
 			Example:
 				query = Model.objects.filter(field1='value', field2='othervalue')
 
 				objs1 = query.filter(something__ne='value').all()
 				objs2 = query.filter(something__ne=7).all()
+				objs3 = query.filter(Or(something='value', otherThing__in=[1, 2])).all()
 
 
 			@returns - A copy of this object, with the additional filters. If you want to work inline on this object instead, use the filterInline method.
 		'''
 		selfCopy = self.__copy__()
-		return IndexedRedisQuery._filter(selfCopy, **kwargs)
+		return IndexedRedisQuery._filter(selfCopy, *orFilters, **kwargs)
 
-	def filterInline(self, **kwargs):
+	def filterInline(self, *orFilters, **kwargs):
 		'''
 			filterInline - @see IndexedRedisQuery.filter. This is the same as filter, but works inline on this object instead of creating a copy.
 				Use this is you do not need to retain the previous filter object.
 		'''
-		return IndexedRedisQuery._filter(self, **kwargs)
+		return IndexedRedisQuery._filter(self, *orFilters, **kwargs)
+
+	def limit(self, num):
+		'''
+			limit - Only return at most #num results (the oldest first, i.e. ordered by primary key).
+			  Combine with #offset or #afterPk to page through results. Like filter, this returns a copy.
+
+			  The page is selected on the Redis server, so only the objects on the page are fetched.
+			  This affects getPrimaryKeys and the fetch methods (all, allOnlyFields, first, etc), but not count.
+
+			Example:
+				page3 = Model.objects.filter(field1='value').limit(20).offset(40).all()
+
+			@param num <int> - Max number of results
+
+			@return - A copy of this query, with the limit applied
+		'''
+		num = int(num)
+		if num < 0:
+			raise ValueError('limit must be >= 0. Got: %d' %(num, ))
+
+		ret = self.__copy__()
+		ret.limitNum = num
+		return ret
+
+	def offset(self, num):
+		'''
+			offset - Skip the first #num results (ordered by primary key). @see limit
+
+			@param num <int> - Number of results to skip
+
+			@return - A copy of this query, with the offset applied
+		'''
+		num = int(num)
+		if num < 0:
+			raise ValueError('offset must be >= 0. Got: %d' %(num, ))
+
+		ret = self.__copy__()
+		ret.offsetNum = num
+		return ret
+
+	def afterPk(self, pk):
+		'''
+			afterPk - Only return results with a primary key greater than #pk (keyset / cursor paging). @see limit
+
+			  The matching primary keys are scanned on the server, keeping only the #limit smallest after the cursor,
+			  so no page sorts the full results (as a large #offset would), and the pages do not shift
+			  when objects before the cursor are added or removed.
+
+			Example:
+				page = Model.objects.filter(field1='value').limit(20).all()
+				while page:
+					...
+					page = Model.objects.filter(field1='value').afterPk(page[-1]._id).limit(20).all()
+
+			@param pk <int/None> - Primary key of the last result on the previous page, or None to start from the beginning
+
+			@return - A copy of this query, with the cursor applied
+		'''
+		if pk is not None and self.orderByField is not None:
+			raise ValueError('afterPk cannot be used with orderBy. Use offset to page ordered results.')
+
+		ret = self.__copy__()
+		if pk is None:
+			ret.afterPkValue = None
+		else:
+			ret.afterPkValue = int(pk)
+		return ret
+
+	def orderBy(self, fieldName, desc=False):
+		'''
+			orderBy - Order the results by the value of a field (instead of by primary key). Like filter, this returns a copy.
+
+			  The results are sorted on the Redis server (SORT ... BY), so combined with #limit, only the top results are
+			    ever fetched. Numeric fields (int and float valueType, IRFixedPointField) are compared as numbers, with null values first
+			    (when ascending). All other fields are compared as strings of their stored values.
+
+			  This affects getPrimaryKeys and the fetch methods (all, allOnlyFields, first, last, etc), but not count.
+			    first and last will return the first and last objects in this order.
+
+			Example:
+				top10 = Model.objects.filter(field1='value').orderBy('score', desc=True).limit(10).all()
+
+			@param fieldName <str> - Name of the field to order by, or "_id" for primary key.
+			  The field may not be packed into COMPACT_STORAGE.
+
+			@param desc <bool> default False - If True, order descending (highest first)
+
+			@return - A copy of this query, with the order applied
+		'''
+		if self.afterPkValue is not None:
+			raise ValueError('orderBy cannot be used with afterPk. Use offset to page ordered results.')
+
+		fieldName = str(fieldName)
+		if fieldName != '_id':
+			if fieldName not in self.fields:
+				raise ValueError('Cannot order by "%s", it is not a field of %s.' %(fieldName, self.mdl.__name__))
+			if fieldName in self.packedFields:
+				raise ValueError('Cannot order by "%s", it is packed with COMPACT_STORAGE. Only indexed fields are stored individually on COMPACT_STORAGE models.' %(fieldName, ))
+
+		ret = self.__copy__()
+		ret.orderByField = fieldName
+		ret.orderByDesc = bool(desc)
+		return ret
+
+	def _isPaged(self):
+		'''
+			_isPaged - Check if limit, offset, afterPk or orderBy is set on this query,
+			  in which case, the page is selected (and ordered) on the server.
+			internal
+
+			@return <bool>
+		'''
+		return bool( self.limitNum is not None or self.offsetNum or self.afterPkValue is not None or self.orderByField is not None )
+
+	def _getSortArgs(self):
+		'''
+			_getSortArgs - Get the sort arguments to the planner script for the current order
+			internal
+
+			@return tuple( sortField<str>, sortType<str>, sortDesc<str> ) - @see IndexedRedis.scripts.PLANNER_SCRIPT
+		'''
+		if self.orderByField is None or self.orderByField == '_id':
+			return ( '', 'NUM', '1' if self.orderByDesc else '0' )
+
+		thisField = self.fields[self.orderByField]
+
+		valueType = getattr(thisField, 'valueType', None)
+		if isinstance(thisField, fields.IRFixedPointField) or valueType in (int, float):
+			sortType = 'NUM'
+		else:
+			sortType = 'ALPHA'
+
+		return ( self._getHashFieldName(self.orderByField), sortType, '1' if self.orderByDesc else '0' )
+
+	@staticmethod
+	def _getInFilterValues(key, value):
+		'''
+			_getInFilterValues - Validate the value of an __in filter, and return it as a list
+			internal
+
+			@param key <str> - Field name
+			@param value - Value given for the __in filter
+
+			@return list - The values
+		'''
+		if not isinstance(value, (list, tuple, set, frozenset)):
+			raise ValueError('Filter "' + key + '__in" requires a list of values. Got: ' + repr(value))
+
+		return list(value)
+
+	def _addOrFilter(self, orFilter):
+		'''
+			_addOrFilter - Add a filter which matches any of a list of (key, value)
+			internal
+
+			@param orFilter list< tuple(key, value) > - The conditions
+		'''
+		if len(orFilter) == 1:
+			self.filters.append( orFilter[0] )
+		else:
+			self.orFilters.append( orFilter )
 
 	@staticmethod
-	def _filter(filterObj, **kwargs):
+	def _filter(filterObj, *orFilters, **kwargs):
 		'''
 			Internal for handling filters; the guts of .filter and .filterInline
 		'''
+		for orFilter in orFilters:
+			if not isinstance(orFilter, Or):
+				raise ValueError('Positional arguments to filter must be "Or" objects. Got: ' + repr(orFilter))
+
+			conditions = []
+			for key, value in orFilter.conditions.items():
+				if key.endswith('__in'):
+					key = key[:-4]
+					values = IndexedRedisQuery._getInFilterValues(key, value)
+				else:
+					values = [value]
+
+				if key not in filterObj.indexedFields:
+					raise ValueError('Field "' + key + '" is not in INDEXED_FIELDS array. Filtering is only supported on indexed fields.')
+
+				conditions += [ (key, thisValue) for thisValue in values ]
+
+			filterObj._addOrFilter(conditions)
+
 		for key, value in kwargs.items():
+			if key.endswith('__in'):
+				key = key[:-4]
+				if key not in filterObj.indexedFields:
+					raise ValueError('Field "' + key + '" is not in INDEXED_FIELDS array. Filtering is only supported on indexed fields.')
+
+				filterObj._addOrFilter( [ (key, thisValue) for thisValue in IndexedRedisQuery._getInFilterValues(key, value) ] )
+				continue
+
 			if key.endswith('__ne'):
 				notFilter = True
 				key = key[:-4]
@@ -1466,44 +2373,161 @@ class IndexedRedisQuery(IndexedRedisHelper):
 		'''
 			count - gets the number of records matching the filter criteria
 
+			  Any limit, offset, or afterPk is ignored, so this is the total number of matches across all pages.
+
 			Example:
 				theCount = Model.objects.filter(field1='value').count()
 		'''
+		timer = startOperation()
+		if timer is not None:
+			timer.redisStart()
+
+		slowThreshold = getSlowQueryThreshold()
+		if slowThreshold is not None:
+			slowStartTime = time.time()
+
+		ret = self._count()
+
+		if slowThreshold is not None:
+			self._checkSlowQuery('count', slowThreshold, slowStartTime, ret)
+
+		if timer is not None:
+			timer.redisEnd(1, ret)
+			timer.finish(self.mdl, 'count', ret, len(self.filters) + len(self.orFilters), len(self.notFilters))
+
+		return ret
+
+	def _count(self):
+		'''
+			_count - The guts of #count
+			internal
+		'''
 		conn = self._get_connection()
-		
+
+		if not all(self.orFilters):
+			# An empty __in matches nothing
+			return 0
+
 		numFilters = len(self.filters)
 		numNotFilters = len(self.notFilters)
-		if numFilters + numNotFilters == 0:
+		if numFilters + numNotFilters + len(self.orFilters) == 0:
 			return conn.scard(self._get_ids_key())
 
-		if numNotFilters == 0:
-			if numFilters == 1:
-				(filterFieldName, filterValue) = self.filters[0]
-				return conn.scard(self._get_key_for_index(filterFieldName, filterValue))
-			indexKeys = [self._get_key_for_index(filterFieldName, filterValue) for filterFieldName, filterValue in self.filters]
+		if numFilters == 1 and numNotFilters == 0 and not self.orFilters:
+			(filterFieldName, filterValue) = self.filters[0]
+			return conn.scard(self._get_key_for_index(filterFieldName, filterValue))
 
-			return len(conn.sinter(indexKeys))
+		# Count on the server, so the matching primary keys are never transferred
+		return self._runPlanner(conn, 'count')
 
-		notIndexKeys = [self._get_key_for_index(filterFieldName, filterValue) for filterFieldName, filterValue in self.notFilters]
-		if numFilters == 0:
-			return len(conn.sdiff(self._get_ids_key(), *notIndexKeys))
+	def _runPlanner(self, conn, mode='keys', getFields=None, sampleSize=None, storeKey=None):
+		'''
+			_runPlanner - Find the primary keys matching the current filters server-side, with the planner script.
+			  The cardinality of each index is checked first, and the query short-circuits if any positive index is empty.
+			  Otherwise, the indexes are used smallest-first. @see IndexedRedis.scripts.PLANNER_SCRIPT
+			internal
+
+			@param conn <redis.Redis> - Connection
+
+			@param mode <str> default 'keys' - 'keys' for all matching primary keys, 'count' for the number of matching primary keys,
+			  'exists' for 1 if any primary key matches (otherwise 0), 'sample' for #sampleSize random matching primary keys,
+			  'store' to store the matching primary keys in #storeKey (returning the number stored),
+			  or 'page' for just the page selected by limit/offset/afterPk, in the order given by orderBy (default primary key).
+
+			@param getFields <None/list<str>> - In 'page' mode, a list of hash field names to fetch for each matched object.
+
+			@param sampleSize <None/int> - In 'sample' mode, the max number of distinct primary keys to return
+
+			@param storeKey <None/str> - In 'store' mode, the key to store the matching primary keys in
 
+			@return list<bytes> - Matching primary keys. If getFields is provided, each primary key is followed by the value of each field.
+			  In 'count', 'exists' and 'store' modes, an <int> instead.
+		'''
 		indexKeys = [self._get_key_for_index(filterFieldName, filterValue) for filterFieldName, filterValue in self.filters]
-		
-		tempKey = self._getTempKey()
+		notIndexKeys = [self._get_key_for_index(filterFieldName, filterValue) for filterFieldName, filterValue in self.notFilters]
+
+		keys = [ self._get_ids_key(), storeKey or self._getTempKey() ] + indexKeys + notIndexKeys
+		if mode == 'sample':
+			limit = sampleSize
+		elif self.limitNum is not None:
+			limit = self.limitNum
+		else:
+			limit = -1
+
+		args = [ len(indexKeys), scripts.PLANNER_PROBE_MAX_CARDINALITY, len(notIndexKeys), mode, self.offsetNum, limit, self.afterPkValue if self.afterPkValue is not None else '' ]
+
+		args.append( self._get_key_for_id('') )
+		args += list(self._getSortArgs())
+
+		getFields = getFields or []
+		args.append( len(getFields) )
+		args += getFields
+
+		# Each "or" filter is given a temp key to union into (if needed), followed by its index keys
+		for orFilter in self.orFilters:
+			keys.append( self._getTempKey() )
+			keys += [ self._get_key_for_index(filterFieldName, filterValue) for filterFieldName, filterValue in orFilter ]
+			args.append( len(orFilter) )
+
+		return PLANNER_SCRIPT(conn, keys, args)
+
+	def _checkSlowQuery(self, operation, threshold, startTime, numMatched):
+		'''
+			_checkSlowQuery - Called after a query when the slow query log is enabled. If the query took at least #threshold seconds,
+			  fetch the cardinality of each index involved, and add it to the slow query log.
+			internal
+
+			@param operation <str> - The query operation
+			@param threshold <float> - Slow query threshold, in seconds
+			@param startTime <float> - time.time() when the query started
+			@param numMatched <int> - Number of results
+		'''
+		elapsed = time.time() - startTime
+		if elapsed < threshold:
+			return
+
+		conn = self._get_connection()
 		pipeline = conn.pipeline()
-		pipeline.sinterstore(tempKey, *indexKeys)
-		pipeline.sdiff(tempKey, *notIndexKeys)
-		pipeline.delete(tempKey)
-		pks = pipeline.execute()[1] # sdiff
 
-		return len(pks)
+		for filterFieldName, filterValue in self.filters:
+			pipeline.scard(self._get_key_for_index(filterFieldName, filterValue))
+		for filterFieldName, filterValue in self.notFilters:
+			pipeline.scard(self._get_key_for_index(filterFieldName, filterValue))
+		for orFilter in self.orFilters:
+			for filterFieldName, filterValue in orFilter:
+				pipeline.scard(self._get_key_for_index(filterFieldName, filterValue))
+
+		# Without positive filters, the query runs against all objects
+		hasPositiveFilters = bool(self.filters or self.orFilters)
+		if not hasPositiveFilters:
+			pipeline.scard(self._get_ids_key())
+
+		cardinalities = pipeline.execute()
+
+		numFilters = len(self.filters)
+		numNotFilters = len(self.notFilters)
+
+		filters = [ (str(self.filters[i][0]), self.filters[i][1], cardinalities[i]) for i in range(numFilters) ]
+		notFilters = [ (str(self.notFilters[i][0]), self.notFilters[i][1], cardinalities[numFilters + i]) for i in range(numNotFilters) ]
+
+		orFilters = []
+		i = numFilters + numNotFilters
+		for orFilter in self.orFilters:
+			orFilters.append( [ (str(filterFieldName), filterValue, cardinalities[i + j]) for j, (filterFieldName, filterValue) in enumerate(orFilter) ] )
+			i += len(orFilter)
+
+		if not hasPositiveFilters:
+			totalCardinality = cardinalities[-1]
+		else:
+			totalCardinality = None
+
+		recordSlowQuery( SlowQueryEntry(self.mdl, operation, filters, notFilters, totalCardinality, numMatched, elapsed, orFilters) )
 
-	def exists(self, pk):
+	def exists(self, pk=None):
 		'''
 			exists - Tests whether a record holding the given primary key exists.
 
-			@param pk - Primary key (see getPk method)
+			@param pk - Primary key (see getPk method). If None, instead test whether any record matches the current filters (@see any)
 
 			Example usage: Waiting for an object to be deleted without fetching the object or running a filter. 
 
@@ -1511,11 +2535,47 @@ class IndexedRedisQuery(IndexedRedisHelper):
 
 			@return <bool> - True if object with given pk exists, otherwise False
 		'''
+		if pk is None:
+			return self.any()
+
 		conn = self._get_connection()
 		key = self._get_key_for_id(pk)
 		return conn.exists(key)
 			
 
+	def any(self):
+		'''
+			any - Tests whether any record matches the current filters, without fetching any primary keys.
+
+			  With multiple (or negative) filters, the smallest index is scanned on the Redis server in batches, probing
+			    the other indexes, and the check stops at the first match. So this is cheap even when the indexes are huge
+			    (unlike count, which must find every match).
+
+			  Any limit, offset, afterPk or orderBy is ignored.
+
+			Example:
+				if not Model.objects.filter(status='pending', owner='bob').any():
+					...
+
+			@return <bool> - True if at least one record matches
+		'''
+		if not all(self.orFilters):
+			# An empty __in matches nothing
+			return False
+
+		conn = self._get_connection()
+
+		numFilters = len(self.filters)
+		numNotFilters = len(self.notFilters)
+		if numFilters + numNotFilters + len(self.orFilters) == 0:
+			return bool( conn.exists(self._get_ids_key()) )
+
+		if numFilters == 1 and numNotFilters == 0 and not self.orFilters:
+			(filterFieldName, filterValue) = self.filters[0]
+			return bool( conn.exists(self._get_key_for_index(filterFieldName, filterValue)) )
+
+		return bool( self._runPlanner(conn, 'exists') )
+
 	def getPrimaryKeys(self, sortByAge=False):
 		'''
 			getPrimaryKeys - Returns all primary keys matching current filterset.
@@ -1523,56 +2583,61 @@ class IndexedRedisQuery(IndexedRedisHelper):
 			@param sortByAge <bool> - If False, return will be a set and may not be ordered.
 				If True, return will be a list and is guarenteed to represent objects oldest->newest
 
+			  If limit, offset, or afterPk have been applied, only the primary keys on that page are returned,
+			    and are always ordered oldest->newest (or in the order given by orderBy, if applied).
+
 			@return <set> - A set of all primary keys associated with current filters.
 		'''
+		timer = startOperation()
+		if timer is not None:
+			timer.redisStart()
+
+		slowThreshold = getSlowQueryThreshold()
+		if slowThreshold is not None:
+			slowStartTime = time.time()
+
 		conn = self._get_connection()
 		# Apply filters, and return object
 		numFilters = len(self.filters)
 		numNotFilters = len(self.notFilters)
+		numOrFilters = len(self.orFilters)
+
+		if not all(self.orFilters):
+			# An empty __in matches nothing
+			matchedKeys = []
 
-		if numFilters + numNotFilters == 0:
+		elif self._isPaged():
+			# Select the page on the server, already sorted
+			matchedKeys = self._runPlanner(conn, 'page')
+
+		elif numFilters + numNotFilters + numOrFilters == 0:
 			# No filters, get all.
-			conn = self._get_connection()
 			matchedKeys = conn.smembers(self._get_ids_key())
 
-		elif numNotFilters == 0:
-			# Only Inclusive
-			if numFilters == 1:
-				# Only one filter, get members of that index key
-				(filterFieldName, filterValue) = self.filters[0]
-				matchedKeys = conn.smembers(self._get_key_for_index(filterFieldName, filterValue))
-			else:
-				# Several filters, intersect the index keys
-				indexKeys = [self._get_key_for_index(filterFieldName, filterValue) for filterFieldName, filterValue in self.filters]
-				matchedKeys = conn.sinter(indexKeys)
+		elif numFilters == 1 and numNotFilters + numOrFilters == 0:
+			# Only one filter, get members of that index key
+			(filterFieldName, filterValue) = self.filters[0]
+			matchedKeys = conn.smembers(self._get_key_for_index(filterFieldName, filterValue))
 
 		else:
-			# Some negative filters present
-			notIndexKeys = [self._get_key_for_index(filterFieldName, filterValue) for filterFieldName, filterValue in self.notFilters]
-			if numFilters == 0:
-				# Only negative, diff against all keys
-				matchedKeys = conn.sdiff(self._get_ids_key(), *notIndexKeys)
-			else:
-				# Negative and positive. Use pipeline, find all positive intersections, and remove negative matches
-				indexKeys = [self._get_key_for_index(filterFieldName, filterValue) for filterFieldName, filterValue in self.filters]
-				
-				tempKey = self._getTempKey()
-				pipeline = conn.pipeline()
-				pipeline.sinterstore(tempKey, *indexKeys)
-				pipeline.sdiff(tempKey, *notIndexKeys)
-				pipeline.delete(tempKey)
-				matchedKeys = pipeline.execute()[1] # sdiff
+			# Several filters, and/or negative filters. Let the planner order them by size and pick the cheapest strategy
+			matchedKeys = self._runPlanner(conn)
 
+		if timer is not None:
+			timer.redisEnd(1, matchedKeys)
 
 		matchedKeys = [ int(_key) for _key in matchedKeys ]
 
-		if sortByAge is False:
-			return list(matchedKeys)
-		else:
-			matchedKeys = list(matchedKeys)
+		if sortByAge is True and self.orderByField is None:
 			matchedKeys.sort()
 
-			return matchedKeys
+		if slowThreshold is not None:
+			self._checkSlowQuery('getPrimaryKeys', slowThreshold, slowStartTime, len(matchedKeys))
+
+		if timer is not None:
+			timer.finish(self.mdl, 'getPrimaryKeys', len(matchedKeys), numFilters + numOrFilters, numNotFilters)
+
+		return matchedKeys
 
 
 	def all(self, cascadeFetch=False):
@@ -1619,14 +2684,55 @@ class IndexedRedisQuery(IndexedRedisHelper):
 			   will be fetched immediately. If False, foreign objects will be fetched on-access.
 
 
+			  If limit, offset, afterPk, or orderBy have been applied, the fields are fetched on the server
+			    along with the page of primary keys, in a single round trip.
+
 			@return - Partial objects with only the given fields fetched
 		'''
+		if self._isPaged() and all(self.orFilters):
+			return self._getPageOnlyFields(fields, cascadeFetch=cascadeFetch)
+
 		matchedKeys = self.getPrimaryKeys()
 		if matchedKeys:
 			return self.getMultipleOnlyFields(matchedKeys, fields, cascadeFetch=cascadeFetch)
 
 		return IRQueryableList([], mdl=self.mdl)
 
+	def _getPageOnlyFields(self, fields, cascadeFetch=False):
+		'''
+			_getPageOnlyFields - Get the page selected by limit/offset/afterPk/orderBy, only fetching given fields,
+			  using the planner script to fetch the fields (SORT ... GET) alongside the primary keys.
+			internal
+
+			@param fields - List of fields to fetch
+
+			@param cascadeFetch <bool> Default False, @see allOnlyFields
+
+			@return IRQueryableList - Partial objects, in order
+		'''
+		hashFields = self._getHashFieldsForFields(fields)
+		numFields = len(hashFields)
+
+		conn = self._get_connection()
+		res = self._runPlanner(conn, 'page', getFields=hashFields)
+
+		ret = IRQueryableList(mdl=self.mdl)
+		for i in range(0, len(res), numFields + 1):
+			thisRes = res[i + 1 : i + 1 + numFields]
+			# Object was deleted between matching and fetching
+			if not [ value for value in thisRes if value is not None ]:
+				continue
+
+			objDict = dict( zip(hashFields, thisRes) )
+			objDict['_id'] = int(res[i])
+			ret.append( self._redisResultToObj(objDict) )
+
+		if cascadeFetch is True:
+			for obj in ret:
+				self._doCascadeFetch(obj)
+
+		return ret
+
 	def allOnlyIndexedFields(self):
 		'''
 			allOnlyIndexedFields - Get the objects which match the filter criteria, only fetching indexed fields.
@@ -1684,7 +2790,7 @@ class IndexedRedisQuery(IndexedRedisHelper):
 
 	def random(self, cascadeFetch=False):
 		'''
-			Random - Returns a random record in current filterset.
+			Random - Returns a random record in current filterset. The record is picked on the Redis server (SRANDMEMBER).
 
 
 			@param cascadeFetch <bool> Default False, If True, all Foreign objects associated with this model
@@ -1692,24 +2798,303 @@ class IndexedRedisQuery(IndexedRedisHelper):
 
 			@return - Instance of Model object, or None if no items math current filters
 		'''
-		matchedKeys = list(self.getPrimaryKeys())
 		obj = None
 		# Loop so we don't return None when there are items, if item is deleted between getting key and getting obj
-		while matchedKeys and not obj:
-			key = matchedKeys.pop(random.randint(0, len(matchedKeys)-1))
-			obj = self.get(key, cascadeFetch=cascadeFetch)
+		for attempt in range(RANDOM_FETCH_ATTEMPTS):
+			matchedKeys = self._getRandomPrimaryKeys(1)
+			if not matchedKeys:
+				break
+
+			obj = self.get(matchedKeys[0], cascadeFetch=cascadeFetch)
+			if obj is not None:
+				break
 
 		return obj
-		
+
+	def sample(self, num, cascadeFetch=False):
+		'''
+			sample - Returns up to #num distinct random records in current filterset.
+
+			  The records are picked on the Redis server (SRANDMEMBER), so only #num primary keys are
+			    transferred, regardless of how many records match. Any limit, offset, afterPk or orderBy is ignored.
+
+			@param num <int> - Number of records. If fewer records match, all of them are returned.
+
+			@param cascadeFetch <bool> Default False, If True, all Foreign objects associated with this model
+			   will be fetched immediately. If False, foreign objects will be fetched on-access.
+
+			@return IRQueryableList - The random records, in no particular order
+		'''
+		if num < 0:
+			raise ValueError('sample num must be >= 0. Got: %s' %(repr(num), ))
+
+		matchedKeys = self._getRandomPrimaryKeys(num)
+		if not matchedKeys:
+			return IRQueryableList([], mdl=self.mdl)
+
+		objs = self.getMultiple(matchedKeys, cascadeFetch=cascadeFetch)
+
+		# Skip any deleted between getting keys and getting objs
+		return IRQueryableList( [ obj for obj in objs if obj is not None ], mdl=self.mdl )
+
+	def _getRandomPrimaryKeys(self, num):
+		'''
+			_getRandomPrimaryKeys - Get up to #num distinct random primary keys matching the current filters,
+			  picked on the server with SRANDMEMBER (@see IndexedRedis.scripts.PLANNER_SCRIPT "sample" mode)
+			internal
+
+			@param num <int> - Max number of primary keys
+
+			@return list<int> - Primary keys
+		'''
+		if num == 0 or not all(self.orFilters):
+			return []
+
+		conn = self._get_connection()
+
+		numFilters = len(self.filters)
+		numNotFilters = len(self.notFilters)
+		if numFilters + numNotFilters + len(self.orFilters) == 0:
+			matchedKeys = conn.srandmember(self._get_ids_key(), num)
+		elif numFilters == 1 and numNotFilters == 0 and not self.orFilters:
+			(filterFieldName, filterValue) = self.filters[0]
+			matchedKeys = conn.srandmember(self._get_key_for_index(filterFieldName, filterValue), num)
+		else:
+			matchedKeys = self._runPlanner(conn, 'sample', sampleSize=num)
+
+		return [ int(_key) for _key in matchedKeys ]
+
 	
-	def delete(self):
+	def reapExpired(self, batchSize=DELETE_BATCH_SIZE):
+		'''
+			reapExpired - Delete all objects of this model whose deadline (@see IndexedRedisModel.DEFAULT_TTL and save's ttl) has passed,
+			  removing their index entries too. This runs on the Redis server, in atomic batches of #batchSize.
+
+			  Call this periodically, or run an IndexedRedis.ExpiryReaper thread which does. Any filters on this query are ignored.
+
+			@param batchSize <int> default DELETE_BATCH_SIZE (1000) - Max number of objects to delete in each call to Redis
+
+			@return <int> - Number of objects deleted
+		'''
+		if batchSize < 1:
+			raise ValueError('reapExpired batchSize must be >= 1. Got: %s' %(repr(batchSize), ))
+
+		return self.mdl.deleter._deleteExpired(batchSize)
+
+	def delete(self, batchSize=DELETE_BATCH_SIZE, progressCallback=None):
 		'''
 			delete - Deletes all entries matching the filter criteria
 
+			  The delete is done entirely on the Redis server: The matching primary keys are stored in a temporary set,
+			    and then deleted (along with their index entries) in batches of #batchSize, by a Lua script.
+			    No objects or primary keys are transferred, and each batch is atomic, so Redis is never blocked for long.
+
+			  If limit, offset, afterPk or orderBy have been applied, only the objects on that page are deleted.
+
+			  With no filters, the whole model is destroyed (@see IndexedRedisDelete.destroyModel)
+
+			@param batchSize <int> default DELETE_BATCH_SIZE (1000) - Max number of objects to delete in each call to Redis
+
+			@param progressCallback <None/callable> - If provided, called after each batch as progressCallback(numDeleted, numMatched),
+			   where numDeleted is the total deleted so far, and numMatched is the number of objects which matched the filters.
+
+			@return <int> - Number of objects deleted (with no filters, the number of keys deleted)
+		'''
+		if not ( self.filters or self.notFilters or self.orFilters or self._isPaged() ):
+			return self.mdl.deleter.destroyModel()
+
+		if batchSize < 1:
+			raise ValueError('delete batchSize must be >= 1. Got: %s' %(repr(batchSize), ))
+
+		if not all(self.orFilters):
+			# An empty __in matches nothing
+			return 0
+
+		if self._isPaged():
+			return self.mdl.deleter.deleteMultipleByPks(self.getPrimaryKeys())
+
+		conn = self._get_connection()
+		tempKey = self._getTempKey()
+		try:
+			numMatched = self._runPlanner(conn, 'store', storeKey=tempKey)
+			if numMatched == 0:
+				return 0
+
+			return self.mdl.deleter._deleteStoredPks(tempKey, numMatched, batchSize, progressCallback)
+		finally:
+			# Only left over if a batch failed
+			conn.delete(tempKey)
+
+	def update(self, _pk=None, **fields):
+		'''
+			update - Set the given fields on the object with primary key #_pk, or (if _pk is None) on every object matching the filter criteria,
+			  without fetching the objects.
+
+			  The values are converted through each field's toStorage, and written on the Redis server by a Lua script
+			    (@see IndexedRedis.scripts.UPDATE_SCRIPT), which also moves each object between the index sets of any updated indexed fields,
+			    using the index values recorded on the object. Each call to Redis is atomic: a single object is updated all at once,
+			    and query results are updated in batches of UPDATE_BATCH_SIZE (1000).
+
+			  Objects already fetched are not changed. Fields which are packed together on a COMPACT_STORAGE model cannot be updated this way.
+
+			  Example:
+				Model.objects.update(pk, status='done')
+				Model.objects.filter(status='pending', owner='bob').update(status='cancelled')
+
+			@param _pk <None/int> - Primary key of the object to update (normally given positionally), or None to update the objects matching the filters.
+			  If limit, offset, afterPk or orderBy have been applied, only the objects on that page are updated.
+
+			@param fields - Field name = new value. Any field can be updated, including one named "pk".
+
+			@return <int> - Number of objects updated
+		'''
+		saver = self.mdl.saver
+		# Validate the fields before querying anything
+		saver._getUpdateArgs(fields)
+
+		if _pk is not None:
+			return saver.updateMultipleByPks([_pk], fields)
+
+		if not all(self.orFilters):
+			# An empty __in matches nothing
+			return 0
+
+		if self._isPaged():
+			return saver.updateMultipleByPks(self.getPrimaryKeys(), fields)
+
+		conn = self._get_connection()
+		tempKey = self._getTempKey()
+		try:
+			numMatched = self._runPlanner(conn, 'store', storeKey=tempKey)
+			if numMatched == 0:
+				return 0
+
+			return saver._updateStoredPks(tempKey, numMatched, fields)
+		finally:
+			# Only left over if a batch failed
+			conn.delete(tempKey)
+
+	def increment(self, pk, fieldName, delta=1):
+		'''
+			increment - Atomically add #delta to a numeric field of the object with primary key #pk, in a single call to Redis, without fetching it.
+
+			  @see IndexedRedisSave.increment
+
+			Example:
+				newViews = Article.objects.increment(pk, 'views')
+
+			@param pk <int> - Primary key of the object
+			@param fieldName <str> - Name of an IRField(valueType=int) or IRFixedPointField
+			@param delta <int/float> default 1 - Amount to add (may be negative)
+
+			@return - The new value of the field, or None if there is no object with primary key #pk
+		'''
+		return self.mdl.saver.increment(pk, fieldName, delta)
+
+	def _iterMatchingPkBatches(self, batchSize):
 		'''
-		if self.filters or self.notFilters:
-			return self.mdl.deleter.deleteMultiple(self.allOnlyIndexedFields())
-		return self.mdl.deleter.destroyModel()
+			_iterMatchingPkBatches - Iterate over the primary keys matching the filter criteria, #batchSize at a time.
+
+			  The matching primary keys are stored in a temporary set on the server, and taken (SPOP) a batch at a time,
+			    so they are never all held in memory. If the query is paged, just the primary keys of the page are used.
+			internal
+
+			@param batchSize <int> - Max number of primary keys per batch
+
+			@return generator< tuple(numMatched<int>, list<int>) > - The total number of matching primary keys, and each batch (sorted)
+		'''
+		if not all(self.orFilters):
+			# An empty __in matches nothing
+			return
+
+		if self._isPaged():
+			pks = self.getPrimaryKeys()
+			for i in range(0, len(pks), batchSize):
+				yield (len(pks), pks[i : i + batchSize])
+			return
+
+		conn = self._get_connection()
+		tempKey = self._getTempKey()
+		try:
+			numMatched = numRemaining = self._runPlanner(conn, 'store', storeKey=tempKey)
+			while numRemaining > 0:
+				pks = sorted( [ int(pk) for pk in conn.spop(tempKey, batchSize) ] )
+				if not pks:
+					break
+				numRemaining -= len(pks)
+
+				yield (numMatched, pks)
+		finally:
+			conn.delete(tempKey)
+
+	def export(self, stream, batchSize=SNAPSHOT_BATCH_SIZE):
+		'''
+			export - Write every object matching the filter criteria to a snapshot file, which can be loaded (into this or another
+			  Redis) with IndexedRedisSave.importFrom.
+
+			  A snapshot holds the primary key and the storage-form value (as returned by toStorage) of each field of each object,
+			    in zlib-compressed chunks of #batchSize objects. @see IndexedRedis.snapshot for the format.
+
+			  The matching primary keys are stored in a temporary set on the server, and taken #batchSize at a time, with each
+			    chunk fetched in a single pipeline, so memory stays constant however many objects are exported.
+			    Objects are not converted from storage, and foreign objects are not exported.
+
+			  If limit, offset, afterPk or orderBy have been applied, only the objects on that page are exported.
+
+			Example:
+				MyModel.objects.filter(status='done').export('done.irsnap')
+
+			@param stream <str/file> - A file path to write, or any object with a "write" method taking bytes (a file opened "wb", etc)
+
+			@param batchSize <int> default SNAPSHOT_BATCH_SIZE (2000) - Number of objects per chunk
+
+			@return <int> - Number of objects exported
+		'''
+		if batchSize < 1:
+			raise ValueError('export batchSize must be >= 1. Got: %s' %(repr(batchSize), ))
+
+		if isinstance(stream, (str, type(u''))):
+			with open(stream, 'wb') as f:
+				return self.export(f, batchSize)
+
+		timer = startOperation()
+
+		fieldNames = [ str(thisField) for thisField in self.fields ]
+		defaults = [ thisField.toStorage(thisField.getDefaultValue()) for thisField in self.fields ]
+
+		writer = SnapshotWriter(stream, self.keyName, fieldNames)
+
+		def writeChunk(pks):
+			pipeline = self._get_connection().pipeline(transaction=False)
+			for pk in pks:
+				pipeline.hgetall(self._get_key_for_id(pk))
+			results = pipeline.execute()
+
+			records = []
+			for pk, res in zip(pks, results):
+				if not res:
+					# Deleted after matching
+					continue
+
+				hashDict = decodeDict(res)
+				hashDict.pop(VERSION_FIELD_NAME, None)
+				hashDict = self._decodeHashDict(hashDict)
+
+				records.append( (pk, [ hashDict.get(fieldName, default) for fieldName, default in zip(fieldNames, defaults) ]) )
+
+			writer.writeRecords(records)
+			return len(records)
+
+		numExported = 0
+		for (numMatched, pks) in self._iterMatchingPkBatches(batchSize):
+			numExported += writeChunk(pks)
+
+		writer.close()
+
+		if timer is not None:
+			timer.finish(self.mdl, 'export', numExported)
+
+		return numExported
 
 	def get(self, pk, cascadeFetch=False):
 		'''
@@ -1721,16 +3106,32 @@ class IndexedRedisQuery(IndexedRedisHelper):
 
 			@param pk - internal primary key (can be found via .getPk() on an item)
 		'''
+		timer = startOperation()
+
 		conn = self._get_connection()
 		key = self._get_key_for_id(pk)
+
+		if timer is not None:
+			timer.redisStart()
+
 		res = conn.hgetall(key)
+
+		if timer is not None:
+			timer.redisEnd(1, res)
+
 		if type(res) != dict or not len(res.keys()):
+			if timer is not None:
+				timer.finish(self.mdl, 'get', 0)
 			return None
 		res['_id'] = pk
 
 		ret = self._redisResultToObj(res)
 		if cascadeFetch is True:
 			self._doCascadeFetch(ret)
+
+		if timer is not None:
+			timer.finish(self.mdl, 'get', 1)
+
 		return ret
 
 	
@@ -1778,13 +3179,21 @@ class IndexedRedisQuery(IndexedRedisHelper):
 			# Optimization to not pipeline on 1 id
 			return IRQueryableList([self.get(pks[0], cascadeFetch=cascadeFetch)], mdl=self.mdl)
 
+		timer = startOperation()
+
 		conn = self._get_connection()
 		pipeline = conn.pipeline()
 		for pk in pks:
 			key = self._get_key_for_id(pk)
 			pipeline.hgetall(key)
 
+		if timer is not None:
+			timer.redisStart()
+
 		res = pipeline.execute()
+
+		if timer is not None:
+			timer.redisEnd(len(pks), res)
 		
 		ret = IRQueryableList(mdl=self.mdl)
 		i = 0
@@ -1804,6 +3213,9 @@ class IndexedRedisQuery(IndexedRedisHelper):
 				if not obj:
 					continue
 				self._doCascadeFetch(obj)
+
+		if timer is not None:
+			timer.finish(self.mdl, 'getMultiple', len( [ obj for obj in ret if obj is not None ] ))
 			
 		return ret
 
@@ -1824,17 +3236,20 @@ class IndexedRedisQuery(IndexedRedisHelper):
 		conn = self._get_connection()
 		key = self._get_key_for_id(pk)
 
-		res = conn.hmget(key, fields)
+		hashFields = self._getHashFieldsForFields(fields)
+
+		res = conn.hmget(key, hashFields)
 		if type(res) != list or not len(res):
 			return None
 
 		objDict = {}
-		numFields = len(fields)
+		numFields = len(hashFields)
 		i = 0
 		anyNotNone = False
 		while i < numFields:
-			objDict[fields[i]] = res[i]
 			if res[i] != None:
+				# Fields missing from the hash keep their default value
+				objDict[hashFields[i]] = res[i]
 				anyNotNone = True
 			i += 1
 
@@ -1868,18 +3283,28 @@ class IndexedRedisQuery(IndexedRedisHelper):
 		if len(pks) == 1:
 			return IRQueryableList([self.getOnlyFields(pks[0], fields, cascadeFetch=cascadeFetch)], mdl=self.mdl)
 
+		timer = startOperation()
+
 		conn = self._get_connection()
 		pipeline = conn.pipeline()
 
+		hashFields = self._getHashFieldsForFields(fields)
+
 		for pk in pks:
 			key = self._get_key_for_id(pk)
-			pipeline.hmget(key, fields)
+			pipeline.hmget(key, hashFields)
+
+		if timer is not None:
+			timer.redisStart()
 
 		res = pipeline.execute()
+
+		if timer is not None:
+			timer.redisEnd(len(pks), res)
 		ret = IRQueryableList(mdl=self.mdl)
 		pksLen = len(pks)
 		i = 0
-		numFields = len(fields)
+		numFields = len(hashFields)
 		while i < pksLen:
 			objDict = {}
 			anyNotNone = False
@@ -1891,8 +3316,9 @@ class IndexedRedisQuery(IndexedRedisHelper):
 
 			j = 0
 			while j < numFields:
-				objDict[fields[j]] = thisRes[j]
 				if thisRes[j] != None:
+					# Fields missing from the hash keep their default value
+					objDict[hashFields[j]] = thisRes[j]
 					anyNotNone = True
 				j += 1
 
@@ -1909,6 +3335,9 @@ class IndexedRedisQuery(IndexedRedisHelper):
 		if cascadeFetch is True:
 			for obj in ret:
 				self._doCascadeFetch(obj)
+
+		if timer is not None:
+			timer.finish(self.mdl, 'getMultipleOnlyFields', len( [ obj for obj in ret if obj is not None ] ))
 			
 		return ret
 
@@ -1933,20 +3362,93 @@ class IndexedRedisQuery(IndexedRedisHelper):
 		return self.getMultipleOnlyFields(pks, self.indexedFields)
 
 
-	def reindex(self):
+	def reindex(self, fieldNames=None, batchSize=REINDEX_BATCH_SIZE, workers=1, progressCallback=None):
 		'''
 			reindex - Reindexes the objects matching current filterset. Use this if you add/remove a field to INDEXED_FIELDS.
 
+			  Objects are streamed in batches of #batchSize: the matching primary keys are taken from a temporary set on the server,
+			    only the fields being reindexed are fetched (getMultipleOnlyFields), and each batch is written in a single pipeline,
+			    with one SADD per index value. So memory stays constant however many objects are reindexed.
+
 			  NOTE - This will NOT remove entries from the old index if you change index type, or change decimalPlaces on a
 			    IRFixedPointField.  To correct these indexes, you'll need to run:
 
 			       Model.reset(Model.objects.all())
 
 			If you change the value of "hashIndex" on a field, you need to call #compat_convertHashedIndexes instead.
+
+			Example:
+				MyModel.objects.reindex('newlyIndexedField', workers=4)
+
+			@param fieldNames <None/str/list<str>> default None - The name of an indexed field, or a list of them, to rebuild just those indexes.
+			   If None, every index is rebuilt.
+
+			@param batchSize <int> default REINDEX_BATCH_SIZE (1000) - Number of objects fetched and reindexed at a time
+
+			@param workers <int> default 1 - Number of batches to run in parallel, each on its own connection from the pool.
+			   With 1, everything is done in the calling thread.
+
+			@param progressCallback <None/callable> - If provided, called after each batch as progressCallback(numReindexed, numMatched),
+			   where numReindexed is the total reindexed so far, and numMatched is the number of objects which matched the filters.
+			   With multiple workers, this is called from the worker threads.
+
+			@return <int> - Number of objects reindexed
+
+			@raises ValueError - If a field in #fieldNames is not an indexed field
 		'''
-		objs = self.all()
+		if batchSize < 1:
+			raise ValueError('reindex batchSize must be >= 1. Got: %s' %(repr(batchSize), ))
+		if workers < 1:
+			raise ValueError('reindex workers must be >= 1. Got: %s' %(repr(workers), ))
+
+		if fieldNames is None:
+			fieldNames = [ str(indexedField) for indexedField in self.indexedFields ]
+		else:
+			if isinstance(fieldNames, (str, type(u''))):
+				fieldNames = [ fieldNames ]
+
+			for fieldName in fieldNames:
+				if fieldName not in self.indexedFields:
+					raise ValueError('Cannot reindex field "%s" of %s, it is not in INDEXED_FIELDS.' %(fieldName, self.mdl.__name__))
+
+		if not fieldNames:
+			return 0
+
 		saver = IndexedRedisSave(self.mdl)
-		saver.reindex(objs)
+
+		progress = { 'numReindexed' : 0 }
+		progressLock = threading.Lock()
+
+		def reindexBatch(batchConn, numMatched, pks):
+			objs = self.getMultipleOnlyFields(pks, fieldNames)
+
+			# Objects with none of the fields set (like a field added to the model after they were saved) are fetched in full,
+			#   so they can be told apart from deleted objects, and indexed on the default value
+			missingPks = [ pk for pk, obj in zip(pks, objs) if obj is None ]
+			objs = [ obj for obj in objs if obj is not None ]
+			if missingPks:
+				objs += [ obj for obj in self.getMultiple(missingPks) if obj is not None ]
+
+			saver.reindex(objs, batchConn, fieldNames)
+
+			with progressLock:
+				progress['numReindexed'] += len(objs)
+				numReindexed = progress['numReindexed']
+
+			if progressCallback is not None:
+				progressCallback(numReindexed, numMatched)
+
+		(putBatch, closeWorkers) = self._runInWorkers(workers, reindexBatch)
+		try:
+			for (numMatched, pks) in self._iterMatchingPkBatches(batchSize):
+				putBatch(numMatched, pks)
+		except:
+			closeWorkers(raiseErrors=False)
+			raise
+
+		closeWorkers()
+
+		return progress['numReindexed']
 
 	def compat_convertHashedIndexes(self, fetchAll=True):
 		'''
@@ -1997,7 +3499,7 @@ class IndexedRedisSave(IndexedRedisHelper):
 			Except for advanced usage, this is probably for internal only.
 	'''
 
-	def save(self, obj, usePipeline=True, forceID=False, cascadeSave=True, conn=None):
+	def save(self, obj, usePipeline=True, forceID=False, cascadeSave=True, conn=None, ttl=None):
 		'''
 			save - Save an object / objects associated with this model. 
 			
@@ -2016,10 +3518,24 @@ class IndexedRedisSave(IndexedRedisHelper):
 
 			@param conn - A connection or None
 
+			@param ttl <None/float> - If not None, the objects expire this many seconds from now. If None, the model's DEFAULT_TTL is used, if set.
+			   Otherwise, the objects do not expire (any deadline from an earlier save is removed).
+			   @see IndexedRedisModel.DEFAULT_TTL
+
 			@note - if no ID is specified
 
 			@return - List of pks
+
+			@raises VersionConflictError - On a VERSIONED model, if any of the objects were changed in Redis since fetched. Nothing is saved.
+			  Only checked when usePipeline is True and forceID is False.
 		'''
+		if ttl is None:
+			ttl = self.mdl.DEFAULT_TTL
+		if ttl is not None and not ttl > 0:
+			raise ValueError('ttl must be a number of seconds > 0. Got: %s' %(repr(ttl), ))
+
+		timer = startOperation()
+
 		if conn is None:
 			conn = self._get_connection()
 
@@ -2035,8 +3551,21 @@ class IndexedRedisSave(IndexedRedisHelper):
 			objs = [obj]
 
 
+		# Objects being changed, and the version each was fetched at
+		versionChecks = []
+		if self.mdl.VERSIONED is True and usePipeline is True and forceID is False:
+			versionChecks = [ (thisObj, thisObj._version) for thisObj in objs if getattr(thisObj, '_id', None) and thisObj.getUpdatedFields() ]
+
 		if usePipeline is True:
+			if versionChecks and isinstance(conn, CoalescingRedis):
+				# WATCH needs a connection of its own, not one shared through a coalesced batch
+				conn = self._get_new_connection()
+
 			pipeline = conn.pipeline()
+
+			if versionChecks:
+				# Raises VersionConflictError, before anything is changed
+				self._checkVersions(pipeline, versionChecks)
 		else:
 			pipeline = conn
 
@@ -2120,6 +3649,9 @@ class IndexedRedisSave(IndexedRedisHelper):
 				isInserts.append(isInsert)
 				
 
+		if versionChecks:
+			savedStates = [ (thisObj, dict(thisObj._origData), thisObj._version) for (thisObj, version) in versionChecks ]
+
 		ids = [] # Note ids can be derived with all information above..
 		i = 0
 		while i < objsLen:
@@ -2127,11 +3659,377 @@ class IndexedRedisSave(IndexedRedisHelper):
 			ids.append(objs[i]._id)
 			i += 1
 
+		if ids:
+			if ttl is not None:
+				deadline = time.time() + ttl
+				pipeline.zadd(self._get_expires_key(), dict( [ (pk, deadline) for pk in ids ] ))
+			else:
+				# Saved as non-expiring, so drop any deadline from an earlier save with a ttl
+				pipeline.zrem(self._get_expires_key(), *ids)
+
 		if usePipeline is True:
-			pipeline.execute()
+			if timer is not None:
+				numCommands = len(pipeline)
+				timer.redisStart()
+
+			if versionChecks:
+				try:
+					res = pipeline.execute()
+				except redis.WatchError:
+					# Changed between the check and the write. Nothing was written, so undo the changes _doSave made on the objects.
+					for (thisObj, origData, version) in savedStates:
+						object.__setattr__(thisObj, '_origData', origData)
+						object.__setattr__(thisObj, '_version', version)
+
+					pks = [ thisObj._id for (thisObj, version) in versionChecks ]
+					raise VersionConflictError('Version conflict saving %s objects %s: changed in Redis while saving.' %(self.mdl.__name__, repr(pks)), pks)
+			else:
+				res = pipeline.execute()
+
+			if timer is not None:
+				timer.redisEnd(numCommands, res)
+
+		if timer is not None:
+			timer.finish(self.mdl, 'save', objsLen)
 
 		return ids
 
+	def _checkVersions(self, pipeline, versionChecks):
+		'''
+			_checkVersions - WATCH the given objects, and check (with a single script) that they are still at the version they were fetched at.
+			  On success, the pipeline is left in MULTI, so the save is only applied if none of them change before it is executed.
+			internal
+
+			@param pipeline <redis.client.Pipeline> - A transaction pipeline, with nothing queued
+
+			@param versionChecks list< tuple(obj, version) > - The objects, and their expected versions
+
+			@raises VersionConflictError - If any object is not at its expected version (the pipeline is reset)
+		'''
+		keys = [ self._get_key_for_id(thisObj._id) for (thisObj, version) in versionChecks ]
+
+		pipeline.watch(*keys)
+
+		conflicts = VERSION_CHECK_SCRIPT(pipeline, keys, [ VERSION_FIELD_NAME ] + [ version for (thisObj, version) in versionChecks ])
+		if conflicts:
+			pipeline.reset()
+
+			pks = [ versionChecks[int(idx) - 1][0]._id for idx in conflicts ]
+			raise VersionConflictError('Version conflict saving %s objects %s: changed since fetched.' %(self.mdl.__name__, repr(pks)), pks)
+
+		pipeline.multi()
+
+	def bulkLoad(self, objs, batchSize=BULK_LOAD_BATCH_SIZE, workers=1, progressCallback=None):
+		'''
+			bulkLoad - Insert a large number of new objects, streamed from any iterable (like a generator), in pipelines of #batchSize objects.
+
+			  Unlike saveMultiple, only one batch per worker is held in memory at a time (plus a few queued), so memory stays
+			    constant however many objects are loaded. The primary keys of each batch are reserved with a single INCRBY,
+			    each object is written with a single HMSET, and the ids set and each index set get one SADD per batch.
+
+			  Batches are not atomic (objects become visible as each batch completes), and foreign objects are not cascade-saved.
+
+			Example:
+				def readRows():
+					for row in csvReader:
+						yield MyModel(name=row[0], value=row[1])
+
+				MyModel.saver.bulkLoad(readRows(), workers=4)
+
+			@param objs <iterable<IndexedRedisModel>> - New objects to insert. Each is assigned its primary key (_id) as its batch is sent.
+
+			@param batchSize <int> default BULK_LOAD_BATCH_SIZE (5000) - Number of objects per pipeline
+
+			@param workers <int> default 1 - Number of pipelines to run in parallel, each on its own connection from the pool.
+			   With 1, everything is done in the calling thread.
+
+			@param progressCallback <None/callable> - If provided, called after each batch completes as progressCallback(numLoaded, objsPerSecond),
+			   where numLoaded is the total number of objects loaded so far. With multiple workers, this is called from the worker threads.
+
+			@return <int> - Number of objects loaded
+
+			@raises ValueError - If an object has already been saved (has a primary key). Earlier batches remain loaded.
+		'''
+		if batchSize < 1:
+			raise ValueError('bulkLoad batchSize must be >= 1. Got: %s' %(repr(batchSize), ))
+		if workers < 1:
+			raise ValueError('bulkLoad workers must be >= 1. Got: %s' %(repr(workers), ))
+
+		timer = startOperation()
+
+		conn = self._get_connection()
+		nextIdKey = self._get_next_id_key()
+
+		startTime = time.time()
+		progress = { 'numLoaded' : 0 }
+		progressLock = threading.Lock()
+
+		def loadBatch(batchConn, batch):
+			pipeline = batchConn.pipeline(transaction=False)
+			for command in self._getInsertCommands(batch):
+				pipeline.execute_command(*command)
+			pipeline.execute()
+
+			with progressLock:
+				progress['numLoaded'] += len(batch)
+				numLoaded = progress['numLoaded']
+
+			if progressCallback is not None:
+				elapsed = time.time() - startTime
+				progressCallback(numLoaded, (numLoaded / elapsed) if elapsed > 0 else 0.0)
+
+		(putBatch, closeWorkers) = self._runInWorkers(workers, loadBatch)
+
+		def sendBatch(batch):
+			# Reserve a block of primary keys for the whole batch
+			lastId = int(conn.incrby(nextIdKey, len(batch)))
+			nextId = lastId - len(batch) + 1
+			for obj in batch:
+				obj._id = nextId
+				nextId += 1
+
+			putBatch(batch)
+
+		try:
+			batch = []
+			for obj in objs:
+				if getattr(obj, '_id', None):
+					raise ValueError('bulkLoad only inserts new objects, but %s object %s has already been saved.' %(self.mdl.__name__, to_unicode(obj._id)))
+
+				batch.append(obj)
+				if len(batch) >= batchSize:
+					sendBatch(batch)
+					batch = []
+
+			if batch:
+				sendBatch(batch)
+		except:
+			closeWorkers(raiseErrors=False)
+			raise
+
+		closeWorkers()
+
+		if timer is not None:
+			timer.finish(self.mdl, 'bulkLoad', progress['numLoaded'])
+
+		return progress['numLoaded']
+
+	def exportRESP(self, objs, stream, startId=None, batchSize=BULK_LOAD_BATCH_SIZE):
+		'''
+			exportRESP - Write the Redis commands which insert the given new objects, in the raw Redis protocol (RESP),
+			  for a mass insert with:
+
+				redis-cli --pipe < objs.resp
+
+			  The commands are the same as bulkLoad sends (one HMSET per object, and per batch of #batchSize objects,
+			    one SADD to the ids set and each index set), with values converted by each field's toStorage / toIndex.
+			    They end with an EVAL of RAISE_NEXT_ID_SCRIPT, raising the model's next primary key (_ir_|KEY_NAME:next) past the exported
+			    objects (never lowering it), so later saves continue after them.
+
+			  The primary keys are not reserved between export and load. If anything else saves objects of this model in between
+			    (or #startId is below the model's next primary key), the loaded objects overwrite the objects with the same primary keys.
+
+			  Objects are streamed from the iterable, so memory stays constant. Any DEFAULT_TTL deadlines are from the time of export.
+
+			@param objs <iterable<IndexedRedisModel>> - New objects. Each is assigned its primary key (_id) as it is written.
+
+			@param stream <str/file> - A file path to write, or any object with a "write" method taking bytes (a file opened "wb", a socket's makefile("wb"), etc)
+
+			@param startId <None/int> - The primary key of the first object. If None, the model's next primary key is read from
+			  Redis (without reserving it), so nothing else should insert objects of this model until the commands are loaded.
+			  The model's next primary key is only ever raised by the load, not lowered to a smaller #startId.
+
+			@param batchSize <int> default BULK_LOAD_BATCH_SIZE (5000) - Number of objects per batch of SADDs
+
+			@return <int> - Number of objects written
+
+			@raises ValueError - If an object has already been saved (has a primary key)
+		'''
+		if batchSize < 1:
+			raise ValueError('exportRESP batchSize must be >= 1. Got: %s' %(repr(batchSize), ))
+
+		if startId is None:
+			startId = int(self._peekNextID()) + 1
+
+		if isinstance(stream, (str, type(u''))):
+			with open(stream, 'wb') as f:
+				return self.exportRESP(objs, f, startId, batchSize)
+
+		nextId = int(startId)
+
+		def writeBatch(batch):
+			stream.write( b''.join( [ encodeCommand(command) for command in self._getInsertCommands(batch) ] ) )
+
+		numWritten = 0
+		batch = []
+		for obj in objs:
+			if getattr(obj, '_id', None):
+				raise ValueError('exportRESP only inserts new objects, but %s object %s has already been saved.' %(self.mdl.__name__, to_unicode(obj._id)))
+
+			obj._id = nextId
+			nextId += 1
+
+			batch.append(obj)
+			if len(batch) >= batchSize:
+				writeBatch(batch)
+				numWritten += len(batch)
+				batch = []
+
+		if batch:
+			writeBatch(batch)
+			numWritten += len(batch)
+
+		if numWritten:
+			stream.write( encodeCommand( ('EVAL', RAISE_NEXT_ID_SCRIPT.source, 1, self._get_next_id_key(), nextId - 1) ) )
+
+		return numWritten
+
+	def importFrom(self, stream, batchSize=None, progressCallback=None):
+		'''
+			importFrom - Load the objects in a snapshot written by IndexedRedisQuery.export, keeping their primary keys.
+
+			  Each chunk of the snapshot is read, decompressed, and written in a single pipeline (the same commands as bulkLoad:
+			    one HMSET per object, and one SADD per chunk to the ids set and to each index set), so only one chunk is held in memory at a time.
+			    Afterwards, the model's next primary key is raised past the largest imported primary key.
+
+			  This is meant for loading into an empty model: an existing object with the same primary key as an imported one is overwritten,
+			    but left in the index sets of its old values. Fields in the snapshot which the model does not have are ignored, and fields
+			    the model has which the snapshot does not are set to their default. Imported objects of a VERSIONED model are at version 1,
+			    and any DEFAULT_TTL deadlines are from the time of import.
+
+			Example:
+				MyModel.saver.importFrom('done.irsnap')
+
+			@param stream <str/file> - A file path to read, or any object with a "read" method returning bytes (a file opened "rb", etc)
+
+			@param batchSize <None/int> default None - If provided, the max number of objects per pipeline. Otherwise, one pipeline per chunk of the snapshot.
+
+			@param progressCallback <None/callable> - If provided, called after each pipeline as progressCallback(numImported, objsPerSecond),
+			   where numImported is the total number of objects imported so far.
+
+			@return <int> - Number of objects imported
+
+			@raises InvalidSnapshotException - If the stream is not a complete snapshot. Chunks before the problem remain loaded.
+		'''
+		if batchSize is not None and batchSize < 1:
+			raise ValueError('importFrom batchSize must be >= 1. Got: %s' %(repr(batchSize), ))
+
+		if isinstance(stream, (str, type(u''))):
+			with open(stream, 'rb') as f:
+				return self.importFrom(f, batchSize, progressCallback)
+
+		timer = startOperation()
+
+		reader = SnapshotReader(stream)
+
+		modelFieldNames = set( [ str(thisField) for thisField in self.fields ] )
+		fieldNames = [ (fieldName if fieldName in modelFieldNames else None) for fieldName in reader.fieldNames ]
+
+		conn = self._get_connection()
+		startTime = time.time()
+		numImported = 0
+		maxPk = 0
+
+		for records in reader.iterChunks():
+			objs = []
+			for (pk, values) in records:
+				kwargs = { fieldName : value for fieldName, value in zip(fieldNames, values) if fieldName is not None }
+				kwargs['__fromRedis'] = True
+
+				obj = self.mdl(**kwargs)
+				obj._id = pk
+				objs.append(obj)
+
+				if pk > maxPk:
+					maxPk = pk
+
+			pipelineSize = batchSize or len(objs) or 1
+			for i in range(0, len(objs), pipelineSize):
+				batch = objs[i : i + pipelineSize]
+
+				pipeline = conn.pipeline(transaction=False)
+				for command in self._getInsertCommands(batch):
+					pipeline.execute_command(*command)
+				pipeline.execute()
+
+				numImported += len(batch)
+				if progressCallback is not None:
+					elapsed = time.time() - startTime
+					progressCallback(numImported, (numImported / elapsed) if elapsed > 0 else 0.0)
+
+		if maxPk:
+			RAISE_NEXT_ID_SCRIPT(conn, [ self._get_next_id_key() ], [ maxPk ])
+
+		if timer is not None:
+			timer.finish(self.mdl, 'importFrom', numImported)
+
+		return numImported
+
+	def _getInsertCommands(self, objs):
+		'''
+			_getInsertCommands - Get the commands which insert the given new objects (with their primary keys already assigned),
+			  with one SADD per index value (and to the ids set) for all of them. The objects are updated as saved.
+			internal
+
+			@param objs list<IndexedRedisModel> - New objects
+
+			@return list<tuple> - The commands, each a tuple of the command name and its arguments
+		'''
+		commands = []
+		pks = []
+		indexPks = OrderedDict()
+
+		for obj in objs:
+			newDict = obj.asDict(forStorage=True)
+
+			for thisField in self.fields:
+				if newDict[thisField] == IR_NULL_STR:
+					obj._origData[thisField] = irNull
+				else:
+					obj._origData[thisField] = object.__getattribute__(obj, str(thisField))
+
+			mapping = self._getHashMapping(newDict)
+
+			for indexedField in self.indexedFields:
+				indexValue = self._getIndexValue(indexedField, obj._origData[indexedField])
+				if self._recordsIndexValue(indexedField):
+					mapping[self._getIndexValueFieldName(indexedField)] = indexValue
+
+				indexKey = self._get_key_for_index_value(indexedField, indexValue)
+				if indexKey not in indexPks:
+					indexPks[indexKey] = []
+				indexPks[indexKey].append(obj._id)
+
+			if self.mdl.VERSIONED:
+				mapping[VERSION_FIELD_NAME] = 1
+				object.__setattr__(obj, '_version', 1)
+
+			command = [ 'HMSET', self._get_key_for_id(obj._id) ]
+			for hashFieldName, value in mapping.items():
+				command.append(hashFieldName)
+				command.append(value)
+			commands.append( tuple(command) )
+
+			pks.append(obj._id)
+
+		if not pks:
+			return commands
+
+		commands.append( tuple( [ 'SADD', self._get_ids_key() ] + pks ) )
+
+		for indexKey, indexedPks in indexPks.items():
+			commands.append( tuple( [ 'SADD', indexKey ] + indexedPks ) )
+
+		if self.mdl.DEFAULT_TTL is not None:
+			deadline = time.time() + self.mdl.DEFAULT_TTL
+			command = [ 'ZADD', self._get_expires_key() ]
+			for pk in pks:
+				command.append(deadline)
+				command.append(pk)
+			commands.append( tuple(command) )
+
+		return commands
+
 	def saveMultiple(self, objs):
 		'''
 			saveMultiple - Save a list of objects using a pipeline.
@@ -2167,8 +4065,7 @@ class IndexedRedisSave(IndexedRedisHelper):
 			for thisField in self.fields:
 
 				fieldValue = newDict.get(thisField, thisField.getDefaultValue())
-
-				pipeline.hset(key, thisField, fieldValue)
+				newDict[thisField] = fieldValue
 
 				# Update origData with the new data
 				if fieldValue == IR_NULL_STR:
@@ -2176,19 +4073,32 @@ class IndexedRedisSave(IndexedRedisHelper):
 				else:
 					obj._origData[thisField] = object.__getattribute__(obj, str(thisField))
 
+			mapping = self._getHashMapping(newDict)
+			if self.mdl.VERSIONED:
+				mapping[VERSION_FIELD_NAME] = 1
+				object.__setattr__(obj, '_version', 1)
+
+			self._hsetMultiple(key, mapping, pipeline)
+
 			self._add_id_to_keys(obj._id, pipeline)
 
 			for indexedField in self.indexedFields:
 				self._add_id_to_index(indexedField, obj._id, obj._origData[indexedField], pipeline)
 		else:
 			updatedFields = obj.getUpdatedFields()
+			packedFields = self.packedFields
+			packedUpdated = []
 			for thisField, fieldValue in updatedFields.items():
 				(oldValue, newValue) = fieldValue
 
 				oldValueForStorage = thisField.toStorage(oldValue)
 				newValueForStorage = thisField.toStorage(newValue)
 
-				pipeline.hset(key, thisField, newValueForStorage)
+				if packedFields and thisField in packedFields:
+					# All packed fields are written together, below
+					packedUpdated.append(thisField)
+				else:
+					pipeline.hset(key, self._getHashFieldName(thisField), newValueForStorage)
 
 				if thisField in self.indexedFields:
 					self._rem_id_from_index(thisField, obj._id, oldValueForStorage, pipeline)
@@ -2197,27 +4107,284 @@ class IndexedRedisSave(IndexedRedisHelper):
 				# Update origData with the new data
 				obj._origData[thisField] = newValue
 
+			if packedUpdated:
+				# Merged with the stored values on the server, as the object may not have all the packed fields (like from getOnlyFields)
+				args = [ PACKED_FIELD_NAME, len(packedFields) ]
+				for thisField in packedFields:
+					args.append( 1 if thisField in packedUpdated else 0 )
+					args.append( newDict[thisField] )
+				pipeline.eval(PACKED_MERGE_SCRIPT.source, 1, key, *args)
+
+			if updatedFields and self.mdl.VERSIONED:
+				pipeline.hincrby(key, VERSION_FIELD_NAME, 1)
+				object.__setattr__(obj, '_version', obj._version + 1)
+
+
+	def updateMultipleByPks(self, pks, fields):
+		'''
+			updateMultipleByPks - Set the given fields on multiple objects given their primary keys, without fetching them.
+
+			  Probably you want Model.objects.update instead of calling this directly. @see IndexedRedisQuery.update
 
-	def reindex(self, objs, conn=None):
+			  Primary keys which do not exist are skipped. Objects saved by an older version of IndexedRedis (without the
+			    recorded index values) are fetched and saved as before. Model.objects.reindex() will record the index values on all objects.
+
+			@param pks - List of primary keys
+			@param fields <dict> - Field name -> new value
+
+			@return <int> - Number of objects updated
+		'''
+		pks = list(pks)
+		if not pks:
+			return 0
+
+		timer = startOperation()
+
+		(numUpdated, numRemaining) = self._runUpdateScript(self._get_connection(), fields, 'pks', pks, timer=timer)
+
+		if timer is not None:
+			timer.finish(self.mdl, 'updateMultipleByPks', numUpdated)
+
+		return numUpdated
+
+	def _updateStoredPks(self, setKey, numMatched, fields):
+		'''
+			_updateStoredPks - Update all the objects whose primary keys are in a set, in batches of UPDATE_BATCH_SIZE. The set is emptied.
+			internal
+
+			@param setKey <str> - Key of the set of primary keys
+			@param numMatched <int> - Number of primary keys in the set
+			@param fields <dict> - Field name -> new value
+
+			@return <int> - Number of objects updated
+		'''
+		timer = startOperation()
+
+		conn = self._get_connection()
+
+		numUpdated = 0
+		numRemaining = numMatched
+		while numRemaining > 0:
+			(numBatchUpdated, numRemaining) = self._runUpdateScript(conn, fields, 'set', [ UPDATE_BATCH_SIZE ], setKey=setKey, timer=timer)
+			numUpdated += numBatchUpdated
+
+		if timer is not None:
+			timer.finish(self.mdl, 'updateQuery', numUpdated)
+
+		return numUpdated
+
+	def _getUpdateArgs(self, fields):
+		'''
+			_getUpdateArgs - Validate fields to update, and convert them into the arguments of UPDATE_SCRIPT (before the source)
+			internal
+
+			@param fields <dict> - Field name -> new value
+
+			@return list - @see IndexedRedis.scripts.UPDATE_SCRIPT
+
+			@raises ValueError - If no fields are given, or any are not fields of this model, or are packed (COMPACT_STORAGE)
+		'''
+		if not fields:
+			raise ValueError('update requires at least one field to set.')
+
+		packedFields = self.packedFields
+
+		values = []
+		indexArgs = []
+		for fieldName, value in fields.items():
+			if fieldName not in self.fields:
+				raise ValueError('Cannot update unknown field "%s" on model %s.' %(fieldName, self.mdl.__name__))
+
+			thisField = self.fields[fieldName]
+			if packedFields and thisField in packedFields:
+				raise ValueError('Cannot update field "%s" on model %s, as it is packed with the other non-indexed fields (COMPACT_STORAGE). Use save instead.' %(fieldName, self.mdl.__name__))
+
+			value = thisField.fromInput(value)
+
+			values.append( self._getHashFieldName(thisField) )
+			values.append( thisField.toStorage(value) )
+
+			if thisField in self.indexedFields:
+				indexArgs.append( str(thisField) )
+				indexArgs.append( self._getIndexValueSourceFieldName(thisField) )
+				indexArgs.append( self._getIndexValue(thisField, value) )
+
+		versionField = VERSION_FIELD_NAME if self.mdl.VERSIONED else ''
+
+		return [ ''.join([INDEXED_REDIS_PREFIX, self.keyName, ':']), versionField, len(values) // 2 ] + values + [ len(indexArgs) // 3 ] + indexArgs
+
+	def _runUpdateScript(self, conn, fields, source, sourceArgs, setKey=None, timer=None):
+		'''
+			_runUpdateScript - Run the update script (@see IndexedRedis.scripts.UPDATE_SCRIPT), and update any objects
+			  without recorded index values the old way.
+			internal
+
+			@param conn - Connection
+
+			@param fields <dict> - Field name -> new value
+
+			@param source <str> - Where the primary keys come from, "pks" or "set"
+
+			@param sourceArgs <list> - The primary keys to update ("pks"), or [ batchSize ] ("set")
+
+			@param setKey <None/str> - Key of the set of primary keys to update from ("set")
+
+			@param timer <None/OperationTimer> - Timer of the operation, if any
+
+			@return tuple( numUpdated<int>, numRemaining<int> ) - Number of objects updated, and number of primary keys left in #setKey
+		'''
+		args = self._getUpdateArgs(fields)
+		args.append(source)
+		args += list(sourceArgs)
+
+		keys = []
+		if setKey is not None:
+			keys.append(setKey)
+
+		if timer is not None:
+			timer.redisStart()
+
+		res = UPDATE_SCRIPT(conn, keys, args)
+
+		if timer is not None:
+			timer.redisEnd(1, res)
+
+		numUpdated = res[0]
+		notRecordedPks = res[2:]
+
+		if notRecordedPks:
+			objs = [ obj for obj in self.mdl.objects.getMultiple( [ int(pk) for pk in notRecordedPks ] ) if obj is not None ]
+			for obj in objs:
+				for fieldName, value in fields.items():
+					setattr(obj, fieldName, value)
+
+			if objs:
+				self.save(objs, cascadeSave=False)
+			numUpdated += len(objs)
+
+		return (numUpdated, res[1])
+
+	def increment(self, pk, fieldName, delta=1):
+		'''
+			increment - Atomically add #delta to a numeric field of an object, without fetching it.
+
+			  This is done on the Redis server in one call (@see IndexedRedis.scripts.INCREMENT_SCRIPT), using HINCRBY for
+			    IRField(valueType=int) fields, and HINCRBYFLOAT for IRFixedPointField fields (with the result formatted to the field's decimalPlaces).
+			    If the field is indexed, the object is moved to the index set of the new value in the same call.
+
+			  Unlike fetching, changing and saving the object, concurrent increments never lose updates. Objects already fetched are not changed.
+
+			@param pk <int> - Primary key of the object
+			@param fieldName <str> - Name of an IRField(valueType=int) or IRFixedPointField. Cannot be packed (COMPACT_STORAGE) or use hashIndex.
+			@param delta <int/float> default 1 - Amount to add (may be negative). Must be a whole number for int fields,
+			  and is rounded to decimalPlaces for fixed point fields.
+
+			@return - The new value of the field, or None if there is no object with primary key #pk
+
+			@raises ValueError - If the field cannot be incremented, #delta is invalid, or the field's current value is not a number (e.x. null)
+		'''
+		if fieldName not in self.fields:
+			raise ValueError('Cannot increment unknown field "%s" on model %s.' %(fieldName, self.mdl.__name__))
+
+		thisField = self.fields[fieldName]
+
+		if isinstance(thisField, fields.IRFixedPointField):
+			decimalPlaces = str(thisField.decimalPlaces)
+			deltaStr = thisField.toStorage(thisField.fromInput(delta))
+		elif getattr(thisField, 'valueType', None) == int:
+			decimalPlaces = ''
+			if int(delta) != delta:
+				raise ValueError('Cannot increment int field "%s" on model %s by %s, it is not a whole number.' %(fieldName, self.mdl.__name__, repr(delta)))
+			deltaStr = str(int(delta))
+		else:
+			raise ValueError('Cannot increment field "%s" on model %s, only IRField(valueType=int) and IRFixedPointField fields can be incremented.' %(fieldName, self.mdl.__name__))
+
+		if self.packedFields and thisField in self.packedFields:
+			raise ValueError('Cannot increment field "%s" on model %s, as it is packed with the other non-indexed fields (COMPACT_STORAGE). Use save instead.' %(fieldName, self.mdl.__name__))
+
+		if thisField in self.indexedFields:
+			if thisField.isIndexHashed:
+				raise ValueError('Cannot increment field "%s" on model %s, as it uses hashIndex.' %(fieldName, self.mdl.__name__))
+			indexKeyPrefix = self._get_key_for_index_value(thisField, '')
+		else:
+			indexKeyPrefix = ''
+
+		timer = startOperation()
+
+		if timer is not None:
+			timer.redisStart()
+
+		res = INCREMENT_SCRIPT(self._get_connection(), [ self._get_key_for_id(pk) ],
+			[ self._getHashFieldName(thisField), deltaStr, decimalPlaces, indexKeyPrefix, self._getIndexValueFieldName(thisField) if self._recordsIndexValue(thisField) else '', pk, VERSION_FIELD_NAME if self.mdl.VERSIONED else '' ]
+		)
+
+		if timer is not None:
+			timer.redisEnd(1, res)
+			timer.finish(self.mdl, 'increment', 1 if res else 0)
+
+		if res is None:
+			return None
+
+		if not res[0]:
+			raise ValueError('Cannot increment field "%s" of %s object %s, its current value is not a number: %s' %(fieldName, self.mdl.__name__, to_unicode(pk), repr(to_unicode(res[1]))))
+
+		return thisField.fromStorage(to_unicode(res[1]))
+
+	def reindex(self, objs, conn=None, fieldNames=None):
 		'''
 			reindex - Reindexes a given list of objects. Probably you want to do Model.objects.reindex() instead of this directly.
 
-			@param objs list<IndexedRedisModel> - List of objects to reindex
+			  Each object is added to the index set of its current value of each field (with one SADD per index value for all the objects),
+			    and the index value is recorded on the object where needed (@see _recordsIndexValue), all in a single pipeline.
+			    Copies of the stored value recorded by earlier versions (for fields which do not need them) are removed.
+
+			@param objs list<IndexedRedisModel> - List of objects to reindex. They must have at least the fields being reindexed (like from getMultipleOnlyFields).
 			@param conn <redis.Redis or None> - Specific Redis connection or None to reuse
+			@param fieldNames <None/list<str>> default None - Names of the indexed fields to reindex, or None for all of them
 		'''
+		timer = startOperation()
+
 		if conn is None:
 			conn = self._get_connection()
 
-		pipeline = conn.pipeline()
+		if fieldNames is None:
+			fieldNames = self.indexedFields
 
-		objDicts = [obj.asDict(True, forStorage=True) for obj in objs]
+		pipeline = conn.pipeline(transaction=False)
 
-		for indexedFieldName in self.indexedFields:
-			for objDict in objDicts:
-				self._rem_id_from_index(indexedFieldName, objDict['_id'], objDict[indexedFieldName], pipeline)
-				self._add_id_to_index(indexedFieldName, objDict['_id'], objDict[indexedFieldName], pipeline)
+		recordedFieldNames = [ fieldName for fieldName in fieldNames if self._recordsIndexValue(fieldName) ]
+		# Copies of the stored value, recorded by earlier versions, are removed
+		unrecordedIndexValueFieldNames = [ self._getIndexValueFieldName(fieldName) for fieldName in fieldNames if fieldName not in recordedFieldNames ]
+
+		indexPks = OrderedDict()
+		for obj in objs:
+			mapping = OrderedDict()
+			for fieldName in fieldNames:
+				indexValue = self._getIndexValue(fieldName, object.__getattribute__(obj, str(fieldName)))
+				if fieldName in recordedFieldNames:
+					mapping[self._getIndexValueFieldName(fieldName)] = indexValue
+
+				indexKey = self._get_key_for_index_value(fieldName, indexValue)
+				if indexKey not in indexPks:
+					indexPks[indexKey] = []
+				indexPks[indexKey].append(obj._id)
 
-		pipeline.execute()
+			self._hsetMultiple(self._get_key_for_id(obj._id), mapping, pipeline)
+			if unrecordedIndexValueFieldNames:
+				pipeline.hdel(self._get_key_for_id(obj._id), *unrecordedIndexValueFieldNames)
+
+		for indexKey, indexedPks in indexPks.items():
+			pipeline.sadd(indexKey, *indexedPks)
+
+		if timer is not None:
+			numCommands = len(pipeline)
+			timer.redisStart()
+
+		res = pipeline.execute()
+
+		if timer is not None:
+			timer.redisEnd(numCommands, res)
+			timer.finish(self.mdl, 'reindex', len(objs))
 
 	def compat_convertHashedIndexes(self, objs, conn=None):
 		'''
@@ -2307,30 +4474,42 @@ class IndexedRedisDelete(IndexedRedisHelper):
 			conn = self._get_connection()
 			pipeline = conn.pipeline()
 			executeAfter = True
+			timer = startOperation()
 		else:
 			pipeline = conn # In this case, we are inheriting a pipeline
 			executeAfter = False
+			timer = None
 		
 		pipeline.delete(self._get_key_for_id(obj._id))
 		self._rem_id_from_keys(obj._id, pipeline)
+		pipeline.zrem(self._get_expires_key(), obj._id)
 		for indexedFieldName in self.indexedFields:
 			self._rem_id_from_index(indexedFieldName, obj._id, obj._origData[indexedFieldName], pipeline)
 
 		obj._id = None
 
 		if executeAfter is True:
-			pipeline.execute()
+			if timer is not None:
+				numCommands = len(pipeline)
+				timer.redisStart()
+
+			res = pipeline.execute()
+
+			if timer is not None:
+				timer.redisEnd(numCommands, res)
+				timer.finish(self.mdl, 'deleteOne', 1)
 
 		return 1
 
 	def deleteByPk(self, pk):
 		'''
 			deleteByPk - Delete object associated with given primary key
+
+			@see deleteMultipleByPks
+
+			@return - Number of objects deleted (0 or 1)
 		'''
-		obj = self.mdl.objects.getOnlyIndexedFields(pk)
-		if not obj:
-			return 0
-		return self.deleteOne(obj)
+		return self.deleteMultipleByPks([pk])
 
 	def deleteMultiple(self, objs):
 		'''
@@ -2340,6 +4519,8 @@ class IndexedRedisDelete(IndexedRedisHelper):
 
 			@return - Number of objects deleted
 		'''
+		timer = startOperation()
+
 		conn = self._get_connection()
 		pipeline = conn.pipeline()
 
@@ -2348,7 +4529,15 @@ class IndexedRedisDelete(IndexedRedisHelper):
 		for obj in objs:
 			numDeleted += self.deleteOne(obj, pipeline)
 
-		pipeline.execute()
+		if timer is not None:
+			numCommands = len(pipeline)
+			timer.redisStart()
+
+		res = pipeline.execute()
+
+		if timer is not None:
+			timer.redisEnd(numCommands, res)
+			timer.finish(self.mdl, 'deleteMultiple', numDeleted)
 
 		return numDeleted
 
@@ -2356,18 +4545,131 @@ class IndexedRedisDelete(IndexedRedisHelper):
 		'''
 			deleteMultipleByPks - Delete multiple objects given their primary keys
 
+			  The objects are deleted on the server, atomically in a single call (@see IndexedRedis.scripts.DELETE_SCRIPT),
+			    without fetching them. Each object's index keys are found from the index values recorded on it when saved.
+
+			  Objects saved by an older version of IndexedRedis (without the recorded index values) are fetched
+			    and deleted as before. Model.objects.reindex() will record the index values on all objects.
+
 			@param pks - List of primary keys
 
 			@return - Number of objects deleted
 		'''
-		if type(pks) == set:
-			pks = list(pks)
+		pks = list(pks)
+		if not pks:
+			return 0
 
-		if len(pks) == 1:
-			return self.deleteByPk(pks[0])
+		timer = startOperation()
+
+		(numDeleted, numRemaining) = self._runDeleteScript(self._get_connection(), 'pks', pks, timer=timer)
+
+		if timer is not None:
+			timer.finish(self.mdl, 'deleteMultipleByPks', numDeleted)
+
+		return numDeleted
+
+	def _deleteStoredPks(self, setKey, numMatched, batchSize, progressCallback=None):
+		'''
+			_deleteStoredPks - Delete all the objects whose primary keys are in a set, in batches. The set is emptied.
+			internal
+
+			@param setKey <str> - Key of the set of primary keys
+			@param numMatched <int> - Number of primary keys in the set
+			@param batchSize <int> - Max number of objects to delete per call
+			@param progressCallback <None/callable> - @see IndexedRedisQuery.delete
+
+			@return <int> - Number of objects deleted
+		'''
+		timer = startOperation()
+
+		conn = self._get_connection()
+
+		numDeleted = 0
+		numRemaining = numMatched
+		while numRemaining > 0:
+			(numBatchDeleted, numRemaining) = self._runDeleteScript(conn, 'set', [ batchSize ], setKey=setKey, timer=timer)
+			numDeleted += numBatchDeleted
+
+			if progressCallback is not None:
+				progressCallback(numDeleted, numMatched)
+
+		if timer is not None:
+			timer.finish(self.mdl, 'deleteQuery', numDeleted)
+
+		return numDeleted
+
+	def _deleteExpired(self, batchSize):
+		'''
+			_deleteExpired - Delete all the objects whose deadline has passed, in batches. @see IndexedRedisQuery.reapExpired
+			internal
+
+			@param batchSize <int> - Max number of objects to delete per call
+
+			@return <int> - Number of objects deleted
+		'''
+		timer = startOperation()
+
+		conn = self._get_connection()
+		now = time.time()
+
+		numDeleted = 0
+		numRemaining = 1
+		while numRemaining > 0:
+			(numBatchDeleted, numRemaining) = self._runDeleteScript(conn, 'expired', [ repr(now), batchSize ], timer=timer)
+			numDeleted += numBatchDeleted
+
+		if timer is not None:
+			timer.finish(self.mdl, 'reapExpired', numDeleted)
 
-		objs = self.mdl.objects.getMultipleOnlyIndexedFields(pks)
-		return self.deleteMultiple(objs)
+		return numDeleted
+
+	def _runDeleteScript(self, conn, source, sourceArgs, setKey=None, timer=None):
+		'''
+			_runDeleteScript - Run the delete script (@see IndexedRedis.scripts.DELETE_SCRIPT), and delete any objects
+			  without recorded index values the old way.
+			internal
+
+			@param conn - Connection
+
+			@param source <str> - Where the primary keys come from, "pks", "set" or "expired"
+
+			@param sourceArgs <list> - The primary keys to delete ("pks"), [ batchSize ] ("set"), or [ now, batchSize ] ("expired").
+			  @see IndexedRedis.scripts.DELETE_SCRIPT
+
+			@param setKey <None/str> - Key of the set of primary keys to delete from ("set")
+
+			@param timer <None/OperationTimer> - Timer of the operation, if any
+
+			@return tuple( numDeleted<int>, numRemaining<int> ) - Number of objects deleted, and number of primary keys left in #setKey (or left expired)
+		'''
+		args = [ ''.join([INDEXED_REDIS_PREFIX, self.keyName, ':']), len(self.indexedFields) ]
+		for indexedField in self.indexedFields:
+			args.append( str(indexedField) )
+			args.append( self._getIndexValueSourceFieldName(indexedField) )
+
+		keys = [ self._get_ids_key(), self._get_expires_key() ]
+		if setKey is not None:
+			keys.append(setKey)
+
+		args.append(source)
+		args += list(sourceArgs)
+
+		if timer is not None:
+			timer.redisStart()
+
+		res = DELETE_SCRIPT(conn, keys, args)
+
+		if timer is not None:
+			timer.redisEnd(1, res)
+
+		numDeleted = res[0]
+		notRecordedPks = res[2:]
+
+		if notRecordedPks:
+			objs = self.mdl.objects.getMultipleOnlyIndexedFields( [ int(pk) for pk in notRecordedPks ] )
+			numDeleted += self.deleteMultiple(objs)
+
+		return (numDeleted, res[1])
 
 	def destroyModel(self):
 		'''
@@ -2377,20 +4679,35 @@ class IndexedRedisDelete(IndexedRedisHelper):
 
 			    This function is called if you do Model.objects.delete() with no filters set.
 
+			    The field code table (_ir_|KEY_NAME:schema) of a COMPRESS_FIELD_NAMES model is NOT deleted: other processes
+			      may have the codes cached, and keep writing with them, so the codes must stay the same once assigned.
+			      This process's cached codes for the model are dropped, and reloaded from Redis on next use.
+
 			@return - Number of keys deleted. Note, this is NOT number of models deleted, but total keys.
 		'''
 		conn = self._get_connection()
 		pipeline = conn.pipeline()
 		pipeline.eval("""
 		local matchingKeys = redis.call('KEYS', '%s*')
+		local numDeleted = 0
 
 		for _,key in ipairs(matchingKeys) do
-			redis.call('DEL', key)
+			if key ~= ARGV[1] then
+				redis.call('DEL', key)
+				numDeleted = numDeleted + 1
+			end
 		end
 
-		return #matchingKeys
-		""" %( ''.join([INDEXED_REDIS_PREFIX, self.mdl.KEY_NAME, ':']), ), 0)
-		return pipeline.execute()[0]
+		return numDeleted
+		""" %( ''.join([INDEXED_REDIS_PREFIX, self.mdl.KEY_NAME, ':']), ), 0, self._get_schema_key())
+		ret = pipeline.execute()[0]
+
+		global _modelFieldCodes
+		for cacheKey in list(_modelFieldCodes.keys()):
+			if cacheKey[0] is self.mdl:
+				_modelFieldCodes.pop(cacheKey, None)
+
+		return ret
 		
 	
 
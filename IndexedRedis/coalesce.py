@@ -0,0 +1,320 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# coalesce - Gathers the commands issued by many threads within a short window,
+#    and sends them to Redis together as one pipeline (one round trip).
+#    Used by models which set COALESCE_WINDOW
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import threading
+import time
+
+import redis
+
+__all__ = ('CommandCoalescer', 'CoalescingRedis', 'CoalescedPipeline', 'getCoalescer', 'clearCoalescers', 'resetCoalescersAfterFork')
+
+
+class _PendingCommands(object):
+	'''
+		_PendingCommands - A block of commands submitted by one caller, and (once flushed) the replies to those commands.
+	'''
+
+	__slots__ = ('commandStack', 'scripts', 'transaction', 'results', 'error', 'event')
+
+	def __init__(self, commandStack, scripts, transaction):
+		self.commandStack = commandStack
+		self.scripts = scripts
+		self.transaction = transaction
+		self.results = None
+		self.error = None
+		self.event = threading.Event()
+
+
+class CommandCoalescer(object):
+	'''
+		CommandCoalescer - Collects blocks of commands submitted from any number of threads, and once #window seconds have passed
+		  since the first pending block (or #maxCommands commands are pending), sends them all to Redis as a single
+		  MULTI/EXEC pipeline. Each caller blocks until the pipeline completes, and receives just the replies to its own commands.
+
+		  Because the whole batch is one transaction, every caller's commands are still applied atomically.
+		  If the transaction is aborted before running (e.x. one caller queued an unknown command, or one with the wrong number
+		    of arguments), nothing has been applied, so each caller's block is retried in a pipeline of its own, and only the
+		    caller which queued the bad command receives the error.
+		  If the batch cannot be executed at all (e.x. connection failure), every caller in that batch receives the error.
+	'''
+
+	def __init__(self, connection, window, maxCommands):
+		'''
+			__init__ - Create a CommandCoalescer
+
+			@param connection <redis.Redis> - The connection used to send the batches
+
+			@param window <float> - Max number of seconds to wait for more commands after the first pending command arrives
+
+			@param maxCommands <int> - Flush right away once at least this many commands are pending
+		'''
+		self.connection = connection
+		self.window = window
+		self.maxCommands = maxCommands
+
+		# Some counters, which can be used to see the effectiveness of coalescing
+		self.numFlushes = 0
+		self.numSubmitted = 0
+
+		self._lock = threading.Lock()
+		self._pendingCondition = threading.Condition(self._lock)
+		self._pending = []
+		self._numPendingCommands = 0
+		self._flushThread = None
+
+	def submit(self, commandStack, scripts=None, transaction=True):
+		'''
+			submit - Submit a block of commands, and wait for their replies.
+
+			@param commandStack list< tuple(args, options) > - Commands, in the same format as redis.client.Pipeline.command_stack
+
+			@param scripts <set/None> - Any redis.client.Script objects which must be loaded prior to execution
+
+			@param transaction <bool> default True - Whether the block must be applied atomically, if it has to be run on its own
+
+			@return list - Replies, one per command. Commands which failed will have an Exception as the reply.
+
+			@raises - Any exception raised executing the pipeline the commands were part of
+		'''
+		pending = _PendingCommands(commandStack, scripts, transaction)
+
+		with self._lock:
+			self._pending.append(pending)
+			self._numPendingCommands += len(commandStack)
+			self.numSubmitted += len(commandStack)
+
+			if self._flushThread is None or not self._flushThread.is_alive():
+				self._flushThread = threading.Thread(target=self._runFlushLoop, name='IndexedRedis-CommandCoalescer')
+				self._flushThread.daemon = True
+				self._flushThread.start()
+
+			self._pendingCondition.notify()
+
+		pending.event.wait()
+
+		if pending.error is not None:
+			raise pending.error
+
+		return pending.results
+
+	def _runFlushLoop(self):
+		'''
+			_runFlushLoop - Body of the background flushing thread
+		'''
+		while True:
+			with self._lock:
+				while not self._pending:
+					self._pendingCondition.wait()
+
+				flushAt = time.time() + self.window
+				while self._numPendingCommands < self.maxCommands:
+					remaining = flushAt - time.time()
+					if remaining <= 0:
+						break
+					self._pendingCondition.wait(remaining)
+
+				batch = self._pending
+				self._pending = []
+				self._numPendingCommands = 0
+
+			self._flush(batch)
+
+	def _flush(self, batch):
+		'''
+			_flush - Execute a batch of pending command blocks as one pipeline, and hand out the replies
+
+			@param batch list<_PendingCommands> - The pending blocks
+		'''
+		self.numFlushes += 1
+
+		try:
+			results = self._execute(batch, True)
+		except redis.exceptions.ResponseError:
+			# Replies to commands which fail when run are returned in the results, so this is an error
+			#   queueing a command, which aborted the whole transaction. Nothing was applied, so retry each block alone.
+			for pending in batch:
+				try:
+					pending.results = self._execute( [ pending ], pending.transaction )
+				except Exception as e:
+					pending.error = e
+				pending.event.set()
+			return
+		except Exception as e:
+			for pending in batch:
+				pending.error = e
+				pending.event.set()
+			return
+
+		i = 0
+		for pending in batch:
+			numCommands = len(pending.commandStack)
+			pending.results = results[i : i + numCommands]
+			i += numCommands
+			pending.event.set()
+
+	def _execute(self, batch, transaction):
+		'''
+			_execute - Execute the commands of pending blocks as one pipeline
+
+			@param batch list<_PendingCommands> - The pending blocks
+			@param transaction <bool> - Whether to wrap the pipeline in MULTI/EXEC
+
+			@return list - Replies to all the commands, in order. Commands which failed will have an Exception as the reply.
+		'''
+		pipeline = self.connection.pipeline(transaction=transaction)
+		for pending in batch:
+			pipeline.command_stack.extend(pending.commandStack)
+			if pending.scripts:
+				pipeline.scripts.update(pending.scripts)
+
+		return pipeline.execute(raise_on_error=False)
+
+
+class CoalescedPipeline(object):
+	'''
+		CoalescedPipeline - Wraps a redis pipeline, queueing commands the same way, but
+		  where #execute hands the commands to a CommandCoalescer instead of sending them directly.
+
+		  WATCH is not supported, as it would run on its own connection, outside of the batched transaction.
+		    Use a connection without coalescing (like IndexedRedisHelper._get_new_connection) to WATCH.
+	'''
+
+	def __init__(self, pipeline, coalescer):
+		self._pipeline = pipeline
+		self._coalescer = coalescer
+
+	def __getattr__(self, name):
+		return getattr(self._pipeline, name)
+
+	def __len__(self):
+		return len(self._pipeline)
+
+	def watch(self, *names):
+		raise redis.exceptions.RedisError('WATCH is not supported on a coalesced pipeline. Use a connection without coalescing.')
+
+	def multi(self):
+		raise redis.exceptions.RedisError('MULTI is not supported on a coalesced pipeline. Use a connection without coalescing.')
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self._pipeline.reset()
+
+	def execute(self, raise_on_error=True):
+		'''
+			execute - Execute all queued commands (as part of a coalesced batch)
+
+			@param raise_on_error <bool> default True - If True, raise the first error reply. Otherwise, errors are returned in the list.
+
+			@return list - Replies to the queued commands
+		'''
+		pipeline = self._pipeline
+		commandStack = pipeline.command_stack
+		scripts = getattr(pipeline, 'scripts', None)
+
+		# reset will clear the command stack and scripts, so make sure we don't share them
+		pipeline.command_stack = []
+		pipeline.scripts = set()
+		pipeline.reset()
+
+		if not commandStack:
+			return []
+
+		results = self._coalescer.submit(commandStack, scripts, pipeline.transaction)
+
+		if raise_on_error:
+			for result in results:
+				if isinstance(result, Exception):
+					raise result
+
+		return results
+
+
+class CoalescingRedis(redis.Redis):
+	'''
+		CoalescingRedis - A redis.Redis where every command, and every pipeline execute, goes through a CommandCoalescer.
+	'''
+
+	def __init__(self, coalescer, *args, **kwargs):
+		'''
+			__init__ - Create this object
+
+			@param coalescer <CommandCoalescer> - The coalescer to submit commands to
+
+			All other arguments are passed to redis.Redis
+		'''
+		redis.Redis.__init__(self, *args, **kwargs)
+		self._coalescer = coalescer
+
+	def execute_command(self, *args, **options):
+		result = self._coalescer.submit( [ (args, options) ], transaction=False )[0]
+		if isinstance(result, Exception):
+			raise result
+
+		return result
+
+	def pipeline(self, transaction=True, shard_hint=None):
+		return CoalescedPipeline( redis.Redis.pipeline(self, transaction, shard_hint), self._coalescer )
+
+
+global _coalescers
+_coalescers = {}
+
+global _coalescersLock
+_coalescersLock = threading.Lock()
+
+def getCoalescer(connectionPool, window, maxCommands):
+	'''
+		getCoalescer - Get (and create, if needed) the CommandCoalescer for a connection pool with the given settings.
+
+		@param connectionPool <redis.ConnectionPool> - The pool of the server which will receive the commands
+
+		@param window <float> - @see CommandCoalescer.__init__
+		@param maxCommands <int> - @see CommandCoalescer.__init__
+
+		@return <CommandCoalescer>
+	'''
+	global _coalescers
+	global _coalescersLock
+
+	key = (connectionPool, window, maxCommands)
+	with _coalescersLock:
+		coalescer = _coalescers.get(key, None)
+		if coalescer is None:
+			coalescer = _coalescers[key] = CommandCoalescer(redis.Redis(connection_pool=connectionPool), window, maxCommands)
+
+	return coalescer
+
+def clearCoalescers():
+	'''
+		clearCoalescers - Forget all CommandCoalescers. Called when the connection pools are cleared.
+
+		  Any in-flight batches will still complete, but new commands will use new coalescers.
+	'''
+	global _coalescers
+
+	with _coalescersLock:
+		_coalescers.clear()
+
+def resetCoalescersAfterFork():
+	'''
+		resetCoalescersAfterFork - Called in a child process after a fork. The flushing threads of the
+		  inherited coalescers do not exist in the child, so forget them all.
+	'''
+	global _coalescers
+	global _coalescersLock
+
+	# The lock may have been held by another thread at the time of fork
+	_coalescersLock = threading.Lock()
+	_coalescers = {}
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
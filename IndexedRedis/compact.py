@@ -0,0 +1,94 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# compact - Packing of several storage-form field values into a single binary blob.
+#    Used by models which set COMPACT_STORAGE = True
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import struct
+
+from .compat_str import tobytes, to_unicode, isStringy
+
+__all__ = ('PACKED_FIELD_NAME', 'packValues', 'unpackValues')
+
+# PACKED_FIELD_NAME - The name of the hash field which holds the packed values on a COMPACT_STORAGE model
+PACKED_FIELD_NAME = '_ir_packed'
+
+# Format version, stored as the first byte of every packed blob
+_PACK_FORMAT_VERSION = 1
+
+# Lengths below this are stored in a single byte, otherwise this marker byte is followed by a 4-byte length
+_LONG_LENGTH_MARKER = 0xFF
+
+_byteStruct = struct.Struct('>B')
+_longLengthStruct = struct.Struct('>BI')
+
+
+def packValues(values):
+	'''
+		packValues - Pack a list of storage-form values into a single binary blob.
+
+		  Each value is stored as a length followed by the raw bytes. Lengths under 255 take a single byte.
+
+		@param values list<str/bytes> - Values, as returned by IRField.toStorage
+
+		@return <bytes> - The packed blob
+	'''
+	ret = [ _byteStruct.pack(_PACK_FORMAT_VERSION) ]
+
+	for value in values:
+		if not isStringy(value):
+			value = to_unicode(value)
+
+		value = tobytes(value)
+		valueLen = len(value)
+
+		if valueLen < _LONG_LENGTH_MARKER:
+			ret.append( _byteStruct.pack(valueLen) )
+		else:
+			ret.append( _longLengthStruct.pack(_LONG_LENGTH_MARKER, valueLen) )
+
+		ret.append(value)
+
+	return b''.join(ret)
+
+
+def unpackValues(data):
+	'''
+		unpackValues - Unpack a blob created by #packValues
+
+		@param data <bytes> - Packed blob
+
+		@return list<bytes> - The values, in the same order they were packed
+
+		@raises ValueError - If the blob is not in a known format
+	'''
+	if not data:
+		return []
+
+	data = tobytes(data)
+
+	(formatVersion, ) = _byteStruct.unpack_from(data, 0)
+	if formatVersion != _PACK_FORMAT_VERSION:
+		raise ValueError('Unknown packed value format version: %d' %(formatVersion, ))
+
+	ret = []
+	offset = 1
+	dataLen = len(data)
+	while offset < dataLen:
+		(valueLen, ) = _byteStruct.unpack_from(data, offset)
+		if valueLen == _LONG_LENGTH_MARKER:
+			(_, valueLen) = _longLengthStruct.unpack_from(data, offset)
+			offset += _longLengthStruct.size
+		else:
+			offset += 1
+
+		ret.append( data[offset : offset + valueLen] )
+		offset += valueLen
+
+	return ret
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
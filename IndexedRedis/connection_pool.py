@@ -0,0 +1,130 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# connection_pool - The redis.ConnectionPool used for the pools IndexedRedis manages (@see getRedisPool),
+#    which records checkout latency and usage statistics so pools can be sized under load.
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import threading
+import time
+
+import redis
+
+__all__ = ('IRConnectionPool', 'CHECKOUT_LATENCY_BUCKETS')
+
+# Upper bounds (in seconds) of the checkout latency histogram buckets. A final bucket holds everything slower.
+CHECKOUT_LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+
+class IRConnectionPool(redis.ConnectionPool):
+	'''
+		IRConnectionPool - A redis.ConnectionPool which keeps statistics on connection checkouts:
+
+		  * A histogram of how long each checkout took (including establishing a new connection, if one was needed)
+		  * The current number of in-use and idle connections, and the most ever in use at once
+		  * The number of checkouts which failed, either because the pool was exhausted (max_connections reached),
+		      or because a connection could not be established (e.x. timeout)
+
+		  @see #getStats
+	'''
+
+	def __init__(self, *args, **kwargs):
+		redis.ConnectionPool.__init__(self, *args, **kwargs)
+
+		self._statsLock = threading.Lock()
+		self.resetStats()
+
+	def resetStats(self):
+		'''
+			resetStats - Reset all counters and the latency histogram
+		'''
+		with self._statsLock:
+			self._numCheckouts = 0
+			self._numExhausted = 0
+			self._numErrors = 0
+			self._totalCheckoutTime = 0.0
+			self._maxCheckoutTime = 0.0
+			self._maxInUse = 0
+			self._latencyCounts = [0] * (len(CHECKOUT_LATENCY_BUCKETS) + 1)
+
+	def get_connection(self, *args, **kwargs):
+		start = time.time()
+		try:
+			connection = redis.ConnectionPool.get_connection(self, *args, **kwargs)
+		except Exception as e:
+			isExhausted = bool( isinstance(e, redis.ConnectionError) and 'Too many connections' in str(e) )
+			with self._statsLock:
+				if isExhausted:
+					self._numExhausted += 1
+				else:
+					self._numErrors += 1
+			raise
+
+		elapsed = time.time() - start
+
+		bucketIdx = 0
+		for bucketMax in CHECKOUT_LATENCY_BUCKETS:
+			if elapsed <= bucketMax:
+				break
+			bucketIdx += 1
+
+		numInUse = len(getattr(self, '_in_use_connections', ()))
+
+		with self._statsLock:
+			self._numCheckouts += 1
+			self._totalCheckoutTime += elapsed
+			if elapsed > self._maxCheckoutTime:
+				self._maxCheckoutTime = elapsed
+			if numInUse > self._maxInUse:
+				self._maxInUse = numInUse
+			self._latencyCounts[bucketIdx] += 1
+
+		return connection
+
+	def getStats(self):
+		'''
+			getStats - Get the statistics for this pool
+
+			@return dict - With the following keys:
+
+				host, port, db - The server this pool connects to
+				maxConnections <int/None> - The max_connections of this pool (None if unlimited)
+				inUse <int> - Number of connections currently checked out
+				idle <int> - Number of connections currently sitting in the pool
+				maxInUse <int> - The most connections ever checked out at once
+				numCheckouts <int> - Number of successful checkouts
+				numExhausted <int> - Number of checkouts which failed because max_connections was reached
+				numErrors <int> - Number of checkouts which failed for other reasons (e.x. connect timeout)
+				totalCheckoutTime <float> - Total seconds spent checking out connections
+				maxCheckoutTime <float> - Slowest checkout, in seconds
+				latencyHistogram list<tuple(float/None, int)> - (upper bound in seconds, count) for each bucket.
+				    The final bucket has an upper bound of None (everything slower than the last bound)
+		'''
+		maxConnections = getattr(self, 'max_connections', None)
+		# python-redis uses 2**31 to mean "unlimited"
+		if maxConnections is not None and maxConnections >= 2 ** 31:
+			maxConnections = None
+
+		connectionKwargs = getattr(self, 'connection_kwargs', {})
+
+		with self._statsLock:
+			return {
+				'host' : connectionKwargs.get('host', None),
+				'port' : connectionKwargs.get('port', None),
+				'db' : connectionKwargs.get('db', None),
+				'maxConnections' : maxConnections,
+				'inUse' : len(getattr(self, '_in_use_connections', ())),
+				'idle' : len(getattr(self, '_available_connections', ())),
+				'maxInUse' : self._maxInUse,
+				'numCheckouts' : self._numCheckouts,
+				'numExhausted' : self._numExhausted,
+				'numErrors' : self._numErrors,
+				'totalCheckoutTime' : self._totalCheckoutTime,
+				'maxCheckoutTime' : self._maxCheckoutTime,
+				'latencyHistogram' : list(zip( list(CHECKOUT_LATENCY_BUCKETS) + [None], self._latencyCounts )),
+			}
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
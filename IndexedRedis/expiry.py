@@ -0,0 +1,85 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# expiry - A background thread which periodically removes expired objects (@see IndexedRedisModel.DEFAULT_TTL)
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import sys
+import threading
+import traceback
+
+__all__ = ('ExpiryReaper', )
+
+
+class ExpiryReaper(threading.Thread):
+	'''
+		ExpiryReaper - A daemon thread which calls Model.objects.reapExpired on each of the given models every #interval seconds.
+
+		  Example:
+
+			reaper = IndexedRedis.ExpiryReaper([Session, RateLimitEntry], interval=5)
+			reaper.start()
+
+			...
+
+			reaper.stop()
+
+		  An exception while reaping (e.x. Redis is unreachable) is printed to stderr, and reaping is retried on the next interval.
+	'''
+
+	def __init__(self, models, interval=1.0, batchSize=None):
+		'''
+			__init__ - Create this reaper. Call #start to begin reaping.
+
+			@param models list<IndexedRedisModel> - The models to reap
+
+			@param interval <float> default 1.0 - Seconds to wait between each pass
+
+			@param batchSize <None/int> - Max number of objects deleted per call to Redis, or None for the reapExpired default
+		'''
+		threading.Thread.__init__(self)
+		self.daemon = True
+
+		self.models = list(models)
+		self.interval = interval
+		self.batchSize = batchSize
+
+		self._stopEvent = threading.Event()
+
+	def reapOnce(self):
+		'''
+			reapOnce - Reap every model once
+
+			@return <int> - Total number of objects deleted
+		'''
+		numDeleted = 0
+		for model in self.models:
+			try:
+				if self.batchSize is None:
+					numDeleted += model.objects.reapExpired()
+				else:
+					numDeleted += model.objects.reapExpired(self.batchSize)
+			except Exception:
+				sys.stderr.write('WARNING: IndexedRedis ExpiryReaper failed to reap expired %s objects:\n%s\n' %(model.__name__, traceback.format_exc()))
+
+		return numDeleted
+
+	def run(self):
+		while not self._stopEvent.is_set():
+			self.reapOnce()
+			self._stopEvent.wait(self.interval)
+
+	def stop(self, timeout=None):
+		'''
+			stop - Stop reaping, and wait for the thread to finish
+
+			@param timeout <None/float> - Max seconds to wait for the thread, or None to wait until it finishes
+		'''
+		self._stopEvent.set()
+		if self.is_alive():
+			self.join(timeout)
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
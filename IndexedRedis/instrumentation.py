@@ -0,0 +1,250 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# instrumentation - Observer hooks which receive an event (timings, sizes, counts) for each query, save, and delete operation
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import sys
+import threading
+import time
+import traceback
+
+__all__ = ('OperationEvent', 'OperationStatsAggregator', 'addOperationObserver', 'removeOperationObserver', 'clearOperationObservers')
+
+# The registered observers. This list is only ever modified in-place (under _observersLock),
+#   so an empty list (the common case) costs a single truth test per operation.
+global _observers
+_observers = []
+
+global _observersLock
+_observersLock = threading.Lock()
+
+
+class OperationEvent(object):
+	'''
+		OperationEvent - Describes one completed operation. Passed to every observer.
+
+		  model - The IndexedRedisModel class the operation was performed on
+		  operation <str> - Name of the operation (e.x. "getPrimaryKeys", "getMultiple", "save", "deleteMultiple", "reindex")
+		  numFilters <int> - Number of (positive) filters on the query, or 0 if not a query
+		  numNotFilters <int> - Number of negative (__ne) filters on the query, or 0 if not a query
+		  numMatched <int> - Number of primary keys matched, objects fetched, saved, or deleted
+		  numCommands <int> - Number of Redis commands sent
+		  replyBytes <int> - Approximate size of the replies (sum of the lengths of all returned values)
+		  redisTime <float> - Seconds spent waiting on Redis
+		  pythonTime <float> - Seconds spent in python (building commands, decoding replies into objects)
+		  totalTime <float> - Total seconds of the operation
+	'''
+
+	__slots__ = ('model', 'operation', 'numFilters', 'numNotFilters', 'numMatched', 'numCommands', 'replyBytes', 'redisTime', 'pythonTime', 'totalTime')
+
+	def __init__(self, model, operation, numFilters, numNotFilters, numMatched, numCommands, replyBytes, redisTime, totalTime):
+		self.model = model
+		self.operation = operation
+		self.numFilters = numFilters
+		self.numNotFilters = numNotFilters
+		self.numMatched = numMatched
+		self.numCommands = numCommands
+		self.replyBytes = replyBytes
+		self.redisTime = redisTime
+		self.pythonTime = max(totalTime - redisTime, 0.0)
+		self.totalTime = totalTime
+
+	def __repr__(self):
+		return 'OperationEvent(model=%s, operation=%s, numFilters=%d, numNotFilters=%d, numMatched=%d, numCommands=%d, replyBytes=%d, redisTime=%f, pythonTime=%f, totalTime=%f)' %( \
+			self.model.__name__, self.operation, self.numFilters, self.numNotFilters, self.numMatched, self.numCommands, self.replyBytes, self.redisTime, self.pythonTime, self.totalTime)
+
+
+def getReplySize(reply):
+	'''
+		getReplySize - Get the approximate size of a reply from Redis, as the sum of the lengths of all values within.
+
+		@param reply - A reply (or list of replies)
+
+		@return <int> - Number of bytes
+	'''
+	if reply is None:
+		return 0
+	if isinstance(reply, (bytes, str, type(u''))):
+		return len(reply)
+	if isinstance(reply, (list, tuple, set)):
+		return sum( [ getReplySize(item) for item in reply ] )
+	if isinstance(reply, dict):
+		return sum( [ getReplySize(key) + getReplySize(value) for key, value in reply.items() ] )
+	if isinstance(reply, Exception):
+		return 0
+
+	return len(str(reply))
+
+
+class OperationTimer(object):
+	'''
+		OperationTimer - Collects the timings and sizes of a single operation, and emits the event when finished.
+
+		  Only created (by startOperation) when there are observers.
+	'''
+
+	__slots__ = ('startTime', 'redisTime', 'numCommands', 'replyBytes', '_redisStartTime')
+
+	def __init__(self):
+		self.startTime = time.time()
+		self.redisTime = 0.0
+		self.numCommands = 0
+		self.replyBytes = 0
+		self._redisStartTime = None
+
+	def redisStart(self):
+		'''
+			redisStart - Mark that we are about to send commands to Redis
+		'''
+		self._redisStartTime = time.time()
+
+	def redisEnd(self, numCommands, reply):
+		'''
+			redisEnd - Mark that Redis has replied.
+
+			@param numCommands <int> - Number of commands which were sent since #redisStart
+
+			@param reply - The reply (or list of replies)
+		'''
+		self.redisTime += time.time() - self._redisStartTime
+		self.numCommands += numCommands
+		self.replyBytes += getReplySize(reply)
+
+	def finish(self, model, operation, numMatched, numFilters=0, numNotFilters=0):
+		'''
+			finish - Complete this operation, and send the event to all observers
+
+			@param model - The IndexedRedisModel class
+			@param operation <str> - Operation name
+			@param numMatched <int> - Number of pks matched / objects fetched, saved or deleted
+
+			@param numFilters <int> - Number of filters on the query
+			@param numNotFilters <int> - Number of negative filters on the query
+		'''
+		totalTime = time.time() - self.startTime
+		emitEvent( OperationEvent(model, operation, numFilters, numNotFilters, numMatched, self.numCommands, self.replyBytes, self.redisTime, totalTime) )
+
+
+def startOperation():
+	'''
+		startOperation - Start timing an operation, if anything is observing.
+
+		@return <OperationTimer/None> - A timer, or None if there are no observers
+	'''
+	if not _observers:
+		return None
+
+	return OperationTimer()
+
+
+def emitEvent(event):
+	'''
+		emitEvent - Send an event to all observers.
+
+		  An exception raised by an observer is printed to stderr, and does not affect the operation or other observers.
+
+		@param event <OperationEvent> - The event
+	'''
+	for observer in tuple(_observers):
+		try:
+			observer(event)
+		except Exception:
+			sys.stderr.write('WARNING: IndexedRedis operation observer %s raised an exception:\n%s\n' %(repr(observer), traceback.format_exc()))
+
+
+def addOperationObserver(observer):
+	'''
+		addOperationObserver - Register a function to be called with an OperationEvent after every query, save, and delete operation.
+
+		  Observers are called synchronously in the thread which performed the operation, so should be quick.
+
+		@param observer <callable> - Function taking a single argument, an OperationEvent. An OperationStatsAggregator can be used here.
+	'''
+	with _observersLock:
+		if observer not in _observers:
+			_observers.append(observer)
+
+def removeOperationObserver(observer):
+	'''
+		removeOperationObserver - Unregister an observer added by addOperationObserver
+
+		@param observer <callable> - The observer
+
+		@return <bool> - True if the observer was registered
+	'''
+	with _observersLock:
+		if observer in _observers:
+			_observers.remove(observer)
+			return True
+
+	return False
+
+def clearOperationObservers():
+	'''
+		clearOperationObservers - Unregister all observers
+	'''
+	with _observersLock:
+		del _observers[:]
+
+
+class OperationStatsAggregator(object):
+	'''
+		OperationStatsAggregator - An observer which aggregates events in memory, per model per operation.
+
+		  Example:
+
+			aggregator = OperationStatsAggregator()
+			IndexedRedis.addOperationObserver(aggregator)
+
+			...
+
+			for (keyName, operation), stats in aggregator.getStats().items():
+				print ( "%s.%s: %d calls, %f avg seconds" %(keyName, operation, stats['count'], stats['totalTime'] / stats['count']) )
+	'''
+
+	STAT_KEYS = ('count', 'totalTime', 'maxTime', 'redisTime', 'pythonTime', 'numCommands', 'replyBytes', 'numMatched')
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._stats = {}
+
+	def __call__(self, event):
+		key = (event.model.KEY_NAME, event.operation)
+
+		with self._lock:
+			stats = self._stats.get(key, None)
+			if stats is None:
+				stats = self._stats[key] = dict( [ (statKey, 0) for statKey in self.STAT_KEYS ] )
+
+			stats['count'] += 1
+			stats['totalTime'] += event.totalTime
+			if event.totalTime > stats['maxTime']:
+				stats['maxTime'] = event.totalTime
+			stats['redisTime'] += event.redisTime
+			stats['pythonTime'] += event.pythonTime
+			stats['numCommands'] += event.numCommands
+			stats['replyBytes'] += event.replyBytes
+			stats['numMatched'] += event.numMatched
+
+	def getStats(self):
+		'''
+			getStats - Get the aggregated stats
+
+			@return dict< tuple(str, str) : dict > - Map of (model KEY_NAME, operation) to a dict of totals (see STAT_KEYS), where
+			    count is the number of events, maxTime is the slowest single event, and all others are sums.
+		'''
+		with self._lock:
+			return dict( [ (key, stats.copy()) for key, stats in self._stats.items() ] )
+
+	def reset(self):
+		'''
+			reset - Clear all aggregated stats
+		'''
+		with self._lock:
+			self._stats.clear()
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
@@ -0,0 +1,51 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# resp - Encoding of Redis commands in the Redis protocol (RESP), as sent on the wire.
+#    Used by IndexedRedisSave.exportRESP to generate input for "redis-cli --pipe"
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+from .compat_str import tobytes, to_unicode, isStringy
+
+__all__ = ('encodeCommand', )
+
+
+def _encodeArg(arg):
+	'''
+		_encodeArg - Convert a single command argument to bytes, the same way redis-py does
+
+		@param arg - str, bytes, int or float
+
+		@return <bytes>
+	'''
+	if isinstance(arg, float):
+		arg = repr(arg)
+	elif not isStringy(arg):
+		arg = to_unicode(arg)
+
+	return tobytes(arg)
+
+
+def encodeCommand(command):
+	'''
+		encodeCommand - Encode a command as a RESP array of bulk strings.
+
+		@param command list/tuple - The command name followed by its arguments
+
+		@return <bytes> - The encoded command
+	'''
+	ret = [ tobytes('*%d\r\n' %(len(command), )) ]
+
+	for arg in command:
+		arg = _encodeArg(arg)
+
+		ret.append( tobytes('$%d\r\n' %(len(arg), )) )
+		ret.append(arg)
+		ret.append(b'\r\n')
+
+	return b''.join(ret)
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
@@ -0,0 +1,1028 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# scripts - Lua scripts run server-side by IndexedRedis, and a helper to call them by sha
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import hashlib
+
+from redis.exceptions import NoScriptError
+
+__all__ = ('LuaScript', 'PLANNER_SCRIPT', 'PLANNER_PROBE_MAX_CARDINALITY', 'DELETE_SCRIPT', 'UPDATE_SCRIPT', 'INCREMENT_SCRIPT', 'VERSION_CHECK_SCRIPT', 'RAISE_NEXT_ID_SCRIPT', 'PACKED_MERGE_SCRIPT')
+
+
+class LuaScript(object):
+	'''
+		LuaScript - A Lua script, which is called by its sha (EVALSHA), and sent in full (EVAL) only if the server does not yet have it cached.
+
+		  Unlike redis.client.Script, this is not tied to any one connection, so a single instance can be used with any connection
+		    (including coalescing connections).
+	'''
+
+	def __init__(self, source):
+		'''
+			__init__ - Create this script
+
+			@param source <str> - Lua source
+		'''
+		self.source = source
+		self.sha = hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+	def __call__(self, conn, keys, args):
+		'''
+			__call__ - Run this script
+
+			@param conn <redis.Redis> - Connection
+
+			@param keys list<str> - KEYS
+
+			@param args list - ARGV
+
+			@return - The reply from the script
+		'''
+		numKeys = len(keys)
+		try:
+			return conn.evalsha(self.sha, numKeys, *(list(keys) + list(args)))
+		except NoScriptError:
+			# EVAL will also load the script, so future calls can use EVALSHA
+			return conn.eval(self.source, numKeys, *(list(keys) + list(args)))
+
+
+# Largest set the planner will iterate and probe (SMISMEMBER/SISMEMBER) against the other sets, instead of
+#   running SINTER / SDIFF.
+PLANNER_PROBE_MAX_CARDINALITY = 1000
+
+# PLANNER_SCRIPT - Find the primary keys matching a set of filters.
+#
+#   KEYS - [ idsKey, tempKey, positiveIndexKey1, ... , negativeIndexKey1, ... ,
+#              unionTempKey1, group1IndexKey1, group1IndexKey2, ... , unionTempKey2, group2IndexKey1, ... ]
+#   ARGV - [ numPositiveIndexKeys, probeMaxCardinality, numNegativeIndexKeys, mode, offset, limit, afterPk,
+#              dataKeyPrefix, sortField, sortType, sortDesc, numGetFields, getField1, getField2, ... ,
+#              numKeysInGroup1, numKeysInGroup2, ... ]
+#
+#   A "group" is an OR (or __in) filter, which matches members of any of its index keys.
+#
+#   mode is one of:
+#     "keys" - Return all the matching primary keys (only the filter arguments are used)
+#     "exists" - Return 1 if any object matches, otherwise 0 (only the filter arguments are used). The smallest index is read
+#                 in batches (SSCAN), and the first match found returns right away.
+#     "sample" - Return up to #limit distinct random matching primary keys (only the filter arguments and limit are used).
+#                 SRANDMEMBER is used on the single set of results, which is first stored in tempKey if it is an intersection / difference.
+#     "store" - Store the matching primary keys in tempKey (which is NOT removed), and return the number stored (only the filter arguments are used)
+#     "count" - Return the number of matching primary keys (only the filter arguments are used). Large results are never
+#                 transferred or copied into Lua: SINTERCARD is used on Redis 7+, otherwise SINTERSTORE / SDIFFSTORE into tempKey
+#                 (which return the cardinality), followed by DEL.
+#     "page" - Return the matching primary keys greater than afterPk (or all, if afterPk is ""), sorted,
+#                skipping the first #offset and returning at most #limit (or all, if limit is -1).
+#
+#                Results are sorted by the hash field #sortField of each object (dataKeyPrefix .. pk), or by primary key if sortField is "".
+#                  sortType is "ALPHA" to compare as strings, or "NUM" to compare as numbers. sortDesc is "1" for descending order.
+#                  afterPk may only be used when sorting by primary key.
+#
+#                If numGetFields is not 0, the result is instead, for each matched object, the primary key followed by the value of each getField.
+#
+#                Redis SORT (BY dataKeyPrefix*->sortField, LIMIT, GET) is used on the single existing set of results, or on the results
+#                  stored in tempKey (SINTERSTORE / SDIFFSTORE, so large results are never copied into Lua). Small probed results are sorted in Lua.
+#                  When afterPk is set, the set of results is instead read in batches (SSCAN), keeping only the smallest offset + limit
+#                  primary keys after the cursor (in a heap), so the results are never held or sorted in full.
+#                  When SORT can't be used (a numeric sort on a field holding non-numeric values, like null) the sort is done in Lua,
+#                  with non-numeric values (null) first in ascending order.
+#
+#   The cardinality of every positive index is checked first, and if any is empty, the result is empty without any further work.
+#   Empty negative indexes are dropped. The positive indexes are then ordered smallest-first, and:
+#
+#     * If the smallest positive index has at most probeMaxCardinality members, its members are probed against each other index (smallest first),
+#         narrowing the candidates as it goes, so the work is proportional to the size of the smallest index.
+#         Groups are probed the same way (a candidate is kept if it is a member of any of the group's indexes).
+#     * Otherwise, each group is unioned into its unionTempKey (SUNIONSTORE), and used as a positive index.
+#         SINTER (and SDIFF, through tempKey, for negative filters) are used unless a union makes probing possible.
+#
+#   All temporary keys are removed before returning (except tempKey in "store" mode).
+PLANNER_SCRIPT = LuaScript("""
+local idsKey = KEYS[1]
+local tempKey = KEYS[2]
+local numPositive = tonumber(ARGV[1])
+local probeMax = tonumber(ARGV[2])
+local numNegative = tonumber(ARGV[3])
+local mode = ARGV[4]
+local offset = tonumber(ARGV[5])
+local limit = tonumber(ARGV[6])
+local afterPk = tonumber(ARGV[7])
+local dataKeyPrefix = ARGV[8]
+local sortField = ARGV[9]
+local sortAlpha = (ARGV[10] == 'ALPHA')
+local sortDesc = (ARGV[11] == '1')
+local numGetFields = tonumber(ARGV[12])
+local getFields = {}
+for i = 1, numGetFields do
+	getFields[i] = ARGV[12 + i]
+end
+local FIRST_GROUP_ARG = 13 + numGetFields
+
+local unionTempKeys = {}
+
+-- In "page" mode, large results are stored in tempKey like "store" mode, to be sorted there
+local storeResult = (mode == 'store' or mode == 'page')
+
+local function isError(reply)
+	return type(reply) == 'table' and reply.err ~= nil
+end
+
+-- storeMembers - Add members (a Lua table) to the set at key, in bounded chunks
+local function storeMembers(key, members)
+	local start = 1
+	while start <= #members do
+		local stop = math.min(start + 999, #members)
+		redis.call('SADD', key, unpack(members, start, stop))
+		start = stop + 1
+	end
+end
+
+-- setResult - Run a set command (SMEMBERS, SINTER, SDIFF) for the result. In "count" mode, get just the cardinality of its result instead,
+--   in "sample" mode, #limit random members of its result, and in "store" and "page" modes, store its result in tempKey and return its cardinality.
+local function setResult(cmd, ...)
+	if storeResult then
+		if cmd == 'SMEMBERS' then
+			cmd = 'SUNION'
+		end
+		return redis.call(cmd .. 'STORE', tempKey, ...)
+	end
+
+	if mode ~= 'count' and mode ~= 'sample' then
+		return redis.call(cmd, ...)
+	end
+
+	if cmd == 'SMEMBERS' then
+		if mode == 'sample' then
+			return redis.call('SRANDMEMBER', ..., limit)
+		end
+		return redis.call('SCARD', ...)
+	end
+
+	if mode == 'sample' then
+		redis.call(cmd .. 'STORE', tempKey, ...)
+		local ret = redis.call('SRANDMEMBER', tempKey, limit)
+		redis.call('DEL', tempKey)
+		return ret
+	end
+
+	if cmd == 'SINTER' then
+		-- SINTERCARD requires Redis 7.0
+		local card = redis.pcall('SINTERCARD', select('#', ...), ...)
+		if not isError(card) then
+			return card
+		end
+	end
+
+	local card = redis.call(cmd .. 'STORE', tempKey, ...)
+	redis.call('DEL', tempKey)
+	return card
+end
+
+-- probe - Split the candidates into those which are, and those which are not, members of the set at key
+local function probe(key, candidates)
+	local members = {}
+	local nonMembers = {}
+	local numCandidates = #candidates
+	local start = 1
+	while start <= numCandidates do
+		local stop = math.min(start + 999, numCandidates)
+		local isMember = redis.pcall('SMISMEMBER', key, unpack(candidates, start, stop))
+		if isError(isMember) then
+			-- SMISMEMBER requires Redis 6.2
+			isMember = {}
+			for i = start, stop do
+				isMember[i - start + 1] = redis.call('SISMEMBER', key, candidates[i])
+			end
+		end
+		for i = start, stop do
+			if isMember[i - start + 1] == 1 then
+				members[#members + 1] = candidates[i]
+			else
+				nonMembers[#nonMembers + 1] = candidates[i]
+			end
+		end
+		start = stop + 1
+	end
+	return members, nonMembers
+end
+
+-- narrow - Narrow down the candidates by probing the positive indexes (starting at #first), groups, and negative indexes
+local function narrow(candidates, positive, first, negative, groups)
+	for i = first, #positive do
+		candidates = probe(positive[i][1], candidates)
+		if #candidates == 0 then
+			return candidates
+		end
+	end
+	for _, group in ipairs(groups) do
+		local matched = {}
+		local remaining = candidates
+		for _, key in ipairs(group) do
+			local members
+			members, remaining = probe(key, remaining)
+			for _, member in ipairs(members) do
+				matched[#matched + 1] = member
+			end
+			if #remaining == 0 then
+				break
+			end
+		end
+		candidates = matched
+		if #candidates == 0 then
+			return candidates
+		end
+	end
+	for _, key in ipairs(negative) do
+		local members
+		members, candidates = probe(key, candidates)
+		if #candidates == 0 then
+			return candidates
+		end
+	end
+	return candidates
+end
+
+-- probeAll - Narrow down the members of the first positive index by probing all the other indexes and groups
+local function probeAll(positive, negative, groups)
+	return narrow(redis.call('SMEMBERS', positive[1][1]), positive, 2, negative, groups)
+end
+
+-- readFilters - Read the filter keys, returning the positive indexes as { key, cardinality } sorted smallest-first (or nil, if any
+--   are empty), the negative indexes which exist, the groups (a list of index keys each), and the temp key of each group
+local function readFilters()
+	local positive = {}
+	for i = 1, numPositive do
+		local key = KEYS[2 + i]
+		local card = redis.call('SCARD', key)
+		if card == 0 then
+			return nil
+		end
+		positive[i] = { key, card }
+	end
+
+	local negative = {}
+	for i = 3 + numPositive, 2 + numPositive + numNegative do
+		if redis.call('EXISTS', KEYS[i]) == 1 then
+			negative[#negative + 1] = KEYS[i]
+		end
+	end
+
+	local groups = {}
+	local groupTempKeys = {}
+	local keyIdx = 3 + numPositive + numNegative
+	for i = FIRST_GROUP_ARG, #ARGV do
+		local groupSize = tonumber(ARGV[i])
+		groupTempKeys[#groupTempKeys + 1] = KEYS[keyIdx]
+		local group = {}
+		for j = 1, groupSize do
+			group[j] = KEYS[keyIdx + j]
+		end
+		groups[#groups + 1] = group
+		keyIdx = keyIdx + groupSize + 1
+	end
+
+	table.sort(positive, function(a, b) return a[2] < b[2] end)
+
+	return positive, negative, groups, groupTempKeys
+end
+
+-- anyMatch - Check if any object matches, returning 1 as soon as one is found (otherwise 0). Candidates are read in batches
+--   with SSCAN from the smallest positive index (or the smallest group, or all ids if there are neither), and probed against the rest.
+local function anyMatch()
+	local positive, negative, groups = readFilters()
+	if positive == nil then
+		return 0
+	end
+
+	local sources = { idsKey }
+	local firstPositive = 1
+	if #positive > 0 then
+		sources = { positive[1][1] }
+		firstPositive = 2
+	elseif #groups > 0 then
+		local smallestIdx = nil
+		local smallestCard = nil
+		for i, group in ipairs(groups) do
+			local card = 0
+			for _, key in ipairs(group) do
+				card = card + redis.call('SCARD', key)
+			end
+			if card == 0 then
+				return 0
+			end
+			if smallestCard == nil or card < smallestCard then
+				smallestIdx = i
+				smallestCard = card
+			end
+		end
+		sources = table.remove(groups, smallestIdx)
+	end
+
+	for _, source in ipairs(sources) do
+		local cursor = '0'
+		repeat
+			local reply = redis.call('SSCAN', source, cursor, 'COUNT', 100)
+			cursor = reply[1]
+			if #reply[2] > 0 and #narrow(reply[2], positive, firstPositive, negative, groups) > 0 then
+				return 1
+			end
+		until cursor == '0'
+	end
+
+	return 0
+end
+
+local function run()
+	local positive, negative, groups, groupTempKeys = readFilters()
+	if positive == nil then
+		return {}
+	end
+
+	if #positive > 0 and positive[1][2] <= probeMax and (#positive > 1 or #negative > 0 or #groups > 0) then
+		return probeAll(positive, negative, groups)
+	end
+
+	-- Materialize the groups, so they can be used as positive indexes
+	for i, group in ipairs(groups) do
+		local card = redis.call('SUNIONSTORE', groupTempKeys[i], unpack(group))
+		unionTempKeys[#unionTempKeys + 1] = groupTempKeys[i]
+		if card == 0 then
+			return {}
+		end
+		positive[#positive + 1] = { groupTempKeys[i], card }
+	end
+
+	if #positive == 0 then
+		if #negative == 0 then
+			return setResult('SMEMBERS', idsKey)
+		end
+		return setResult('SDIFF', idsKey, unpack(negative))
+	end
+
+	table.sort(positive, function(a, b) return a[2] < b[2] end)
+
+	if positive[1][2] <= probeMax and (#positive > 1 or #negative > 0) then
+		return probeAll(positive, negative, {})
+	end
+
+	local positiveKeys = {}
+	for i = 1, #positive do
+		positiveKeys[i] = positive[i][1]
+	end
+
+	if #negative == 0 then
+		if #positiveKeys == 1 then
+			return setResult('SMEMBERS', positiveKeys[1])
+		end
+		return setResult('SINTER', unpack(positiveKeys))
+	end
+
+	if #positiveKeys == 1 then
+		return setResult('SDIFF', positiveKeys[1], unpack(negative))
+	end
+
+	redis.call('SINTERSTORE', tempKey, unpack(positiveKeys))
+	local ret = setResult('SDIFF', tempKey, unpack(negative))
+	if not storeResult then
+		redis.call('DEL', tempKey)
+	end
+	return ret
+end
+
+-- sortKey - Run SORT on the set at key, returning the requested page (or an error reply, if the values are not numeric)
+local function sortKey(key)
+	local args = { 'SORT', key }
+	if sortField ~= '' then
+		args[#args + 1] = 'BY'
+		args[#args + 1] = dataKeyPrefix .. '*->' .. sortField
+	end
+	if sortAlpha then
+		args[#args + 1] = 'ALPHA'
+	end
+	if sortDesc then
+		args[#args + 1] = 'DESC'
+	end
+	args[#args + 1] = 'LIMIT'
+	args[#args + 1] = offset
+	args[#args + 1] = limit
+	if numGetFields > 0 then
+		args[#args + 1] = 'GET'
+		args[#args + 1] = '#'
+		for _, field in ipairs(getFields) do
+			args[#args + 1] = 'GET'
+			args[#args + 1] = dataKeyPrefix .. '*->' .. field
+		end
+	end
+	return redis.pcall(unpack(args))
+end
+
+-- sortMembers - Sort primary keys in Lua, returning a list of { pk, sortValue }
+local function sortMembers(members)
+	local items = {}
+	for _, member in ipairs(members) do
+		local pk = tonumber(member)
+		if sortField == '' then
+			if afterPk == nil or pk > afterPk then
+				items[#items + 1] = { pk, pk }
+			end
+		else
+			local value = redis.call('HGET', dataKeyPrefix .. member, sortField)
+			if not sortAlpha then
+				value = tonumber(value)
+			elseif value == false then
+				value = nil
+			end
+			items[#items + 1] = { pk, value }
+		end
+	end
+
+	table.sort(items, function(a, b)
+		local aValue = a[2]
+		local bValue = b[2]
+		if aValue == bValue then
+			return a[1] < b[1]
+		end
+		if aValue == nil then
+			return not sortDesc
+		end
+		if bValue == nil then
+			return sortDesc
+		end
+		if sortDesc then
+			return aValue > bValue
+		end
+		return aValue < bValue
+	end)
+
+	return items
+end
+
+-- slice - Get the primary keys on the requested page of sorted items
+local function slice(items)
+	local stop = #items
+	if limit >= 0 then
+		stop = math.min(stop, offset + limit)
+	end
+
+	local ret = {}
+	for i = offset + 1, stop do
+		ret[#ret + 1] = items[i][1]
+	end
+	return ret
+end
+
+-- attachFields - If getFields were requested, follow each primary key with the values of those fields
+local function attachFields(pks)
+	if numGetFields == 0 then
+		return pks
+	end
+
+	local ret = {}
+	for _, pk in ipairs(pks) do
+		ret[#ret + 1] = pk
+		local values = redis.call('HMGET', dataKeyPrefix .. pk, unpack(getFields))
+		for i = 1, numGetFields do
+			ret[#ret + 1] = values[i]
+		end
+	end
+	return ret
+end
+
+-- pageAfterPk - Get the page of primary keys greater than afterPk in the set at key, in order. The set is read in batches (SSCAN),
+--   keeping only the smallest offset + limit primary keys in a max-heap, so the work is O(N log(offset + limit)) and the set is never held in full.
+local function pageAfterPk(key)
+	local keep = -1
+	if limit >= 0 then
+		keep = offset + limit
+		if keep == 0 then
+			return {}
+		end
+	end
+
+	local heap = {}
+	local inHeap = {}
+
+	local function siftDown()
+		local i = 1
+		local size = #heap
+		while true do
+			local largest = i
+			local left = i * 2
+			local right = left + 1
+			if left <= size and heap[left] > heap[largest] then
+				largest = left
+			end
+			if right <= size and heap[right] > heap[largest] then
+				largest = right
+			end
+			if largest == i then
+				return
+			end
+			heap[i], heap[largest] = heap[largest], heap[i]
+			i = largest
+		end
+	end
+
+	local function push(pk)
+		heap[#heap + 1] = pk
+		if keep < 0 then
+			return
+		end
+		local i = #heap
+		while i > 1 do
+			local parent = math.floor(i / 2)
+			if heap[parent] >= heap[i] then
+				return
+			end
+			heap[i], heap[parent] = heap[parent], heap[i]
+			i = parent
+		end
+	end
+
+	local cursor = '0'
+	repeat
+		local reply = redis.call('SSCAN', key, cursor, 'COUNT', 1000)
+		cursor = reply[1]
+		for _, member in ipairs(reply[2]) do
+			local pk = tonumber(member)
+			if pk > afterPk and not inHeap[pk] then
+				if keep < 0 or #heap < keep then
+					push(pk)
+					inHeap[pk] = true
+				elseif pk < heap[1] then
+					inHeap[heap[1]] = nil
+					heap[1] = pk
+					inHeap[pk] = true
+					siftDown()
+				end
+			end
+		end
+	until cursor == '0'
+
+	table.sort(heap)
+
+	local ret = {}
+	for i = offset + 1, #heap do
+		ret[#ret + 1] = heap[i]
+	end
+	return ret
+end
+
+-- pageOfKey - Get the requested page of the set of results at key
+local function pageOfKey(key)
+	if afterPk ~= nil then
+		return attachFields(pageAfterPk(key))
+	end
+
+	local ret = sortKey(key)
+	if not isError(ret) then
+		return ret
+	end
+
+	return attachFields(slice(sortMembers(redis.call('SMEMBERS', key))))
+end
+
+if mode == 'page' and numNegative == 0 and numPositive <= 1 and #ARGV < FIRST_GROUP_ARG then
+	-- The results are a single existing set
+	local key = idsKey
+	if numPositive == 1 then
+		key = KEYS[3]
+	end
+
+	return pageOfKey(key)
+end
+
+if mode == 'exists' then
+	return anyMatch()
+end
+
+local ret = run()
+if #unionTempKeys > 0 then
+	redis.call('DEL', unpack(unionTempKeys))
+end
+
+if mode == 'store' then
+	if type(ret) == 'table' then
+		-- Probed (small) or empty result
+		storeMembers(tempKey, ret)
+		return #ret
+	end
+	return ret
+end
+
+if mode == 'count' then
+	if type(ret) == 'table' then
+		-- Probed (small) or empty result
+		return #ret
+	end
+	return ret
+end
+
+if mode == 'sample' and #ret > limit then
+	-- Probed result, pick from it with SRANDMEMBER
+	storeMembers(tempKey, ret)
+
+	ret = redis.call('SRANDMEMBER', tempKey, limit)
+	redis.call('DEL', tempKey)
+	return ret
+end
+
+if mode ~= 'page' then
+	return ret
+end
+
+if type(ret) ~= 'table' then
+	-- Large result, stored in tempKey
+	local page = pageOfKey(tempKey)
+	redis.call('DEL', tempKey)
+	return page
+end
+
+if sortField ~= '' and #ret > 0 then
+	-- Sorting by a field, let SORT do it, which can read the field values directly
+	storeMembers(tempKey, ret)
+
+	local sorted = sortKey(tempKey)
+	redis.call('DEL', tempKey)
+	if not isError(sorted) then
+		return sorted
+	end
+end
+
+return attachFields(slice(sortMembers(ret)))
+""")
+
+
+# DELETE_SCRIPT - Delete objects by primary key, removing each from its indexes, the ids set, and the expires set, and deleting its hash.
+#
+#   KEYS - [ idsKey, expiresKey ] or [ idsKey, expiresKey, sourceKey ]
+#   ARGV - [ keyPrefix ("_ir_|KEY_NAME:"), numIndexedFields, indexedFieldName1, indexValueHashField1, ... , source, sourceArg1, ... ]
+#
+#   indexValueHashField is the hash field holding the object's index value of that field: the recorded index value
+#     (like "_ir_i_name") for fields where it can differ from the stored value (hashIndex, etc), otherwise the stored value itself (like "name").
+#
+#   source is one of:
+#     "pks" - The sourceArgs are the primary keys to delete
+#     "set" - sourceArgs are [ batchSize ]. Up to batchSize primary keys are popped (SPOP) from the set at sourceKey, and deleted.
+#     "expired" - sourceArgs are [ now, batchSize ]. Up to batchSize primary keys with a deadline (score in the expires set) at or before now are deleted.
+#
+#   The index keys of each object are built from the index values held on the object (the indexValueHashField of each indexed field).
+#     Objects missing any of them (saved by an older IndexedRedis without recorded index values, or without a field added since) are left alone,
+#     and their primary keys returned, to be deleted the old way.
+#
+#   Returns - [ numDeleted, numRemaining (members left in sourceKey, or expired primary keys left, or 0), notRecordedPk1, notRecordedPk2, ... ]
+DELETE_SCRIPT = LuaScript("""
+local idsKey = KEYS[1]
+local expiresKey = KEYS[2]
+local keyPrefix = ARGV[1]
+local numIndexedFields = tonumber(ARGV[2])
+
+local indexedFields = {}
+local indexValueFields = {}
+for i = 1, numIndexedFields do
+	indexedFields[i] = ARGV[1 + (i * 2)]
+	indexValueFields[i] = ARGV[2 + (i * 2)]
+end
+
+local sourceArg = 3 + (numIndexedFields * 2)
+local source = ARGV[sourceArg]
+
+local pks = {}
+if source == 'set' then
+	pks = redis.call('SPOP', KEYS[3], tonumber(ARGV[sourceArg + 1]))
+elseif source == 'expired' then
+	pks = redis.call('ZRANGEBYSCORE', expiresKey, '-inf', ARGV[sourceArg + 1], 'LIMIT', 0, tonumber(ARGV[sourceArg + 2]))
+else
+	for i = sourceArg + 1, #ARGV do
+		pks[#pks + 1] = ARGV[i]
+	end
+end
+
+local numDeleted = 0
+local notRecorded = {}
+
+for _, pk in ipairs(pks) do
+	local dataKey = keyPrefix .. 'data:' .. pk
+
+	local indexValues = {}
+	if numIndexedFields > 0 then
+		indexValues = redis.call('HMGET', dataKey, unpack(indexValueFields))
+	end
+
+	local isRecorded = true
+	for j = 1, numIndexedFields do
+		if indexValues[j] == false then
+			isRecorded = false
+			break
+		end
+	end
+
+	if not isRecorded and redis.call('EXISTS', dataKey) == 1 then
+		notRecorded[#notRecorded + 1] = pk
+	else
+		if isRecorded then
+			for j = 1, numIndexedFields do
+				redis.call('SREM', keyPrefix .. 'idx:' .. indexedFields[j] .. ':' .. indexValues[j], pk)
+			end
+			numDeleted = numDeleted + redis.call('DEL', dataKey)
+		end
+		redis.call('SREM', idsKey, pk)
+		redis.call('ZREM', expiresKey, pk)
+	end
+end
+
+local numRemaining = 0
+if source == 'set' then
+	numRemaining = redis.call('SCARD', KEYS[3])
+elseif source == 'expired' then
+	numRemaining = redis.call('ZCOUNT', expiresKey, '-inf', ARGV[sourceArg + 1]) - #notRecorded
+end
+
+local ret = { numDeleted, numRemaining }
+for _, pk in ipairs(notRecorded) do
+	ret[#ret + 1] = pk
+end
+return ret
+""")
+
+
+# UPDATE_SCRIPT - Set some fields on objects by primary key, without fetching them, moving each between index sets as needed.
+#
+#   KEYS - [ ] or [ sourceKey ]
+#   ARGV - [ keyPrefix ("_ir_|KEY_NAME:"), versionField ("" if not VERSIONED), numValues, hashFieldName1, value1, ... ,
+#              numIndexedFields, indexedFieldName1, indexValueHashField1, newIndexValue1, ... , source, sourceArg1, ... ]
+#
+#   The values are the storage form of the non-packed fields being set (including any indexed fields), and the indexed fields
+#     are those of them which are indexed, with their new index values. indexValueHashField is as for DELETE_SCRIPT (when it is the field
+#     itself, it is set to the new index value, which is also its new stored value). If versionField is set, each updated object's version is bumped.
+#
+#   source is one of:
+#     "pks" - The sourceArgs are the primary keys to update
+#     "set" - sourceArgs are [ batchSize ]. Up to batchSize primary keys are popped (SPOP) from the set at sourceKey, and updated.
+#
+#   Primary keys without an object are skipped. The old index keys of each object are built from the index values held
+#     on the object (@see DELETE_SCRIPT). Objects missing any of the updated fields' index values (saved by an older IndexedRedis)
+#     are left alone, and their primary keys returned, to be updated the old way.
+#
+#   Returns - [ numUpdated, numRemaining (members left in sourceKey, or 0), notRecordedPk1, notRecordedPk2, ... ]
+UPDATE_SCRIPT = LuaScript("""
+local keyPrefix = ARGV[1]
+local versionField = ARGV[2]
+local numValues = tonumber(ARGV[3])
+
+local values = {}
+for i = 4, 3 + (numValues * 2) do
+	values[#values + 1] = ARGV[i]
+end
+
+local indexedArg = 4 + (numValues * 2)
+local numIndexedFields = tonumber(ARGV[indexedArg])
+
+local indexedFields = {}
+local indexValueFields = {}
+local newIndexValues = {}
+for i = 1, numIndexedFields do
+	indexedFields[i] = ARGV[indexedArg + (i * 3) - 2]
+	indexValueFields[i] = ARGV[indexedArg + (i * 3) - 1]
+	newIndexValues[i] = ARGV[indexedArg + (i * 3)]
+end
+
+local sourceArg = indexedArg + 1 + (numIndexedFields * 3)
+local source = ARGV[sourceArg]
+
+local pks = {}
+if source == 'set' then
+	pks = redis.call('SPOP', KEYS[1], tonumber(ARGV[sourceArg + 1]))
+else
+	for i = sourceArg + 1, #ARGV do
+		pks[#pks + 1] = ARGV[i]
+	end
+end
+
+local numUpdated = 0
+local notRecorded = {}
+
+for _, pk in ipairs(pks) do
+	local dataKey = keyPrefix .. 'data:' .. pk
+
+	if redis.call('EXISTS', dataKey) == 1 then
+		local oldIndexValues = {}
+		if numIndexedFields > 0 then
+			oldIndexValues = redis.call('HMGET', dataKey, unpack(indexValueFields))
+		end
+
+		local isRecorded = true
+		for j = 1, numIndexedFields do
+			if oldIndexValues[j] == false then
+				isRecorded = false
+				break
+			end
+		end
+
+		if not isRecorded then
+			notRecorded[#notRecorded + 1] = pk
+		else
+			for j = 1, numIndexedFields do
+				if oldIndexValues[j] ~= newIndexValues[j] then
+					redis.call('SREM', keyPrefix .. 'idx:' .. indexedFields[j] .. ':' .. oldIndexValues[j], pk)
+					redis.call('SADD', keyPrefix .. 'idx:' .. indexedFields[j] .. ':' .. newIndexValues[j], pk)
+					redis.call('HSET', dataKey, indexValueFields[j], newIndexValues[j])
+				end
+			end
+			if numValues > 0 then
+				redis.call('HMSET', dataKey, unpack(values))
+			end
+			if versionField ~= '' then
+				redis.call('HINCRBY', dataKey, versionField, 1)
+			end
+			numUpdated = numUpdated + 1
+		end
+	end
+end
+
+local numRemaining = 0
+if source == 'set' then
+	numRemaining = redis.call('SCARD', KEYS[1])
+end
+
+local ret = { numUpdated, numRemaining }
+for _, pk in ipairs(notRecorded) do
+	ret[#ret + 1] = pk
+end
+return ret
+""")
+
+
+# INCREMENT_SCRIPT - Atomically add to a numeric field of an object, moving it between index sets if the field is indexed.
+#
+#   KEYS - [ dataKey ]
+#   ARGV - [ hashFieldName, delta, decimalPlaces ("" for an integer field), indexKeyPrefix ("" if not indexed, else "_ir_|KEY_NAME:idx:fieldName:"),
+#              indexValueHashField ("" if the index value is not recorded), pk, versionField ("" if not VERSIONED, else the object's version is bumped) ]
+#
+#   Integer fields use HINCRBY. Fixed point fields use HINCRBYFLOAT, and the result is rewritten formatted to decimalPlaces
+#     (matching IRFixedPointField.toStorage). The field must not use hashIndex, as the new index value is the new stored value.
+#     A field missing from the hash counts as 0.
+#
+#   The old index value is the one recorded on the object (@see DELETE_SCRIPT) or, if not recorded, the old stored value.
+#     The new index value is recorded only if indexValueHashField is given.
+#
+#   Returns - nil if there is no object, [ 1, newValue ] if incremented, or [ 0, currentValue ] if the current value is not a number.
+INCREMENT_SCRIPT = LuaScript("""
+local dataKey = KEYS[1]
+local hashFieldName = ARGV[1]
+local delta = ARGV[2]
+local decimalPlaces = ARGV[3]
+local indexKeyPrefix = ARGV[4]
+local indexValueHashField = ARGV[5]
+local pk = ARGV[6]
+local versionField = ARGV[7]
+
+if redis.call('EXISTS', dataKey) == 0 then
+	return nil
+end
+
+local current = redis.call('HGET', dataKey, hashFieldName)
+if current ~= false and tonumber(current) == nil then
+	return { 0, current }
+end
+
+local newValue
+if decimalPlaces == '' then
+	if current ~= false and string.find(current, '[.eE]') then
+		return { 0, current }
+	end
+	redis.call('HINCRBY', dataKey, hashFieldName, delta)
+	-- Read back as the stored string, rather than formatting the (double) Lua number
+	newValue = redis.call('HGET', dataKey, hashFieldName)
+else
+	newValue = redis.call('HINCRBYFLOAT', dataKey, hashFieldName, delta)
+	newValue = string.format('%.' .. decimalPlaces .. 'f', tonumber(newValue))
+	redis.call('HSET', dataKey, hashFieldName, newValue)
+end
+
+if indexKeyPrefix ~= '' then
+	local oldIndexValue = false
+	if indexValueHashField ~= '' then
+		oldIndexValue = redis.call('HGET', dataKey, indexValueHashField)
+	end
+	if oldIndexValue == false then
+		oldIndexValue = current
+	end
+	if oldIndexValue ~= false and oldIndexValue ~= newValue then
+		redis.call('SREM', indexKeyPrefix .. oldIndexValue, pk)
+	end
+	redis.call('SADD', indexKeyPrefix .. newValue, pk)
+	if indexValueHashField ~= '' then
+		redis.call('HSET', dataKey, indexValueHashField, newValue)
+	end
+end
+
+if versionField ~= '' then
+	redis.call('HINCRBY', dataKey, versionField, 1)
+end
+
+return { 1, newValue }
+""")
+
+
+# VERSION_CHECK_SCRIPT - Check that objects are at the expected versions (@see IndexedRedisModel.VERSIONED), all at once.
+#
+#   KEYS - [ dataKey1, dataKey2, ... ]
+#   ARGV - [ versionField, expectedVersion1, expectedVersion2, ... ]
+#
+#   A missing version (an object saved before the model was VERSIONED) counts as 0. A missing object conflicts, unless expected at 0.
+#
+#   Returns - The (1-based) positions of the objects which are not at their expected version, or an empty list if all are.
+VERSION_CHECK_SCRIPT = LuaScript("""
+local versionField = ARGV[1]
+
+local conflicts = {}
+for i, dataKey in ipairs(KEYS) do
+	local version = tonumber(redis.call('HGET', dataKey, versionField) or '0')
+	if version ~= tonumber(ARGV[i + 1]) then
+		conflicts[#conflicts + 1] = i
+	end
+end
+
+return conflicts
+""")
+
+
+# RAISE_NEXT_ID_SCRIPT - Raise the last assigned primary key to at least the given value, so future inserts do not reuse
+#   primary keys written directly (@see IndexedRedisSave.importFrom). Never lowers it.
+#
+#   KEYS - [ nextIdKey ]
+#   ARGV - [ minLastId ]
+#
+#   Returns - The last assigned primary key
+RAISE_NEXT_ID_SCRIPT = LuaScript("""
+local minLastId = tonumber(ARGV[1])
+local lastId = tonumber(redis.call('GET', KEYS[1]) or '0')
+
+if lastId < minLastId then
+	redis.call('SET', KEYS[1], ARGV[1])
+	return minLastId
+end
+
+return lastId
+""")
+
+
+# PACKED_MERGE_SCRIPT - Replace some of the values packed into an object's packed hash field (@see IndexedRedis.compact),
+#   keeping the stored values of the others, so saving a partially fetched object (like from getOnlyFields) on a COMPACT_STORAGE
+#   model does not overwrite the packed fields it did not fetch. Reads and writes the format of compact.packValues.
+#
+#   KEYS - [ dataKey ]
+#   ARGV - [ packedFieldName, numValues, (changed, value) * numValues ]
+#
+#     changed is "1" if the value should be written, otherwise the stored value is kept (or value is used, if there is none stored).
+#
+#   Returns - nothing
+PACKED_MERGE_SCRIPT = LuaScript("""
+local dataKey = KEYS[1]
+local packedFieldName = ARGV[1]
+local numValues = tonumber(ARGV[2])
+
+local stored = {}
+local blob = redis.call('HGET', dataKey, packedFieldName)
+if blob and string.byte(blob, 1) == 1 then
+	local pos = 2
+	local blobLen = string.len(blob)
+	while pos <= blobLen do
+		local valueLen = string.byte(blob, pos)
+		if valueLen == 255 then
+			local b1, b2, b3, b4 = string.byte(blob, pos + 1, pos + 4)
+			valueLen = ((b1 * 256 + b2) * 256 + b3) * 256 + b4
+			pos = pos + 5
+		else
+			pos = pos + 1
+		end
+		stored[#stored + 1] = string.sub(blob, pos, pos + valueLen - 1)
+		pos = pos + valueLen
+	end
+end
+
+local parts = { string.char(1) }
+for i = 1, numValues do
+	local value = stored[i]
+	if ARGV[1 + (2 * i)] == '1' or value == nil then
+		value = ARGV[2 + (2 * i)]
+	end
+
+	local valueLen = string.len(value)
+	if valueLen < 255 then
+		parts[#parts + 1] = string.char(valueLen)
+	else
+		parts[#parts + 1] = string.char(255, math.floor(valueLen / 16777216) % 256, math.floor(valueLen / 65536) % 256, math.floor(valueLen / 256) % 256, valueLen % 256)
+	end
+	parts[#parts + 1] = value
+end
+
+redis.call('HSET', dataKey, packedFieldName, table.concat(parts))
+""")
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
@@ -0,0 +1,163 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# slowlog - A log of queries which took longer than a configured threshold, with the cardinality of each index involved
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import sys
+import threading
+import time
+import traceback
+
+from collections import deque
+
+__all__ = ('SlowQueryEntry', 'enableSlowQueryLog', 'disableSlowQueryLog', 'getSlowQueryLog', 'clearSlowQueryLog', 'getSlowQueryThreshold')
+
+# Seconds a query must take to be logged, or None if the slow query log is disabled
+global _slowQueryThreshold
+_slowQueryThreshold = None
+
+global _slowQueryCallback
+_slowQueryCallback = None
+
+global _slowQueryEntries
+_slowQueryEntries = deque(maxlen=128)
+
+global _slowQueryLock
+_slowQueryLock = threading.Lock()
+
+
+class SlowQueryEntry(object):
+	'''
+		SlowQueryEntry - A query which exceeded the slow query threshold
+
+		  model - The IndexedRedisModel class queried
+		  operation <str> - The query operation (e.x. "getPrimaryKeys", "count")
+		  filters list< tuple(fieldName<str>, value, cardinality<int>) > - Each filter, with the number of members
+		      in its index (SCARD) at the time the slow query was logged
+		  notFilters list< tuple(fieldName<str>, value, cardinality<int>) > - Same as #filters, for the negative (__ne) filters
+		  orFilters list< list< tuple(fieldName<str>, value, cardinality<int>) > > - Same as #filters, for each Or / __in filter
+		  totalCardinality <int/None> - Number of objects of the model, if there were no positive filters (the query ran against all objects)
+		  numMatched <int> - Number of results of the query
+		  elapsed <float> - Seconds the query took
+		  timestamp <float> - time.time() when the query completed
+	'''
+
+	__slots__ = ('model', 'operation', 'filters', 'notFilters', 'orFilters', 'totalCardinality', 'numMatched', 'elapsed', 'timestamp')
+
+	def __init__(self, model, operation, filters, notFilters, totalCardinality, numMatched, elapsed, orFilters=None):
+		self.model = model
+		self.operation = operation
+		self.filters = filters
+		self.notFilters = notFilters
+		self.orFilters = orFilters or []
+		self.totalCardinality = totalCardinality
+		self.numMatched = numMatched
+		self.elapsed = elapsed
+		self.timestamp = time.time()
+
+	@property
+	def filterShape(self):
+		'''
+			filterShape - The query with the values left out, so the same kind of query can be grouped together.
+
+			  e.x.   "active=? AND name=? AND (priority=? OR status=?) AND NOT status=?"
+
+			@return <str>
+		'''
+		parts = sorted( [ '%s=?' %(fieldName, ) for (fieldName, value, cardinality) in self.filters ] )
+		parts += sorted( [ '(%s)' %(' OR '.join( sorted(set( [ '%s=?' %(fieldName, ) for (fieldName, value, cardinality) in orFilter ] )) ), ) for orFilter in self.orFilters ] )
+		parts += sorted( [ 'NOT %s=?' %(fieldName, ) for (fieldName, value, cardinality) in self.notFilters ] )
+
+		return ' AND '.join(parts)
+
+	def __repr__(self):
+		return 'SlowQueryEntry(model=%s, operation=%s, filters=%s, notFilters=%s, orFilters=%s, totalCardinality=%s, numMatched=%d, elapsed=%f)' %( \
+			self.model.__name__, self.operation, repr(self.filters), repr(self.notFilters), repr(self.orFilters), repr(self.totalCardinality), self.numMatched, self.elapsed)
+
+
+def enableSlowQueryLog(threshold, maxEntries=128, callback=None):
+	'''
+		enableSlowQueryLog - Start logging queries (IndexedRedisQuery.getPrimaryKeys and count, which back
+		   all the fetch methods) which take at least #threshold seconds.
+
+		  When a query is slow, the cardinality of each index involved is fetched (one extra round trip, only for slow queries).
+
+		@param threshold <float> - Minimum number of seconds for a query to be logged. 0 logs every query.
+
+		@param maxEntries <int> default 128 - Max number of entries to keep. The oldest entries are dropped.
+
+		@param callback <None/callable> - If provided, also called with each SlowQueryEntry as it is logged (e.x. to write to a logger)
+	'''
+	global _slowQueryThreshold
+	global _slowQueryCallback
+	global _slowQueryEntries
+
+	if threshold is None or threshold < 0:
+		raise ValueError('enableSlowQueryLog threshold must be a number of seconds >= 0. Got: %s' %(repr(threshold), ))
+
+	with _slowQueryLock:
+		if maxEntries != _slowQueryEntries.maxlen:
+			_slowQueryEntries = deque(_slowQueryEntries, maxlen=maxEntries)
+
+		_slowQueryCallback = callback
+		_slowQueryThreshold = threshold
+
+def disableSlowQueryLog():
+	'''
+		disableSlowQueryLog - Stop logging slow queries. Existing entries are retained until clearSlowQueryLog.
+	'''
+	global _slowQueryThreshold
+	global _slowQueryCallback
+
+	with _slowQueryLock:
+		_slowQueryThreshold = None
+		_slowQueryCallback = None
+
+def getSlowQueryThreshold():
+	'''
+		getSlowQueryThreshold - Get the current slow query threshold
+
+		@return <float/None> - Threshold in seconds, or None if the slow query log is disabled
+	'''
+	return _slowQueryThreshold
+
+def getSlowQueryLog():
+	'''
+		getSlowQueryLog - Get the logged slow queries
+
+		@return list<SlowQueryEntry> - Entries, oldest first
+	'''
+	with _slowQueryLock:
+		return list(_slowQueryEntries)
+
+def clearSlowQueryLog():
+	'''
+		clearSlowQueryLog - Remove all entries from the slow query log
+	'''
+	with _slowQueryLock:
+		_slowQueryEntries.clear()
+
+def recordSlowQuery(entry):
+	'''
+		recordSlowQuery - Add an entry to the slow query log
+		  internal
+
+		  An exception raised by the callback is printed to stderr, and does not affect the query.
+
+		@param entry <SlowQueryEntry> - The entry
+	'''
+	with _slowQueryLock:
+		_slowQueryEntries.append(entry)
+		callback = _slowQueryCallback
+
+	if callback is not None:
+		try:
+			callback(entry)
+		except Exception:
+			sys.stderr.write('WARNING: IndexedRedis slow query callback %s raised an exception:\n%s\n' %(repr(callback), traceback.format_exc()))
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
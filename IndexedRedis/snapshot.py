@@ -0,0 +1,155 @@
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# snapshot - The file format of model snapshots (@see IndexedRedisQuery.export and IndexedRedisSave.importFrom)
+#
+#   A snapshot is:
+#
+#     SNAPSHOT_MAGIC
+#     header chunk - KEY_NAME, followed by the name of each field, in the order values are stored
+#     record chunks - The number of records, followed by the primary key and each field's storage-form value, per record
+#     a chunk length of 0, to mark the end
+#
+#   Each chunk is a 4-byte (big endian) length, followed by that many bytes: the chunk's values packed by compact.packValues, compressed with zlib.
+#
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
+
+import struct
+import zlib
+
+from .compact import packValues, unpackValues
+from .compat_str import to_unicode
+
+__all__ = ('SNAPSHOT_MAGIC', 'SnapshotWriter', 'SnapshotReader', 'InvalidSnapshotException')
+
+# SNAPSHOT_MAGIC - The first bytes of every snapshot file, the last being the format version
+SNAPSHOT_MAGIC = b'IRSNAP\x01'
+
+# zlib compression level of each chunk. 1 is several times faster than the default (6), for slightly larger files.
+SNAPSHOT_COMPRESS_LEVEL = 1
+
+_chunkLengthStruct = struct.Struct('>I')
+
+
+class InvalidSnapshotException(Exception):
+	'''
+		InvalidSnapshotException - Raised when reading a file which is not a (complete) snapshot
+	'''
+	pass
+
+
+class SnapshotWriter(object):
+	'''
+		SnapshotWriter - Writes a snapshot to a stream, one chunk of records at a time
+	'''
+
+	def __init__(self, stream, keyName, fieldNames):
+		'''
+			__init__ - Create this writer, and write the header
+
+			@param stream - Binary stream to write (an open file, etc)
+			@param keyName <str> - KEY_NAME of the model
+			@param fieldNames list<str> - Names of the fields, in the order their values will be given to #writeRecords
+		'''
+		self.stream = stream
+		self.numFields = len(fieldNames)
+
+		stream.write(SNAPSHOT_MAGIC)
+		self._writeChunk( [ keyName ] + list(fieldNames) )
+
+	def _writeChunk(self, values):
+		data = zlib.compress(packValues(values), SNAPSHOT_COMPRESS_LEVEL)
+		self.stream.write(_chunkLengthStruct.pack(len(data)))
+		self.stream.write(data)
+
+	def writeRecords(self, records):
+		'''
+			writeRecords - Write a chunk of records
+
+			@param records list< tuple(pk, list<str/bytes>) > - Primary key, and the storage-form value of each field
+		'''
+		if not records:
+			return
+
+		values = [ len(records) ]
+		for (pk, recordValues) in records:
+			values.append(pk)
+			values += recordValues
+
+		self._writeChunk(values)
+
+	def close(self):
+		'''
+			close - Mark the end of the snapshot. Does not close the stream.
+		'''
+		self.stream.write(_chunkLengthStruct.pack(0))
+
+
+class SnapshotReader(object):
+	'''
+		SnapshotReader - Reads a snapshot from a stream, one chunk of records at a time
+	'''
+
+	def __init__(self, stream):
+		'''
+			__init__ - Create this reader, and read the header (setting #keyName and #fieldNames)
+
+			@param stream - Binary stream to read (an open file, etc)
+
+			@raises InvalidSnapshotException - If the stream does not start with a snapshot header
+		'''
+		self.stream = stream
+
+		if stream.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+			raise InvalidSnapshotException('Not an IndexedRedis snapshot (or an unsupported version).')
+
+		header = self._readChunk()
+		if not header:
+			raise InvalidSnapshotException('Snapshot has no header.')
+
+		self.keyName = to_unicode(header[0])
+		self.fieldNames = [ to_unicode(fieldName) for fieldName in header[1:] ]
+
+	def _readExactly(self, num):
+		data = self.stream.read(num)
+		if len(data) != num:
+			raise InvalidSnapshotException('Snapshot is truncated.')
+		return data
+
+	def _readChunk(self):
+		length = _chunkLengthStruct.unpack(self._readExactly(_chunkLengthStruct.size))[0]
+		if length == 0:
+			return None
+
+		return unpackValues(zlib.decompress(self._readExactly(length)))
+
+	def iterChunks(self):
+		'''
+			iterChunks - Iterate over the chunks of records
+
+			@return generator< list< tuple(pk<int>, list<bytes>) > > - Each chunk's records: primary key, and the storage-form value of each field (in #fieldNames order)
+
+			@raises InvalidSnapshotException - If the snapshot is truncated or corrupt
+		'''
+		numFields = len(self.fieldNames)
+
+		while True:
+			values = self._readChunk()
+			if values is None:
+				return
+
+			numRecords = int(values[0])
+			if len(values) != 1 + (numRecords * (numFields + 1)):
+				raise InvalidSnapshotException('Snapshot chunk has the wrong number of values.')
+
+			records = []
+			pos = 1
+			for i in range(numRecords):
+				records.append( (int(values[pos]), values[pos + 1 : pos + 1 + numFields]) )
+				pos += numFields + 1
+
+			yield records
+
+
+# vim:set ts=8 shiftwidth=8 softtabstop=8 noexpandtab :
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_BulkLoad - GoodTests unit tests for streaming inserts of many objects (bulkLoad)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, INDEX_VALUE_FIELD_PREFIX
+from IndexedRedis.fields import IRFixedPointField
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class BulkLoadModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('color'), IRField('description', hashIndex=True), IRField('num', valueType=int), IRFixedPointField('price', decimalPlaces=2), IRField('other') ]
+
+    INDEXED_FIELDS = ['name', 'color', 'description', 'num']
+
+    KEY_NAME = 'Test_BulkLoadModel'
+
+
+class BulkLoadCompactModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('other'), IRField('more') ]
+
+    INDEXED_FIELDS = ['name']
+
+    COMPACT_STORAGE = True
+
+    COMPRESS_FIELD_NAMES = True
+
+    VERSIONED = True
+
+    DEFAULT_TTL = 3600
+
+    KEY_NAME = 'Test_BulkLoadCompactModel'
+
+
+COLORS = ['red', 'green', 'blue']
+
+
+def generateObjs(num):
+    for i in range(num):
+        yield BulkLoadModel(name='n%d' %(i % 7, ), color=COLORS[i % 3], description='Description %d' %(i % 2, ), num=i, price=i / 4.0, other='o%d' %(i, ))
+
+
+class TestBulkLoad(object):
+
+    def setup_method(self, *args, **kwargs):
+        BulkLoadModel.deleter.destroyModel()
+        BulkLoadCompactModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        BulkLoadModel.deleter.destroyModel()
+        BulkLoadCompactModel.deleter.destroyModel()
+
+    def _checkLoaded(self, num):
+        objs = BulkLoadModel.objects.allByAge()
+        assert len(objs) == num , 'Expected %d objects. Got %d' %(num, len(objs))
+        assert sorted( [ obj.num for obj in objs ] ) == list(range(num)) , 'Expected every object loaded once'
+
+        for obj in objs:
+            assert obj.other == 'o%d' %(obj.num, ) and obj.price == round(obj.num / 4.0, 2) , 'Expected values stored on %s' %(repr(obj), )
+
+        for color in COLORS:
+            expected = len( [ i for i in range(num) if COLORS[i % 3] == color ] )
+            assert BulkLoadModel.objects.filter(color=color).count() == expected , 'Expected index on color=%s' %(color, )
+
+        assert BulkLoadModel.objects.filter(description='Description 1').count() == num // 2 , 'Expected hashed index'
+        assert BulkLoadModel.objects.filter(num=num - 1).first().num == num - 1 , 'Expected int index'
+
+        # The next save continues after the reserved primary keys
+        newObj = BulkLoadModel(name='after', color='red', description='', num=-1, price=0, other='')
+        newObj.save()
+        assert newObj._id == max( [ obj._id for obj in objs ] ) + 1 , 'Expected pks reserved'
+        newObj.delete()
+
+        # Deletable on the server from the recorded index values
+        conn = BulkLoadModel.objects._get_connection()
+        key = BulkLoadModel.objects._get_key_for_id(objs[0]._id)
+        assert conn.hget(key, INDEX_VALUE_FIELD_PREFIX + 'description') is not None , 'Expected hashed index values recorded'
+        assert conn.hget(key, INDEX_VALUE_FIELD_PREFIX + 'color') is None , 'Expected no copy of the stored value recorded'
+
+    def test_bulkLoad(self):
+        progress = []
+
+        numLoaded = BulkLoadModel.saver.bulkLoad(generateObjs(1050), batchSize=100, progressCallback=lambda numLoaded, rate : progress.append( (numLoaded, rate) ))
+        assert numLoaded == 1050 , 'Expected number loaded returned. Got: %s' %(repr(numLoaded), )
+
+        assert [ numLoaded for (numLoaded, rate) in progress ] == list(range(100, 1001, 100)) + [1050] , 'Expected progress after each batch. Got: %s' %(repr(progress), )
+        assert not [ rate for (numLoaded, rate) in progress if rate <= 0 ] , 'Expected throughput reported'
+
+        self._checkLoaded(1050)
+
+        BulkLoadModel.objects.filter(color='red').delete()
+        assert BulkLoadModel.objects.filter(color='red').count() == 0 , 'Expected delete of loaded objects'
+
+    def test_workers(self):
+        progress = []
+
+        numLoaded = BulkLoadModel.saver.bulkLoad(generateObjs(2000), batchSize=150, workers=4, progressCallback=lambda numLoaded, rate : progress.append(numLoaded))
+        assert numLoaded == 2000 , 'Expected number loaded returned. Got: %s' %(repr(numLoaded), )
+        assert sorted(progress)[-1] == 2000 and len(progress) == 14 , 'Expected progress for each batch. Got: %s' %(repr(progress), )
+
+        self._checkLoaded(2000)
+
+    def test_setsObjects(self):
+        objs = list(generateObjs(10))
+        BulkLoadModel.saver.bulkLoad(objs, batchSize=3)
+
+        assert not [ obj for obj in objs if not obj._id ] , 'Expected primary keys set on objects'
+        assert not [ obj for obj in objs if obj.hasUnsavedChanges() ] , 'Expected objects to be marked saved'
+
+        objs[0].color = 'purple'
+        objs[0].save()
+        assert BulkLoadModel.objects.filter(color='purple').getPrimaryKeys() == [ objs[0]._id ] , 'Expected update after load'
+        assert BulkLoadModel.objects.filter(color='red').count() == 3 , 'Expected removed from old index'
+
+    def test_compactVersionedTtl(self):
+        objs = ( BulkLoadCompactModel(name='n%d' %(i % 2, ), other='x%d' %(i, ), more='y') for i in range(25) )
+        assert BulkLoadCompactModel.saver.bulkLoad(objs, batchSize=10) == 25 , 'Expected all loaded'
+
+        fetched = BulkLoadCompactModel.objects.filter(name='n1').all()
+        assert len(fetched) == 12 , 'Expected index on compact model'
+        assert not [ obj for obj in fetched if obj.more != 'y' or not obj.other.startswith('x') ] , 'Expected packed values'
+        assert not [ obj for obj in fetched if obj._version != 1 ] , 'Expected version 1'
+
+        conn = BulkLoadCompactModel.objects._get_connection()
+        assert conn.zcard(BulkLoadCompactModel.objects._get_expires_key()) == 25 , 'Expected DEFAULT_TTL deadlines'
+
+    def test_invalid(self):
+        obj = BulkLoadModel(name='x', color='red', description='', num=0, price=0, other='')
+        obj.save()
+
+        for func in (
+            lambda : BulkLoadModel.saver.bulkLoad( [ obj ] ),
+            lambda : BulkLoadModel.saver.bulkLoad( [], batchSize=0 ),
+            lambda : BulkLoadModel.saver.bulkLoad( [], workers=0 ),
+        ):
+            gotException = False
+            try:
+                func()
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError'
+
+        assert BulkLoadModel.saver.bulkLoad( [] ) == 0 , 'Expected nothing loaded'
+        assert BulkLoadModel.saver.bulkLoad( iter([]), workers=3 ) == 0 , 'Expected nothing loaded with workers'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
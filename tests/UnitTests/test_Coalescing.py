@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Coalescing - GoodTests unit tests for models using COALESCE_WINDOW
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+import threading
+
+import redis
+
+from IndexedRedis import IndexedRedisModel, IRField
+from IndexedRedis.coalesce import CommandCoalescer
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class CoalescedModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('num', valueType=int) ]
+
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_CoalescedModel'
+
+    COALESCE_WINDOW = 0.05
+
+
+class TestCoalescing(object):
+
+    def setup_method(self, *args, **kwargs):
+        CoalescedModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        CoalescedModel.deleter.destroyModel()
+
+    def test_singleThread(self):
+        obj = CoalescedModel(name='one', num=1)
+        ids = obj.save()
+
+        assert ids == [obj._id] , 'Expected save to return the id'
+
+        fetched = CoalescedModel.objects.get(obj._id)
+        assert fetched.name == 'one' and fetched.num == 1 , 'Expected to fetch saved object'
+
+        assert CoalescedModel.objects.filter(name='one').count() == 1 , 'Expected count to work through coalescer'
+        assert CoalescedModel.objects.get(obj._id + 100) is None , 'Expected None for missing object'
+
+    def test_manyThreads(self):
+        numThreads = 20
+        errors = []
+        savedIds = []
+
+        startEvent = threading.Event()
+
+        def doSave(num):
+            try:
+                startEvent.wait()
+                obj = CoalescedModel(name='thread%d' %(num, ), num=num)
+                obj.save()
+                savedIds.append(obj._id)
+
+                fetched = CoalescedModel.objects.get(obj._id)
+                if fetched.num != num:
+                    errors.append('Thread %d got wrong object back: %s' %(num, repr(fetched)))
+            except Exception as e:
+                errors.append('Thread %d got exception: %s' %(num, str(e)))
+
+        threads = [ threading.Thread(target=doSave, args=(i, )) for i in range(numThreads) ]
+        for thread in threads:
+            thread.start()
+
+        coalescer = CoalescedModel.objects._get_connection()._coalescer
+        numFlushesBefore = coalescer.numFlushes
+        numSubmittedBefore = coalescer.numSubmitted
+
+        startEvent.set()
+        for thread in threads:
+            thread.join()
+
+        assert not errors , 'Got errors: %s' %(repr(errors), )
+        assert len(set(savedIds)) == numThreads , 'Expected each thread to get a unique id. Got: %s' %(repr(savedIds), )
+        assert CoalescedModel.objects.count() == numThreads , 'Expected all objects to be saved'
+
+        numFlushes = coalescer.numFlushes - numFlushesBefore
+        numSubmitted = coalescer.numSubmitted - numSubmittedBefore
+        assert numFlushes < numSubmitted , 'Expected commands to be coalesced into fewer pipelines. Got %d pipelines for %d commands' %(numFlushes, numSubmitted)
+
+    def test_errorsGoToCaller(self):
+        conn = CoalescedModel.objects._get_connection()
+
+        conn.set('Test_CoalescedModel_str', 'abc')
+        try:
+            gotError = False
+            try:
+                conn.incr('Test_CoalescedModel_str')
+            except redis.ResponseError:
+                gotError = True
+
+            assert gotError , 'Expected error reply to be raised to the caller'
+
+            pipeline = conn.pipeline()
+            pipeline.get('Test_CoalescedModel_str')
+            pipeline.incr('Test_CoalescedModel_str')
+            results = pipeline.execute(raise_on_error=False)
+
+            assert results[0] == b'abc' , 'Expected first reply in pipeline to be returned. Got: %s' %(repr(results[0]), )
+            assert isinstance(results[1], redis.ResponseError) , 'Expected error in pipeline reply. Got: %s' %(repr(results[1]), )
+        finally:
+            conn.delete('Test_CoalescedModel_str')
+
+    def test_queueErrorStaysWithCaller(self):
+        conn = CoalescedModel.objects._get_new_connection()
+        # Flushes only once both blocks (4 commands) are pending, so they are always in the same batch
+        coalescer = CommandCoalescer(conn, 10, 4)
+
+        results = {}
+
+        def submit(name, commandStack):
+            try:
+                results[name] = coalescer.submit(commandStack)
+            except Exception as e:
+                results[name] = e
+
+        badCommands = [ (('SET', 'Test_CoalescedModel_bad', 'x'), {}), (('GET', ), {}) ]
+        goodCommands = [ (('SET', 'Test_CoalescedModel_good', 'y'), {}), (('GET', 'Test_CoalescedModel_good'), {}) ]
+
+        threads = [ threading.Thread(target=submit, args=('bad', badCommands)), threading.Thread(target=submit, args=('good', goodCommands)) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        try:
+            assert coalescer.numFlushes == 1 , 'Expected both blocks in one batch'
+            assert isinstance(results['bad'], redis.ResponseError) , 'Expected queue error raised to the caller which caused it. Got: %s' %(repr(results['bad']), )
+            assert conn.get('Test_CoalescedModel_bad') is None , 'Expected nothing applied from the aborted block'
+            assert results['good'] == [True, b'y'] , 'Expected other caller to succeed. Got: %s' %(repr(results['good']), )
+        finally:
+            conn.delete('Test_CoalescedModel_bad', 'Test_CoalescedModel_good')
+
+    def test_watchRejected(self):
+        pipeline = CoalescedModel.objects._get_connection().pipeline()
+
+        for func in (lambda : pipeline.watch('Test_CoalescedModel_watch'), pipeline.multi):
+            gotError = False
+            try:
+                func()
+            except redis.RedisError:
+                gotError = True
+
+            assert gotError , 'Expected WATCH / MULTI to be rejected on a coalesced pipeline'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_CompactStorage - GoodTests unit tests for models using COMPACT_STORAGE
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, irNull, INDEX_VALUE_FIELD_PREFIX
+from IndexedRedis.fields import IRCompressedField, IRFixedPointField
+from IndexedRedis.compact import PACKED_FIELD_NAME, packValues, unpackValues
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class CompactModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('num', valueType=int), IRField('description'), IRCompressedField('blob'), IRFixedPointField('price', decimalPlaces=2) ]
+
+    INDEXED_FIELDS = ['name', 'num']
+
+    KEY_NAME = 'Test_CompactModel'
+
+    COMPACT_STORAGE = True
+
+
+class TestCompactStorage(object):
+
+    def setup_method(self, *args, **kwargs):
+        CompactModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        CompactModel.deleter.destroyModel()
+
+    def test_packValues(self):
+        values = [ 'abc', b'\x00\x01\xff', '', 'x' * 300, 5 ]
+
+        unpacked = unpackValues(packValues(values))
+
+        assert unpacked == [ b'abc', b'\x00\x01\xff', b'', b'x' * 300, b'5' ] , 'Expected packed values to unpack the same. Got: %s' %(repr(unpacked), )
+
+        assert unpackValues(b'') == [] , 'Expected empty blob to unpack to empty list'
+
+    def test_storageLayout(self):
+        obj = CompactModel(name='one', num=1, description='the first', blob=b'some data', price=1.5)
+        obj.save()
+
+        conn = CompactModel.objects._get_connection()
+        rawKeys = sorted( [ key.decode('ascii') for key in conn.hkeys(CompactModel.objects._get_key_for_id(obj._id)) ] )
+        # The index value of each indexed field is also recorded
+        rawKeys = [ rawKey for rawKey in rawKeys if not rawKey.startswith(INDEX_VALUE_FIELD_PREFIX) ]
+
+        assert rawKeys == sorted(['name', 'num', PACKED_FIELD_NAME]) , 'Expected only indexed fields and packed field in hash. Got: %s' %(repr(rawKeys), )
+
+    def test_saveAndFetch(self):
+        obj = CompactModel(name='one', num=1, description='the first', blob=b'some data', price=1.5)
+        obj.save()
+
+        obj2 = CompactModel(name='two', num=2, price=3)
+        obj2.save()
+
+        fetched = CompactModel.objects.get(obj._id)
+        assert fetched , 'Expected to fetch object'
+        assert fetched.name == 'one' , 'Expected name to be "one". Got: %s' %(repr(fetched.name), )
+        assert fetched.num == 1 , 'Expected num to be 1. Got: %s' %(repr(fetched.num), )
+        assert fetched.description == 'the first' , 'Expected packed description to be "the first". Got: %s' %(repr(fetched.description), )
+        assert fetched.blob == b'some data' , 'Expected packed compressed field to be restored. Got: %s' %(repr(fetched.blob), )
+        assert fetched.price == 1.5 , 'Expected packed price to be 1.5. Got: %s' %(repr(fetched.price), )
+        assert not fetched.hasUnsavedChanges() , 'Expected freshly fetched object to have no unsaved changes'
+
+        fetched2 = CompactModel.objects.filter(name='two').first()
+        assert fetched2.description == irNull , 'Expected unset packed field to be irNull. Got: %s' %(repr(fetched2.description), )
+        assert fetched2.blob == irNull , 'Expected unset packed field to be irNull. Got: %s' %(repr(fetched2.blob), )
+
+        allObjs = CompactModel.objects.all()
+        assert len(allObjs) == 2 , 'Expected to fetch 2 objects. Got: %d' %(len(allObjs), )
+        assert sorted([ x.description for x in allObjs if x.description != irNull ]) == ['the first'] , 'Expected packed values on all()'
+
+    def test_onlyFields(self):
+        obj = CompactModel(name='one', num=1, description='the first', price=1.5)
+        obj.save()
+        obj2 = CompactModel(name='two', num=2, description='the second', price=2.5)
+        obj2.save()
+
+        partial = CompactModel.objects.getOnlyFields(obj._id, ['name', 'description'])
+        assert partial.name == 'one' , 'Expected name on partial object'
+        assert partial.description == 'the first' , 'Expected packed description on partial object. Got: %s' %(repr(partial.description), )
+
+        partials = CompactModel.objects.getMultipleOnlyFields([obj._id, obj2._id], ['price'])
+        assert [ x.price for x in partials ] == [1.5, 2.5] , 'Expected packed price on partial objects. Got: %s' %(repr([ x.price for x in partials ]), )
+
+        indexedOnly = CompactModel.objects.getOnlyIndexedFields(obj._id)
+        assert indexedOnly.name == 'one' and indexedOnly.num == 1 , 'Expected indexed fields to be fetched'
+
+    def test_update(self):
+        obj = CompactModel(name='one', num=1, description='the first', price=1.5)
+        obj.save()
+
+        obj.description = 'changed'
+        obj.save()
+
+        fetched = CompactModel.objects.get(obj._id)
+        assert fetched.description == 'changed' , 'Expected packed field update to be saved. Got: %s' %(repr(fetched.description), )
+        assert fetched.price == 1.5 , 'Expected other packed fields to be retained. Got: %s' %(repr(fetched.price), )
+
+        fetched.num = 5
+        fetched.save()
+
+        assert CompactModel.objects.filter(num=5).count() == 1 , 'Expected index to be updated'
+        assert CompactModel.objects.filter(num=1).count() == 0 , 'Expected old index to be removed'
+
+        refetched = CompactModel.objects.get(obj._id)
+        assert refetched.description == 'changed' , 'Expected packed field to be unchanged after indexed update'
+
+    def test_savePartial(self):
+        obj = CompactModel(name='one', num=1, description='the first', blob=b'x' * 300, price=1.5)
+        obj.save()
+
+        partial = CompactModel.objects.getOnlyFields(obj._id, ['description'])
+        partial.description = 'changed'
+        partial.save()
+
+        fetched = CompactModel.objects.get(obj._id)
+        assert fetched.description == 'changed' , 'Expected packed field changed on partial object to be saved. Got: %s' %(repr(fetched.description), )
+        assert fetched.blob == b'x' * 300 and fetched.price == 1.5 , 'Expected packed fields not fetched to be kept. Got: %s' %(repr(fetched), )
+
+        # Blob written before a packed field was added has fewer values
+        conn = CompactModel.objects._get_connection()
+        conn.hset(CompactModel.objects._get_key_for_id(obj._id), PACKED_FIELD_NAME, packValues( [ 'old', CompactModel.FIELDS['blob'].toStorage(b'short') ] ))
+
+        partial = CompactModel.objects.getOnlyFields(obj._id, ['price'])
+        partial.price = 7
+        partial.save()
+
+        fetched = CompactModel.objects.get(obj._id)
+        assert fetched.description == 'old' and fetched.blob == b'short' and fetched.price == 7 , 'Expected missing packed value added, others kept. Got: %s' %(repr(fetched), )
+
+    def test_delete(self):
+        obj = CompactModel(name='one', num=1, description='the first', price=1.5)
+        obj.save()
+
+        assert CompactModel.objects.filter(name='one').delete() == 1 , 'Expected to delete one object'
+        assert CompactModel.objects.count() == 0 , 'Expected no objects to remain'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
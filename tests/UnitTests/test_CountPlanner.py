@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_CountPlanner - GoodTests unit tests for counting query results on the server (without transferring the matched keys)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, Or, scripts
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class CountPlannerModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('active'), IRField('color'), IRField('num', valueType=int) ]
+
+    INDEXED_FIELDS = ['name', 'active', 'color', 'num']
+
+    KEY_NAME = 'Test_CountPlannerModel'
+
+
+QUERIES = [
+    { },
+    { 'active' : 'yes' },
+    { 'active' : 'yes', 'color' : 'red' },
+    { 'active' : 'yes', 'color' : 'red', 'name' : 'n1' },
+    { 'active' : 'yes', 'color__ne' : 'red' },
+    { 'active' : 'yes', 'color' : 'blue', 'name__ne' : 'n3', 'num__ne' : 7 },
+    { 'color__ne' : 'red' },
+    { 'color__ne' : 'red', 'name__ne' : 'n0' },
+    { 'color' : 'purple', 'active' : 'yes' },
+    { 'active' : 'yes', 'color__ne' : 'purple' },
+    { 'color__in' : ['red', 'blue'] },
+    { 'color__in' : ['red', 'blue'], 'active' : 'no', 'name__ne' : 'n2' },
+    { 'color__in' : [] },
+]
+
+
+class TestCountPlanner(object):
+
+    def setup_method(self, *args, **kwargs):
+        CountPlannerModel.deleter.destroyModel()
+
+        self.origProbeMax = scripts.PLANNER_PROBE_MAX_CARDINALITY
+
+        colors = ['red', 'green', 'blue']
+        objs = [ CountPlannerModel(name='n%d' %(i % 5, ), active='yes' if i % 2 else 'no', color=colors[i % 3], num=i) for i in range(60) ]
+        CountPlannerModel.saver.save(objs)
+
+    def teardown_method(self, *args, **kwargs):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = self.origProbeMax
+
+        CountPlannerModel.deleter.destroyModel()
+
+    def _checkCounts(self):
+        for query in QUERIES:
+            expected = len(CountPlannerModel.objects.filter(**query).getPrimaryKeys())
+            got = CountPlannerModel.objects.filter(**query).count()
+            assert got == expected , 'Wrong count for %s (probeMax=%d). Expected %d, got %s' %(repr(query), scripts.PLANNER_PROBE_MAX_CARDINALITY, expected, repr(got))
+
+        expected = len(CountPlannerModel.objects.filter(Or(color='red', name='n1'), active='yes').getPrimaryKeys())
+        got = CountPlannerModel.objects.filter(Or(color='red', name='n1'), active='yes').count()
+        assert got == expected , 'Wrong count for Or filter. Expected %d, got %s' %(expected, repr(got))
+
+    def test_probePath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 1000
+        self._checkCounts()
+
+    def test_setOperationPath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 0
+        self._checkCounts()
+
+    def test_countReturnsInteger(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 0
+
+        query = CountPlannerModel.objects.filter(active='yes', color='red', name__ne='n1')
+        conn = query._get_connection()
+
+        ret = query._runPlanner(conn, 'count')
+        assert isinstance(ret, int) , 'Expected count mode to return a single integer, not the matched keys. Got: %s' %(repr(ret), )
+        assert ret == len(query.getPrimaryKeys()) , 'Expected count to match the number of keys'
+
+        tempKeys = conn.keys(CountPlannerModel.objects._get_ids_key() + '__*')
+        assert not tempKeys , 'Expected temporary keys to be removed. Got: %s' %(repr(tempKeys), )
+
+    def test_largeCount(self):
+        objs = [ CountPlannerModel(name='big', active='maybe', color='red' if i % 4 else 'blue', num=1000 + i) for i in range(2500) ]
+        CountPlannerModel.saver.save(objs)
+
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 1000
+
+        assert CountPlannerModel.objects.filter(name='big', color='red').count() == 1875 , 'Expected intersection count'
+        assert CountPlannerModel.objects.filter(name='big', color__ne='red').count() == 625 , 'Expected difference count'
+        assert CountPlannerModel.objects.filter(active='maybe', name='big', color__ne='blue').count() == 1875 , 'Expected intersection and difference count'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_DeleteByPk - GoodTests unit tests for deleting objects by primary key on the server (deleteByPk, deleteMultipleByPks)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, INDEX_VALUE_FIELD_PREFIX
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class DeleteByPkModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('color'), IRField('description', hashIndex=True), IRField('num', valueType=int), IRField('other') ]
+
+    INDEXED_FIELDS = ['name', 'color', 'description', 'num']
+
+    KEY_NAME = 'Test_DeleteByPkModel'
+
+
+class DeleteByPkCodesModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('customer_name'), IRField('customer_notes') ]
+
+    INDEXED_FIELDS = ['customer_name']
+
+    COMPRESS_FIELD_NAMES = True
+
+    KEY_NAME = 'Test_DeleteByPkCodesModel'
+
+
+class DeleteByPkNoIndexModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name') ]
+
+    INDEXED_FIELDS = []
+
+    KEY_NAME = 'Test_DeleteByPkNoIndexModel'
+
+
+class TestDeleteByPk(object):
+
+    def setup_method(self, *args, **kwargs):
+        for model in (DeleteByPkModel, DeleteByPkCodesModel, DeleteByPkNoIndexModel):
+            model.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        for model in (DeleteByPkModel, DeleteByPkCodesModel, DeleteByPkNoIndexModel):
+            model.deleter.destroyModel()
+
+    def _saveSome(self):
+        objs = [ DeleteByPkModel(name='n%d' %(i % 3, ), color='red' if i % 2 else 'blue', description='A long description %d' %(i % 2, ), num=i, other='x') for i in range(10) ]
+        DeleteByPkModel.saver.save(objs)
+
+        return DeleteByPkModel.objects.allByAge()
+
+    def _getKeys(self, model):
+        conn = model.objects._get_connection()
+        return sorted( [ key.decode('utf-8') for key in conn.keys(model.objects._get_ids_key().replace(':keys', ':*')) ] )
+
+    def _checkIndexes(self, objs):
+        for obj in objs:
+            for fieldName in DeleteByPkModel.INDEXED_FIELDS:
+                expected = [ otherObj._id for otherObj in objs if getattr(otherObj, fieldName) == getattr(obj, fieldName) ]
+                got = DeleteByPkModel.objects.filter(**{ fieldName : getattr(obj, fieldName) }).getPrimaryKeys(sortByAge=True)
+                assert got == expected , 'Wrong index for %s=%s. Expected %s, got %s' %(fieldName, repr(getattr(obj, fieldName)), repr(expected), repr(got))
+
+    def test_deleteByPk(self):
+        objs = self._saveSome()
+
+        assert DeleteByPkModel.deleter.deleteByPk(objs[3]._id) == 1 , 'Expected one object deleted'
+        assert DeleteByPkModel.deleter.deleteByPk(objs[3]._id) == 0 , 'Expected nothing deleted the second time'
+        assert DeleteByPkModel.deleter.deleteByPk(9999) == 0 , 'Expected nothing deleted for missing pk'
+
+        remaining = objs[:3] + objs[4:]
+        assert DeleteByPkModel.objects.getPrimaryKeys(sortByAge=True) == [ obj._id for obj in remaining ] , 'Expected pk removed'
+        assert DeleteByPkModel.objects.get(objs[3]._id) is None , 'Expected object gone'
+        self._checkIndexes(remaining)
+
+    def test_deleteMultipleByPks(self):
+        objs = self._saveSome()
+
+        pks = [ obj._id for obj in objs[:6] ] + [ 9999 ]
+        assert DeleteByPkModel.deleter.deleteMultipleByPks(pks) == 6 , 'Expected 6 objects deleted'
+        assert DeleteByPkModel.deleter.deleteMultipleByPks([]) == 0 , 'Expected nothing deleted for no pks'
+
+        remaining = objs[6:]
+        assert DeleteByPkModel.objects.getPrimaryKeys(sortByAge=True) == [ obj._id for obj in remaining ] , 'Expected pks removed'
+        self._checkIndexes(remaining)
+
+        DeleteByPkModel.deleter.deleteMultipleByPks(set( [ obj._id for obj in remaining ] ))
+        assert self._getKeys(DeleteByPkModel) == [ DeleteByPkModel.objects._get_next_id_key() ] , 'Expected only the next id key to remain. Got: %s' %(repr(self._getKeys(DeleteByPkModel)), )
+
+    def test_afterUpdate(self):
+        objs = self._saveSome()
+
+        obj = objs[0]
+        obj.color = 'green'
+        obj.description = 'Changed'
+        obj.save()
+
+        DeleteByPkModel.deleter.deleteByPk(obj._id)
+
+        assert DeleteByPkModel.objects.filter(color='green').count() == 0 , 'Expected updated index entry removed'
+        assert DeleteByPkModel.objects.filter(description='Changed').count() == 0 , 'Expected updated hashed index entry removed'
+        self._checkIndexes(objs[1:])
+
+    def test_notRecorded(self):
+        objs = self._saveSome()
+
+        # Simulate objects saved before index values were recorded
+        conn = DeleteByPkModel.objects._get_connection()
+        for obj in objs[:4]:
+            conn.hdel(DeleteByPkModel.objects._get_key_for_id(obj._id), INDEX_VALUE_FIELD_PREFIX + 'description')
+
+        assert DeleteByPkModel.deleter.deleteMultipleByPks( [ obj._id for obj in objs[2:6] ] ) == 4 , 'Expected objects without recorded index values to be deleted too'
+        self._checkIndexes(objs[:2] + objs[6:])
+
+        DeleteByPkModel.objects.reindex()
+        key = DeleteByPkModel.objects._get_key_for_id(objs[0]._id)
+        assert conn.hget(key, INDEX_VALUE_FIELD_PREFIX + 'description') == DeleteByPkModel.objects._getIndexValue('description', objs[0].description).encode('ascii') , 'Expected reindex to record index values'
+
+    def test_hiddenFields(self):
+        objs = self._saveSome()
+
+        obj = DeleteByPkModel.objects.get(objs[0]._id)
+        assert sorted(obj.asDict(includeMeta=False).keys()) == sorted( [ str(field) for field in DeleteByPkModel.FIELDS ] ) , 'Expected recorded index values to not show up as fields'
+        assert obj == objs[0] , 'Expected fetched object to equal saved'
+
+    def test_recordedOnlyHashed(self):
+        objs = self._saveSome()
+
+        conn = DeleteByPkModel.objects._get_connection()
+        key = DeleteByPkModel.objects._get_key_for_id(objs[0]._id)
+        hiddenFields = sorted( [ fieldName.decode('ascii') for fieldName in conn.hkeys(key) if fieldName.decode('ascii').startswith(INDEX_VALUE_FIELD_PREFIX) ] )
+        assert hiddenFields == [ INDEX_VALUE_FIELD_PREFIX + 'description' ] , 'Expected only the hashed index value recorded. Got: %s' %(repr(hiddenFields), )
+
+        # A copy of the stored value, recorded by an earlier version, is removed on reindex
+        conn.hset(key, INDEX_VALUE_FIELD_PREFIX + 'color', objs[0].color)
+        DeleteByPkModel.objects.reindex()
+        assert conn.hget(key, INDEX_VALUE_FIELD_PREFIX + 'color') is None , 'Expected reindex to remove the copy'
+
+        assert DeleteByPkModel.deleter.deleteMultipleByPks( [ obj._id for obj in objs[:3] ] ) == 3 , 'Expected delete from the stored values'
+        self._checkIndexes(objs[3:])
+
+    def test_codesAndNoIndexes(self):
+        objs = [ DeleteByPkCodesModel(customer_name='c%d' %(i, ), customer_notes='notes') for i in range(4) ]
+        DeleteByPkCodesModel.saver.save(objs)
+
+        assert DeleteByPkCodesModel.deleter.deleteMultipleByPks( [ objs[0]._id, objs[1]._id ] ) == 2 , 'Expected 2 deleted'
+        assert DeleteByPkCodesModel.objects.filter(customer_name='c0').count() == 0 , 'Expected index entry removed'
+        assert DeleteByPkCodesModel.objects.filter(customer_name='c2').count() == 1 , 'Expected other index entry kept'
+        assert DeleteByPkCodesModel.objects.get(objs[2]._id).customer_notes == 'notes' , 'Expected remaining object fetchable'
+
+        objs = [ DeleteByPkNoIndexModel(name='x') for i in range(3) ]
+        DeleteByPkNoIndexModel.saver.save(objs)
+        assert DeleteByPkNoIndexModel.deleter.deleteMultipleByPks( [ obj._id for obj in objs ] ) == 3 , 'Expected 3 deleted'
+        assert DeleteByPkNoIndexModel.objects.count() == 0 , 'Expected none left'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Expiry - GoodTests unit tests for expiring objects (save ttl, DEFAULT_TTL, reapExpired, ExpiryReaper)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+import time
+
+import IndexedRedis
+from IndexedRedis import IndexedRedisModel, IRField, InvalidModelException, ExpiryReaper, INDEX_VALUE_FIELD_PREFIX
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class ExpiryModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('color', hashIndex=True) ]
+
+    INDEXED_FIELDS = ['name', 'color']
+
+    KEY_NAME = 'Test_ExpiryModel'
+
+
+class ExpiryDefaultModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name') ]
+
+    INDEXED_FIELDS = ['name']
+
+    DEFAULT_TTL = 0.5
+
+    KEY_NAME = 'Test_ExpiryDefaultModel'
+
+
+class TestExpiry(object):
+
+    def setup_method(self, *args, **kwargs):
+        for model in (ExpiryModel, ExpiryDefaultModel):
+            model.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        for model in (ExpiryModel, ExpiryDefaultModel):
+            model.deleter.destroyModel()
+
+    def _getDeadline(self, model, pk):
+        conn = model.objects._get_connection()
+        return conn.zscore(model.objects._get_expires_key(), pk)
+
+    def _getKeys(self, model):
+        conn = model.objects._get_connection()
+        return sorted( [ key.decode('utf-8') for key in conn.keys(model.objects._get_ids_key().replace(':keys', ':*')) ] )
+
+    def test_saveTtl(self):
+        expiring = ExpiryModel(name='expiring', color='red')
+        expiring.save(ttl=0.2)
+        kept = ExpiryModel(name='kept', color='red')
+        kept.save()
+
+        deadline = self._getDeadline(ExpiryModel, expiring._id)
+        assert deadline is not None and time.time() < deadline <= time.time() + 0.2 , 'Expected deadline to be set. Got: %s' %(repr(deadline), )
+        assert self._getDeadline(ExpiryModel, kept._id) is None , 'Expected no deadline without ttl'
+
+        assert ExpiryModel.objects.reapExpired() == 0 , 'Expected nothing reaped before deadline'
+        assert ExpiryModel.objects.count() == 2 , 'Expected both objects before deadline'
+
+        time.sleep(0.25)
+
+        assert ExpiryModel.objects.reapExpired() == 1 , 'Expected one object reaped'
+        assert ExpiryModel.objects.getPrimaryKeys() == [kept._id] , 'Expected only the kept object to remain'
+        assert ExpiryModel.objects.filter(color='red').getPrimaryKeys() == [kept._id] , 'Expected expired object removed from index'
+        assert ExpiryModel.objects.filter(name='expiring').count() == 0 , 'Expected expired object removed from index'
+        assert ExpiryModel.objects.get(expiring._id) is None , 'Expected expired object gone'
+        assert self._getDeadline(ExpiryModel, expiring._id) is None , 'Expected deadline removed'
+
+    def test_saveAgainWithoutTtl(self):
+        obj = ExpiryModel(name='one', color='red')
+        obj.save(ttl=100)
+        deadline = self._getDeadline(ExpiryModel, obj._id)
+
+        obj.save(ttl=200)
+        assert self._getDeadline(ExpiryModel, obj._id) > deadline , 'Expected deadline extended by save with ttl'
+
+        obj.color = 'blue'
+        obj.save()
+        assert self._getDeadline(ExpiryModel, obj._id) is None , 'Expected deadline removed by save without ttl'
+
+        obj.save(ttl=0.01)
+        ExpiryModel.saver.save( [ obj ] )
+        time.sleep(0.02)
+        assert ExpiryModel.objects.reapExpired() == 0 , 'Expected object saved without ttl to not be reaped'
+        assert ExpiryModel.objects.get(obj._id) is not None , 'Expected object kept'
+
+        pk = obj._id
+        obj.delete()
+        assert self._getDeadline(ExpiryModel, pk) is None , 'Expected delete to remove deadline'
+
+        obj2 = ExpiryModel(name='two', color='red')
+        obj2.save(ttl=100)
+        ExpiryModel.deleter.deleteByPk(obj2._id)
+        assert self._getDeadline(ExpiryModel, obj2._id) is None , 'Expected deleteByPk to remove deadline'
+
+    def test_defaultTtl(self):
+        objs = [ ExpiryDefaultModel(name='n%d' %(i, )) for i in range(5) ]
+        ExpiryDefaultModel.saver.save(objs)
+
+        for obj in objs:
+            assert self._getDeadline(ExpiryDefaultModel, obj._id) is not None , 'Expected DEFAULT_TTL to set deadline'
+
+        # Saving again slides the deadline
+        time.sleep(0.25)
+        objs[0].name = 'renamed'
+        objs[0].save()
+
+        time.sleep(0.35)
+        assert ExpiryDefaultModel.objects.reapExpired(batchSize=2) == 4 , 'Expected 4 objects reaped in batches'
+        assert ExpiryDefaultModel.objects.getPrimaryKeys() == [objs[0]._id] , 'Expected re-saved object to remain'
+
+        time.sleep(0.3)
+        assert ExpiryDefaultModel.objects.reapExpired() == 1 , 'Expected re-saved object to be reaped after its deadline'
+        assert self._getKeys(ExpiryDefaultModel) == [ ExpiryDefaultModel.objects._get_next_id_key() ] , 'Expected only the next id key left. Got: %s' %(repr(self._getKeys(ExpiryDefaultModel)), )
+
+    def test_notRecorded(self):
+        objs = [ ExpiryModel(name='n%d' %(i, ), color='red') for i in range(4) ]
+        ExpiryModel.saver.save(objs, ttl=0.1)
+
+        # Simulate objects saved before index values were recorded
+        conn = ExpiryModel.objects._get_connection()
+        conn.hdel(ExpiryModel.objects._get_key_for_id(objs[1]._id), INDEX_VALUE_FIELD_PREFIX + 'color')
+
+        time.sleep(0.15)
+        assert ExpiryModel.objects.reapExpired(batchSize=3) == 4 , 'Expected all reaped'
+        assert self._getKeys(ExpiryModel) == [ ExpiryModel.objects._get_next_id_key() ] , 'Expected only the next id key left. Got: %s' %(repr(self._getKeys(ExpiryModel)), )
+
+    def test_reaperThread(self):
+        obj = ExpiryModel(name='one', color='red')
+        obj.save(ttl=0.05)
+
+        reaper = ExpiryReaper([ExpiryModel, ExpiryDefaultModel], interval=0.02)
+        reaper.start()
+        try:
+            deadline = time.time() + 5
+            while ExpiryModel.objects.count() and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            reaper.stop()
+
+        assert not reaper.is_alive() , 'Expected reaper to stop'
+        assert ExpiryModel.objects.count() == 0 , 'Expected reaper thread to remove expired object'
+
+    def test_invalid(self):
+        for func in (
+            lambda : ExpiryModel(name='x').save(ttl=0),
+            lambda : ExpiryModel(name='x').save(ttl=-5),
+            lambda : ExpiryModel.objects.reapExpired(batchSize=0),
+        ):
+            gotException = False
+            try:
+                func()
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError'
+
+        class BadTtlModel(IndexedRedisModel):
+            FIELDS = [ IRField('name') ]
+            INDEXED_FIELDS = []
+            DEFAULT_TTL = -1
+            KEY_NAME = 'Test_BadTtlModel'
+
+        gotException = False
+        try:
+            BadTtlModel()
+        except InvalidModelException:
+            gotException = True
+
+        assert gotException , 'Expected InvalidModelException for negative DEFAULT_TTL'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_ExportRESP - GoodTests unit tests for writing inserts in the raw Redis protocol for "redis-cli --pipe" (exportRESP)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import io
+import os
+import sys
+import subprocess
+import tempfile
+
+from IndexedRedis import IndexedRedisModel, IRField
+from IndexedRedis.fields import IRFixedPointField, IRBytesField
+from IndexedRedis.resp import encodeCommand
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class ExportRESPModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('color'), IRField('description', hashIndex=True), IRField('num', valueType=int), IRFixedPointField('price', decimalPlaces=2), IRBytesField('data') ]
+
+    INDEXED_FIELDS = ['name', 'color', 'description', 'num']
+
+    KEY_NAME = 'Test_ExportRESPModel'
+
+
+COLORS = ['red', 'green', 'blue']
+
+
+def generateObjs(num):
+    for i in range(num):
+        yield ExportRESPModel(name='n%d' %(i % 7, ), color=COLORS[i % 3], description='Description\r\n%d' %(i % 2, ), num=i, price=i / 4.0, data=b'\x00\xff\r\n' + str(i).encode('ascii'))
+
+
+def parseRESP(data):
+    '''
+        parseRESP - Parse a stream of RESP commands (arrays of bulk strings) into lists of bytes
+    '''
+    commands = []
+    pos = 0
+    while pos < len(data):
+        assert data[pos:pos+1] == b'*' , 'Expected array at %d' %(pos, )
+        end = data.index(b'\r\n', pos)
+        numArgs = int(data[pos+1:end])
+        pos = end + 2
+
+        command = []
+        for i in range(numArgs):
+            assert data[pos:pos+1] == b'$' , 'Expected bulk string at %d' %(pos, )
+            end = data.index(b'\r\n', pos)
+            argLen = int(data[pos+1:end])
+            pos = end + 2
+            command.append(data[pos:pos+argLen])
+            assert data[pos+argLen:pos+argLen+2] == b'\r\n' , 'Expected bulk string terminator'
+            pos += argLen + 2
+
+        commands.append(command)
+
+    return commands
+
+
+class TestExportRESP(object):
+
+    def setup_method(self, *args, **kwargs):
+        ExportRESPModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        ExportRESPModel.deleter.destroyModel()
+
+    def _load(self, data):
+        conn = ExportRESPModel.objects._get_connection()
+        commands = parseRESP(data)
+        for command in commands:
+            conn.execute_command(*command)
+
+        return commands
+
+    def _checkLoaded(self, num):
+        objs = ExportRESPModel.objects.allByAge()
+        assert len(objs) == num , 'Expected %d objects. Got %d' %(num, len(objs))
+
+        expected = list(generateObjs(num))
+        for i in range(num):
+            assert objs[i].asDict() == expected[i].asDict() , 'Expected values on object %d. Expected %s, got %s' %(i, repr(expected[i]), repr(objs[i]))
+
+        for color in COLORS:
+            assert ExportRESPModel.objects.filter(color=color).count() == len( [ i for i in range(num) if COLORS[i % 3] == color ] ) , 'Expected index on color=%s' %(color, )
+        assert ExportRESPModel.objects.filter(description='Description\r\n1').count() == num // 2 , 'Expected hashed index'
+
+        newObj = ExportRESPModel(name='after', color='red', description='', num=-1, price=0, data=b'')
+        newObj.save()
+        assert newObj._id == max( [ obj._id for obj in objs ] ) + 1 , 'Expected next primary key set'
+        newObj.delete()
+
+    def test_encodeCommand(self):
+        assert encodeCommand( ('SET', 'key', b'a\r\nb') ) == b'*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$4\r\na\r\nb\r\n' , 'Expected RESP array of bulk strings'
+        assert encodeCommand( ('ZADD', 'key', 1.5, 10) ) == b'*4\r\n$4\r\nZADD\r\n$3\r\nkey\r\n$3\r\n1.5\r\n$2\r\n10\r\n' , 'Expected numbers encoded as strings'
+
+    def test_export(self):
+        stream = io.BytesIO()
+        assert ExportRESPModel.saver.exportRESP(generateObjs(25), stream, batchSize=10) == 25 , 'Expected number written'
+
+        commands = self._load(stream.getvalue())
+        commandNames = [ command[0] for command in commands ]
+        assert commandNames.count(b'HMSET') == 25 , 'Expected one HMSET per object'
+        assert commandNames[-1] == b'EVAL' and commands[-1][3] == ExportRESPModel.objects._get_next_id_key().encode('utf-8') , 'Expected final raise of next id'
+        numIdsSadds = len( [ command for command in commands if command[0] == b'SADD' and command[1] == ExportRESPModel.objects._get_ids_key().encode('utf-8') ] )
+        assert numIdsSadds == 3 , 'Expected one ids SADD per batch. Got %d' %(numIdsSadds, )
+
+        self._checkLoaded(25)
+
+        # Continues after existing objects (and the one saved and deleted by _checkLoaded)
+        stream = io.BytesIO()
+        objs = list(generateObjs(5))
+        ExportRESPModel.saver.exportRESP(objs, stream)
+        assert objs[0]._id == 27 , 'Expected export to start after the existing objects'
+        self._load(stream.getvalue())
+        assert ExportRESPModel.objects.count() == 30 , 'Expected all loaded'
+
+    def test_startIdAndFile(self):
+        fd, path = tempfile.mkstemp(suffix='.resp')
+        os.close(fd)
+        try:
+            assert ExportRESPModel.saver.exportRESP(generateObjs(12), path, startId=100) == 12 , 'Expected number written'
+
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            self._load(data)
+            assert ExportRESPModel.objects.getPrimaryKeys(sortByAge=True) == list(range(100, 112)) , 'Expected primary keys from startId'
+        finally:
+            os.remove(path)
+
+    def test_lowerStartId(self):
+        ExportRESPModel.saver.save( list(generateObjs(10)) )
+        conn = ExportRESPModel.objects._get_connection()
+        nextIdKey = ExportRESPModel.objects._get_next_id_key()
+        assert conn.get(nextIdKey) == b'10' , 'Expected next id after saved objects'
+
+        stream = io.BytesIO()
+        ExportRESPModel.saver.exportRESP(generateObjs(3), stream, startId=4)
+        self._load(stream.getvalue())
+        assert conn.get(nextIdKey) == b'10' , 'Expected next id not lowered. Got: %s' %(repr(conn.get(nextIdKey)), )
+
+        newObj = ExportRESPModel(name='after', color='red', description='', num=-1, price=0, data=b'')
+        newObj.save()
+        assert newObj._id == 11 , 'Expected no primary key reused. Got: %s' %(repr(newObj._id), )
+
+    def test_redisCliPipe(self):
+        try:
+            subprocess.Popen(['redis-cli', '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()
+        except OSError:
+            # redis-cli not installed
+            return
+
+        stream = io.BytesIO()
+        ExportRESPModel.saver.exportRESP(generateObjs(40), stream, batchSize=15)
+
+        params = TestProperties.REDIS_CONNECTION_PARAMS
+        pipe = subprocess.Popen(['redis-cli', '-h', params['host'], '-p', str(params['port']), '-n', str(params['db']), '--pipe'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        (out, err) = pipe.communicate(stream.getvalue())
+        assert pipe.returncode == 0 , 'Expected redis-cli --pipe to succeed. Got: %s %s' %(repr(out), repr(err))
+        assert b'errors: 0' in out , 'Expected no errors. Got: %s' %(repr(out), )
+
+        self._checkLoaded(40)
+
+    def test_invalid(self):
+        obj = ExportRESPModel(name='x', color='red', description='', num=0, price=0, data=b'')
+        obj.save()
+
+        for func in (
+            lambda : ExportRESPModel.saver.exportRESP( [ obj ], io.BytesIO() ),
+            lambda : ExportRESPModel.saver.exportRESP( [], io.BytesIO(), batchSize=0 ),
+        ):
+            gotException = False
+            try:
+                func()
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError'
+
+        stream = io.BytesIO()
+        assert ExportRESPModel.saver.exportRESP( [], stream ) == 0 , 'Expected nothing written'
+        assert stream.getvalue() == b'' , 'Expected no commands'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
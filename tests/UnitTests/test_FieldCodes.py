@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_FieldCodes - GoodTests unit tests for models using COMPRESS_FIELD_NAMES
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, irNull, INDEX_VALUE_FIELD_PREFIX
+from IndexedRedis.compact import PACKED_FIELD_NAME
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class FieldCodesModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('customer_name'), IRField('customer_shipping_address_line1'), IRField('customer_shipping_address_line2'), IRField('order_count', valueType=int) ]
+
+    INDEXED_FIELDS = ['customer_name', 'order_count']
+
+    KEY_NAME = 'Test_FieldCodesModel'
+
+    COMPRESS_FIELD_NAMES = True
+
+
+class FieldCodesCompactModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('customer_name'), IRField('customer_shipping_address_line1'), IRField('customer_shipping_address_line2') ]
+
+    INDEXED_FIELDS = ['customer_name']
+
+    KEY_NAME = 'Test_FieldCodesCompactModel'
+
+    COMPRESS_FIELD_NAMES = True
+
+    COMPACT_STORAGE = True
+
+
+class TestFieldCodes(object):
+
+    def setup_method(self, *args, **kwargs):
+        for model in (FieldCodesModel, FieldCodesCompactModel):
+            model.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        for model in (FieldCodesModel, FieldCodesCompactModel):
+            model.deleter.destroyModel()
+
+    def _getRawHashKeys(self, model, pk):
+        '''
+            _getRawHashKeys - Get the field names in the object's hash, excluding the recorded index values
+        '''
+        conn = model.objects._get_connection()
+        return sorted( [ key.decode('ascii') for key in conn.hkeys(model.objects._get_key_for_id(pk)) if not key.decode('ascii').startswith(INDEX_VALUE_FIELD_PREFIX) ] )
+
+    def test_codesAreUsed(self):
+        obj = FieldCodesModel(customer_name='Tim', customer_shipping_address_line1='123 Main St', customer_shipping_address_line2='Apt 4', order_count=3)
+        obj.save()
+
+        rawKeys = self._getRawHashKeys(FieldCodesModel, obj._id)
+        assert len(rawKeys) == 4 , 'Expected 4 hash fields. Got: %s' %(repr(rawKeys), )
+        for rawKey in rawKeys:
+            assert len(rawKey) == 1 , 'Expected short codes to be used as hash field names. Got: %s' %(repr(rawKeys), )
+
+        conn = FieldCodesModel.objects._get_connection()
+        schema = conn.hgetall(FieldCodesModel.objects._get_schema_key())
+        assert len(schema) == 4 , 'Expected a code for each field in the schema. Got: %s' %(repr(schema), )
+
+    def test_saveAndFetch(self):
+        obj = FieldCodesModel(customer_name='Tim', customer_shipping_address_line1='123 Main St', order_count=3)
+        obj.save()
+
+        fetched = FieldCodesModel.objects.filter(customer_name='Tim').first()
+        assert fetched , 'Expected to fetch object via index'
+        assert fetched.customer_shipping_address_line1 == '123 Main St' , 'Expected field to be decoded from code. Got: %s' %(repr(fetched.customer_shipping_address_line1), )
+        assert fetched.customer_shipping_address_line2 == irNull , 'Expected unset field to be irNull'
+        assert fetched.order_count == 3 , 'Expected order_count to be 3'
+
+        partial = FieldCodesModel.objects.getOnlyFields(obj._id, ['customer_shipping_address_line1'])
+        assert partial.customer_shipping_address_line1 == '123 Main St' , 'Expected getOnlyFields to use field codes'
+
+        partials = FieldCodesModel.objects.getMultipleOnlyFields([obj._id, obj._id], ['order_count'])
+        assert [ x.order_count for x in partials ] == [3, 3] , 'Expected getMultipleOnlyFields to use field codes'
+
+        fetched.customer_shipping_address_line2 = 'Apt 4'
+        fetched.order_count = 4
+        fetched.save()
+
+        refetched = FieldCodesModel.objects.get(obj._id)
+        assert refetched.customer_shipping_address_line2 == 'Apt 4' , 'Expected update to be saved under field code'
+        assert FieldCodesModel.objects.filter(order_count=4).count() == 1 , 'Expected index to be updated'
+        assert len(self._getRawHashKeys(FieldCodesModel, obj._id)) == 4 , 'Expected update to not add full-name hash fields'
+
+    def test_codesStableAfterDestroy(self):
+        obj = FieldCodesModel(customer_name='Tim')
+        obj.save()
+
+        conn = FieldCodesModel.objects._get_connection()
+        schemaBefore = conn.hgetall(FieldCodesModel.objects._get_schema_key())
+
+        FieldCodesModel.deleter.destroyModel()
+
+        schemaAfter = conn.hgetall(FieldCodesModel.objects._get_schema_key())
+        assert schemaBefore == schemaAfter , 'Expected field code table to survive destroyModel'
+
+    def test_destroyReloadsCodes(self):
+        obj = FieldCodesModel(customer_name='Tim')
+        obj.save()
+
+        # Simulate the code table being rewritten from elsewhere (e.x. a FLUSHDB, then another process assigning codes)
+        conn = FieldCodesModel.objects._get_connection()
+        schemaKey = FieldCodesModel.objects._get_schema_key()
+        conn.delete(schemaKey)
+        conn.hset(schemaKey, mapping={ 'customer_name' : 'z', 'customer_shipping_address_line1' : 'y', 'customer_shipping_address_line2' : 'x', 'order_count' : 'w' })
+
+        FieldCodesModel.deleter.destroyModel()
+
+        obj = FieldCodesModel(customer_name='Bob', customer_shipping_address_line1='1', customer_shipping_address_line2='2', order_count=3)
+        obj.save()
+        assert self._getRawHashKeys(FieldCodesModel, obj._id) == ['w', 'x', 'y', 'z'] , 'Expected codes reloaded from Redis after destroyModel. Got: %s' %(repr(self._getRawHashKeys(FieldCodesModel, obj._id)), )
+        assert FieldCodesModel.objects.get(obj._id).customer_shipping_address_line2 == '2' , 'Expected fetch with the reloaded codes'
+
+    def test_withCompactStorage(self):
+        obj = FieldCodesCompactModel(customer_name='Tim', customer_shipping_address_line1='123 Main St')
+        obj.save()
+
+        rawKeys = self._getRawHashKeys(FieldCodesCompactModel, obj._id)
+        assert len(rawKeys) == 2 and PACKED_FIELD_NAME in rawKeys , 'Expected one coded indexed field and the packed field. Got: %s' %(repr(rawKeys), )
+
+        fetched = FieldCodesCompactModel.objects.get(obj._id)
+        assert fetched.customer_name == 'Tim' , 'Expected indexed field to be decoded'
+        assert fetched.customer_shipping_address_line1 == '123 Main St' , 'Expected packed field to be decoded'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_ForkSafety - GoodTests unit tests ensuring forked processes do not reuse the parent's connection pools
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import os
+import sys
+import subprocess
+
+import IndexedRedis
+from IndexedRedis import IndexedRedisModel, IRField, getRedisPool
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class ForkSafetyModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name') ]
+
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_ForkSafetyModel'
+
+
+class TestForkSafety(object):
+
+    def setup_method(self, *args, **kwargs):
+        ForkSafetyModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        ForkSafetyModel.deleter.destroyModel()
+
+    def _runInChild(self, func):
+        '''
+            _runInChild - Fork, run #func in the child, and return what it wrote (as a str)
+        '''
+        (readFd, writeFd) = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:
+            os.close(readFd)
+            try:
+                result = func()
+            except Exception as e:
+                result = 'EXCEPTION: %s' %(str(e), )
+            os.write(writeFd, result.encode('utf-8'))
+            os._exit(0)
+
+        os.close(writeFd)
+
+        output = []
+        while True:
+            data = os.read(readFd, 4096)
+            if not data:
+                break
+            output.append(data)
+
+        os.close(readFd)
+        os.waitpid(pid, 0)
+
+        return b''.join(output).decode('utf-8')
+
+    def test_childGetsNewPool(self):
+        obj = ForkSafetyModel(name='parent')
+        obj.save()
+
+        parentPool = getRedisPool(ForkSafetyModel.REDIS_CONNECTION_PARAMS)
+
+        def inChild():
+            childPool = getRedisPool(ForkSafetyModel.REDIS_CONNECTION_PARAMS)
+            if childPool is parentPool:
+                return 'SAME POOL'
+            if [ pool for pool in IndexedRedis.RedisPools.values() if pool is parentPool ]:
+                return 'PARENT POOL STILL REGISTERED'
+
+            childObj = ForkSafetyModel(name='child')
+            childObj.save()
+
+            return ForkSafetyModel.objects.get(obj._id).name
+
+        result = self._runInChild(inChild)
+
+        assert result == 'parent' , 'Expected child to use its own pool and fetch the object. Got: %s' %(result, )
+
+        # Make sure the parent's connections still work after the child used (and closed) its own
+        assert ForkSafetyModel.objects.get(obj._id).name == 'parent' , 'Expected parent connection to still work after fork'
+        assert ForkSafetyModel.objects.filter(name='child').count() == 1 , 'Expected object saved by child to be visible'
+        assert getRedisPool(ForkSafetyModel.REDIS_CONNECTION_PARAMS) is parentPool , 'Expected parent to keep its pool'
+
+    def test_resetAfterForkHook(self):
+        getRedisPool(ForkSafetyModel.REDIS_CONNECTION_PARAMS)
+
+        def inChild():
+            # Simulate a fork without the at-fork hook (e.x. python2) by only changing the recorded pid
+            IndexedRedis._redisPoolsPid = -1
+            pool = getRedisPool(ForkSafetyModel.REDIS_CONNECTION_PARAMS)
+            if IndexedRedis._redisPoolsPid != os.getpid():
+                return 'PID NOT UPDATED'
+            if len(IndexedRedis.RedisPools) != 1 or list(IndexedRedis.RedisPools.values())[0] is not pool:
+                return 'POOLS NOT RESET'
+            return 'OK'
+
+        result = self._runInChild(inChild)
+        assert result == 'OK' , 'Expected pools to be recreated when pid changes. Got: %s' %(result, )
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Increment - GoodTests unit tests for atomically incrementing numeric fields on the server (increment)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+import threading
+
+from IndexedRedis import IndexedRedisModel, IRField, INDEX_VALUE_FIELD_PREFIX, irNull
+from IndexedRedis.fields import IRFixedPointField
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class IncrementModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('views', valueType=int), IRField('rank', valueType=int), IRFixedPointField('balance', decimalPlaces=2), IRField('hashed', valueType=int, hashIndex=True) ]
+
+    INDEXED_FIELDS = ['name', 'rank', 'balance', 'hashed']
+
+    KEY_NAME = 'Test_IncrementModel'
+
+
+class IncrementCompactModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('views', valueType=int) ]
+
+    INDEXED_FIELDS = ['name']
+
+    COMPACT_STORAGE = True
+
+    KEY_NAME = 'Test_IncrementCompactModel'
+
+
+class TestIncrement(object):
+
+    def setup_method(self, *args, **kwargs):
+        IncrementModel.deleter.destroyModel()
+        IncrementCompactModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        IncrementModel.deleter.destroyModel()
+        IncrementCompactModel.deleter.destroyModel()
+
+    def _saveOne(self, **kwargs):
+        values = { 'name' : 'one', 'views' : 0, 'rank' : 5, 'balance' : 1.25, 'hashed' : 1 }
+        values.update(kwargs)
+        obj = IncrementModel(**values)
+        obj.save()
+        return obj
+
+    def test_incrementInt(self):
+        obj = self._saveOne()
+
+        assert IncrementModel.objects.increment(obj._id, 'views') == 1 , 'Expected default delta of 1'
+        assert IncrementModel.objects.increment(obj._id, 'views', 10) == 11 , 'Expected delta added'
+        assert IncrementModel.objects.increment(obj._id, 'views', -20) == -9 , 'Expected negative delta'
+
+        fetched = IncrementModel.objects.get(obj._id)
+        assert fetched.views == -9 , 'Expected stored value. Got: %s' %(repr(fetched.views), )
+        assert fetched.name == 'one' and fetched.rank == 5 , 'Expected other fields unchanged'
+
+        big = 10 ** 15
+        assert IncrementModel.objects.increment(obj._id, 'views', big) == big - 9 , 'Expected large values kept exact'
+
+        assert IncrementModel.objects.increment(9999, 'views') is None , 'Expected None for missing object'
+        assert IncrementModel.objects.get(9999) is None , 'Expected missing object not created'
+
+    def test_incrementIndexed(self):
+        obj = self._saveOne()
+        other = self._saveOne(name='two')
+
+        assert IncrementModel.objects.increment(obj._id, 'rank', 3) == 8 , 'Expected new rank'
+        assert IncrementModel.objects.filter(rank=8).getPrimaryKeys() == [ obj._id ] , 'Expected object in new index'
+        assert IncrementModel.objects.filter(rank=5).getPrimaryKeys() == [ other._id ] , 'Expected object removed from old index'
+
+        assert IncrementModel.objects.increment(obj._id, 'rank', 0) == 8 , 'Expected zero delta to keep value'
+        assert IncrementModel.objects.filter(rank=8).getPrimaryKeys() == [ obj._id ] , 'Expected object kept in index on zero delta'
+
+        # Still deletable from the recorded index value
+        IncrementModel.deleter.deleteByPk(obj._id)
+        assert IncrementModel.objects.filter(rank=8).count() == 0 , 'Expected index entry removed on delete'
+
+    def test_incrementFixedPoint(self):
+        obj = self._saveOne()
+
+        assert IncrementModel.objects.increment(obj._id, 'balance', 0.1) == 1.35 , 'Expected fixed point increment'
+        assert IncrementModel.objects.increment(obj._id, 'balance', 0.2) == 1.55 , 'Expected fixed point increment'
+        assert IncrementModel.objects.increment(obj._id, 'balance', 0.004) == 1.55 , 'Expected delta rounded to decimalPlaces'
+        assert IncrementModel.objects.increment(obj._id, 'balance', -2) == -0.45 , 'Expected negative result'
+
+        conn = IncrementModel.objects._get_connection()
+        key = IncrementModel.objects._get_key_for_id(obj._id)
+        assert conn.hget(key, 'balance') == b'-0.45' , 'Expected stored value formatted to decimalPlaces. Got: %s' %(repr(conn.hget(key, 'balance')), )
+
+        assert IncrementModel.objects.filter(balance=-0.45).getPrimaryKeys() == [ obj._id ] , 'Expected object in new index'
+        assert IncrementModel.objects.filter(balance=1.25).count() == 0 , 'Expected object removed from old index'
+
+    def test_notRecorded(self):
+        obj = self._saveOne()
+
+        # The index value of a plain field is the stored value, so is not recorded
+        conn = IncrementModel.objects._get_connection()
+        assert conn.hget(IncrementModel.objects._get_key_for_id(obj._id), INDEX_VALUE_FIELD_PREFIX + 'rank') is None , 'Expected index value not recorded'
+
+        assert IncrementModel.objects.increment(obj._id, 'rank') == 6 , 'Expected increment'
+        assert IncrementModel.objects.filter(rank=5).count() == 0 , 'Expected old index found from the stored value'
+        assert IncrementModel.objects.filter(rank=6).getPrimaryKeys() == [ obj._id ] , 'Expected new index'
+
+    def test_concurrent(self):
+        obj = self._saveOne()
+
+        def incrementMany():
+            for i in range(50):
+                IncrementModel.objects.increment(obj._id, 'rank')
+
+        threads = [ threading.Thread(target=incrementMany) for i in range(4) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert IncrementModel.objects.get(obj._id).rank == 205 , 'Expected no lost increments'
+        assert IncrementModel.objects.filter(rank=205).getPrimaryKeys() == [ obj._id ] , 'Expected final index'
+        assert IncrementModel.objects.filter(rank__ne=205).count() == 0 , 'Expected no stale index entries'
+
+    def test_invalid(self):
+        obj = self._saveOne(views=irNull)
+
+        compactObj = IncrementCompactModel(name='x', views=1)
+        compactObj.save()
+
+        for func in (
+            lambda : IncrementModel.objects.increment(obj._id, 'nosuchfield'),
+            lambda : IncrementModel.objects.increment(obj._id, 'name'),
+            lambda : IncrementModel.objects.increment(obj._id, 'hashed'),
+            lambda : IncrementModel.objects.increment(obj._id, 'rank', 1.5),
+            lambda : IncrementModel.objects.increment(obj._id, 'views'),
+            lambda : IncrementCompactModel.objects.increment(compactObj._id, 'views'),
+        ):
+            gotException = False
+            try:
+                func()
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError'
+
+        assert IncrementModel.objects.get(obj._id) == obj , 'Expected nothing changed'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
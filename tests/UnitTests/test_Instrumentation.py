@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Instrumentation - GoodTests unit tests for operation observers (addOperationObserver) and OperationStatsAggregator
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, addOperationObserver, removeOperationObserver, OperationStatsAggregator
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class InstrumentedModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('value') ]
+
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_InstrumentedModel'
+
+
+class TestInstrumentation(object):
+
+    def setup_method(self, *args, **kwargs):
+        InstrumentedModel.deleter.destroyModel()
+
+        self.events = []
+        self.aggregator = OperationStatsAggregator()
+
+        addOperationObserver(self.events.append)
+        addOperationObserver(self.aggregator)
+
+    def teardown_method(self, *args, **kwargs):
+        removeOperationObserver(self.events.append)
+        removeOperationObserver(self.aggregator)
+
+        InstrumentedModel.deleter.destroyModel()
+
+    def _getEvents(self, operation):
+        return [ event for event in self.events if event.operation == operation and event.model is InstrumentedModel ]
+
+    def test_events(self):
+        objs = [ InstrumentedModel(name='one', value='a'), InstrumentedModel(name='one', value='b'), InstrumentedModel(name='two', value='c') ]
+        InstrumentedModel.saver.save(objs)
+
+        saveEvents = self._getEvents('save')
+        assert len(saveEvents) == 1 , 'Expected one save event. Got: %s' %(repr(saveEvents), )
+        assert saveEvents[0].numMatched == 3 , 'Expected save event to count 3 objects'
+        assert saveEvents[0].numCommands >= 3 * 3 , 'Expected save to count commands in pipeline. Got: %d' %(saveEvents[0].numCommands, )
+
+        fetched = InstrumentedModel.objects.filter(name='one').filter(name__ne='three').all()
+        assert len(fetched) == 2 , 'Expected to fetch two objects'
+
+        pkEvents = self._getEvents('getPrimaryKeys')
+        assert len(pkEvents) == 1 , 'Expected one getPrimaryKeys event'
+        assert pkEvents[0].numFilters == 1 and pkEvents[0].numNotFilters == 1 , 'Expected filter counts on event. Got: %s' %(repr(pkEvents[0]), )
+        assert pkEvents[0].numMatched == 2 , 'Expected 2 matched pks'
+
+        multiEvents = self._getEvents('getMultiple')
+        assert len(multiEvents) == 1 , 'Expected one getMultiple event'
+        event = multiEvents[0]
+        assert event.numMatched == 2 and event.numCommands == 2 , 'Expected 2 objects fetched with 2 commands. Got: %s' %(repr(event), )
+        assert event.replyBytes > 0 , 'Expected reply size to be measured'
+        assert event.redisTime >= 0 and event.pythonTime >= 0 , 'Expected times to be non-negative'
+        assert abs(event.totalTime - (event.redisTime + event.pythonTime)) < 0.001 , 'Expected redis time + python time to equal total time'
+
+        assert InstrumentedModel.objects.filter(name='two').count() == 1
+        assert len(self._getEvents('count')) == 1 , 'Expected a count event'
+
+        InstrumentedModel.deleter.deleteMultiple(fetched)
+        deleteEvents = self._getEvents('deleteMultiple')
+        assert len(deleteEvents) == 1 and deleteEvents[0].numMatched == 2 , 'Expected a deleteMultiple event for 2 objects'
+
+    def test_aggregator(self):
+        for i in range(3):
+            InstrumentedModel(name='x', value=str(i)).save()
+
+        InstrumentedModel.objects.filter(name='x').all()
+        InstrumentedModel.objects.reindex()
+
+        stats = self.aggregator.getStats()
+
+        saveStats = stats.get( ('Test_InstrumentedModel', 'save') )
+        assert saveStats and saveStats['count'] == 3 and saveStats['numMatched'] == 3 , 'Expected 3 saves to be aggregated. Got: %s' %(repr(saveStats), )
+        assert saveStats['maxTime'] <= saveStats['totalTime'] , 'Expected max time to be no more than total time'
+
+        assert ('Test_InstrumentedModel', 'reindex') in stats , 'Expected reindex to be aggregated'
+
+        self.aggregator.reset()
+        assert not self.aggregator.getStats() , 'Expected reset to clear stats'
+
+    def test_badObserver(self):
+        def badObserver(event):
+            raise ValueError('bad')
+
+        addOperationObserver(badObserver)
+        oldStderr = sys.stderr
+        try:
+            sys.stderr = open('/dev/null', 'w')
+            obj = InstrumentedModel(name='bad')
+            obj.save()
+        finally:
+            sys.stderr.close()
+            sys.stderr = oldStderr
+            removeOperationObserver(badObserver)
+
+        assert InstrumentedModel.objects.filter(name='bad').count() == 1 , 'Expected save to succeed even when an observer raises'
+        assert self._getEvents('save') , 'Expected other observers to still get the event'
+
+    def test_noObservers(self):
+        removeOperationObserver(self.events.append)
+        removeOperationObserver(self.aggregator)
+
+        InstrumentedModel(name='none').save()
+        InstrumentedModel.objects.filter(name='none').all()
+
+        assert not self.events , 'Expected no events once observers are removed'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
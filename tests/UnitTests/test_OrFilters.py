@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_OrFilters - GoodTests unit tests for __in filters and Or(...) filters
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, Or, scripts
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class OrFilterModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('status'), IRField('priority'), IRField('owner'), IRField('num', valueType=int) ]
+
+    INDEXED_FIELDS = ['status', 'priority', 'owner', 'num']
+
+    KEY_NAME = 'Test_OrFilterModel'
+
+
+class TestOrFilters(object):
+
+    def setup_method(self, *args, **kwargs):
+        OrFilterModel.deleter.destroyModel()
+
+        self.origProbeMax = scripts.PLANNER_PROBE_MAX_CARDINALITY
+
+        statuses = ['open', 'pending', 'closed', 'rejected']
+        priorities = ['low', 'high']
+        owners = ['tim', 'bob', 'sue']
+        objs = [ OrFilterModel(status=statuses[i % 4], priority=priorities[i % 2], owner=owners[i % 3], num=i) for i in range(48) ]
+        OrFilterModel.saver.save(objs)
+
+        self.allObjs = OrFilterModel.objects.all()
+
+    def teardown_method(self, *args, **kwargs):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = self.origProbeMax
+
+        OrFilterModel.deleter.destroyModel()
+
+    def _expected(self, func):
+        return sorted( [ obj._id for obj in self.allObjs if func(obj) ] )
+
+    def _checkQueries(self):
+        checks = [
+            ( OrFilterModel.objects.filter(status__in=['open', 'pending']), lambda obj : obj.status in ('open', 'pending') ),
+            ( OrFilterModel.objects.filter(status__in=['open', 'pending'], owner='tim'), lambda obj : obj.status in ('open', 'pending') and obj.owner == 'tim' ),
+            ( OrFilterModel.objects.filter(status__in=['open', 'pending'], owner__ne='tim'), lambda obj : obj.status in ('open', 'pending') and obj.owner != 'tim' ),
+            ( OrFilterModel.objects.filter(Or(status='open', priority='high')), lambda obj : obj.status == 'open' or obj.priority == 'high' ),
+            ( OrFilterModel.objects.filter(Or(status='closed', owner__in=['bob', 'sue']), priority='low'), lambda obj : (obj.status == 'closed' or obj.owner in ('bob', 'sue')) and obj.priority == 'low' ),
+            ( OrFilterModel.objects.filter(Or(status='open', priority='high'), Or(owner='tim', num__in=[1, 2, 3])), lambda obj : (obj.status == 'open' or obj.priority == 'high') and (obj.owner == 'tim' or obj.num in (1, 2, 3)) ),
+            ( OrFilterModel.objects.filter(status__in=['nope', 'nada']), lambda obj : False ),
+            ( OrFilterModel.objects.filter(status__in=['open', 'pending'], owner='nobody'), lambda obj : False ),
+            ( OrFilterModel.objects.filter(status__in=['open']), lambda obj : obj.status == 'open' ),
+        ]
+        for query, func in checks:
+            expected = self._expected(func)
+            got = query.getPrimaryKeys(sortByAge=True)
+            assert got == expected , 'Wrong result for filters=%s orFilters=%s notFilters=%s (probeMax=%d). Expected %s, got %s' %( \
+                repr(query.filters), repr(query.orFilters), repr(query.notFilters), scripts.PLANNER_PROBE_MAX_CARDINALITY, repr(expected), repr(got))
+            assert query.count() == len(expected) , 'Wrong count for filters=%s orFilters=%s' %(repr(query.filters), repr(query.orFilters))
+            assert sorted( [ obj._id for obj in query.all() ] ) == expected , 'Wrong objects from all()'
+
+    def test_probePath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 1000
+        self._checkQueries()
+
+    def test_unionPath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 0
+        self._checkQueries()
+
+        conn = OrFilterModel.objects._get_connection()
+        tempKeys = conn.keys(OrFilterModel.objects._get_ids_key() + '__*')
+        assert not tempKeys , 'Expected temporary union keys to be removed. Got: %s' %(repr(tempKeys), )
+
+    def test_emptyIn(self):
+        query = OrFilterModel.objects.filter(status__in=[])
+        assert query.getPrimaryKeys() == [] , 'Expected empty __in to match nothing'
+        assert query.count() == 0 , 'Expected empty __in to count 0'
+
+    def test_delete(self):
+        numDeleted = OrFilterModel.objects.filter(status__in=['open', 'pending']).delete()
+        assert numDeleted == 24 , 'Expected to delete 24 objects. Got: %s' %(repr(numDeleted), )
+        assert OrFilterModel.objects.count() == 24 , 'Expected only matched objects to be deleted'
+
+    def test_invalid(self):
+        for func in (
+            lambda : Or(status__ne='open'),
+            lambda : Or(),
+            lambda : OrFilterModel.objects.filter(Or(notIndexed='x')),
+            lambda : OrFilterModel.objects.filter(status__in='open'),
+            lambda : OrFilterModel.objects.filter( { 'status' : 'open' } ),
+        ):
+            gotError = False
+            try:
+                func()
+            except ValueError:
+                gotError = True
+
+            assert gotError , 'Expected ValueError'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_OrderBy - GoodTests unit tests for ordering query results by a field (orderBy)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, Or
+from IndexedRedis.fields import IRFixedPointField
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class OrderByModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('color'), IRField('name'), IRField('num', valueType=int), IRFixedPointField('price', decimalPlaces=2), IRField('other') ]
+
+    INDEXED_FIELDS = ['color', 'name']
+
+    KEY_NAME = 'Test_OrderByModel'
+
+
+class OrderByCompactModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('color'), IRField('name') ]
+
+    INDEXED_FIELDS = ['color']
+
+    COMPACT_STORAGE = True
+
+    KEY_NAME = 'Test_OrderByCompactModel'
+
+
+NAMES = ['delta', 'alpha', 'echo', 'charlie', 'bravo', 'foxtrot', 'golf', 'hotel', 'india', 'juliet']
+# Out of order, and with values which sort differently as strings than as numbers
+NUMS = [5, 100, -3, 20, 7, 0, 9, 31, 2, 11]
+
+
+class TestOrderBy(object):
+
+    def setup_method(self, *args, **kwargs):
+        OrderByModel.deleter.destroyModel()
+        OrderByCompactModel.deleter.destroyModel()
+
+        colors = ['red', 'blue']
+        objs = [ OrderByModel(color=colors[i % 2], name=NAMES[i], num=NUMS[i], price=NUMS[i] / 4.0, other='x') for i in range(len(NAMES)) ]
+        OrderByModel.saver.save(objs)
+
+    def teardown_method(self, *args, **kwargs):
+        OrderByModel.deleter.destroyModel()
+        OrderByCompactModel.deleter.destroyModel()
+
+    def test_orderAlpha(self):
+        objs = OrderByModel.objects.orderBy('name').all()
+        assert [ obj.name for obj in objs ] == sorted(NAMES) , 'Expected objects ordered by name. Got: %s' %(repr([ obj.name for obj in objs ]), )
+
+        objs = OrderByModel.objects.orderBy('name', desc=True).all()
+        assert [ obj.name for obj in objs ] == sorted(NAMES, reverse=True) , 'Expected objects ordered by name descending. Got: %s' %(repr([ obj.name for obj in objs ]), )
+
+        assert OrderByModel.objects.orderBy('name').first().name == 'alpha' , 'Expected first to follow order'
+        assert OrderByModel.objects.orderBy('name').last().name == 'juliet' , 'Expected last to follow order'
+
+    def test_orderNumeric(self):
+        objs = OrderByModel.objects.orderBy('num').all()
+        assert [ obj.num for obj in objs ] == sorted(NUMS) , 'Expected int field to be ordered as numbers. Got: %s' %(repr([ obj.num for obj in objs ]), )
+
+        objs = OrderByModel.objects.orderBy('price', desc=True).all()
+        assert [ obj.num for obj in objs ] == sorted(NUMS, reverse=True) , 'Expected fixed point field to be ordered as numbers, descending. Got: %s' %(repr([ obj.num for obj in objs ]), )
+
+    def test_orderByPk(self):
+        allPks = sorted(OrderByModel.objects.getPrimaryKeys())
+
+        assert OrderByModel.objects.orderBy('_id').getPrimaryKeys() == allPks , 'Expected ordering by _id to be oldest first'
+        assert OrderByModel.objects.orderBy('_id', desc=True).getPrimaryKeys() == list(reversed(allPks)) , 'Expected ordering by _id desc to be newest first'
+        assert OrderByModel.objects.orderBy('_id', desc=True).limit(2).getPrimaryKeys() == list(reversed(allPks))[:2] , 'Expected newest 2'
+
+    def test_limitOffset(self):
+        sortedNums = sorted(NUMS, reverse=True)
+
+        objs = OrderByModel.objects.orderBy('num', desc=True).limit(3).all()
+        assert [ obj.num for obj in objs ] == sortedNums[:3] , 'Expected top 3. Got: %s' %(repr([ obj.num for obj in objs ]), )
+
+        objs = OrderByModel.objects.orderBy('num', desc=True).limit(3).offset(3).all()
+        assert [ obj.num for obj in objs ] == sortedNums[3:6] , 'Expected second page of 3. Got: %s' %(repr([ obj.num for obj in objs ]), )
+
+        assert OrderByModel.objects.orderBy('num').limit(3).count() == len(NUMS) , 'Expected count to ignore order and paging'
+
+    def test_filtered(self):
+        redNums = sorted( [ NUMS[i] for i in range(len(NUMS)) if i % 2 == 0 ] )
+
+        # Single index, sorted directly
+        objs = OrderByModel.objects.filter(color='red').orderBy('num').all()
+        assert [ obj.num for obj in objs ] == redNums , 'Expected filtered objects ordered by num. Got: %s' %(repr([ obj.num for obj in objs ]), )
+
+        # Negative filter, sorted through a temporary set
+        objs = OrderByModel.objects.filter(color__ne='blue').orderBy('num', desc=True).limit(2).all()
+        assert [ obj.num for obj in objs ] == list(reversed(redNums))[:2] , 'Expected top 2 red by num. Got: %s' %(repr([ obj.num for obj in objs ]), )
+
+        objs = OrderByModel.objects.filter(Or(color='red', name='alpha')).orderBy('name').all()
+        expectedNames = sorted( [ NAMES[i] for i in range(len(NAMES)) if i % 2 == 0 ] + ['alpha'] )
+        assert [ obj.name for obj in objs ] == expectedNames , 'Expected Or filter ordered by name. Got: %s' %(repr([ obj.name for obj in objs ]), )
+
+        assert OrderByModel.objects.filter(color='green').orderBy('num').all() == [] , 'Expected no results for no matches'
+
+    def test_nullValues(self):
+        nullObj = OrderByModel(color='red', name='zulu', other='x')
+        nullObj.save()
+
+        objs = OrderByModel.objects.orderBy('num').all()
+        assert objs[0]._id == nullObj._id , 'Expected null value to be ordered first'
+        assert [ obj.num for obj in objs[1:] ] == sorted(NUMS) , 'Expected remaining ordered by num. Got: %s' %(repr([ obj.num for obj in objs[1:] ]), )
+
+        objs = OrderByModel.objects.filter(color__ne='blue').orderBy('num', desc=True).all()
+        assert objs[-1]._id == nullObj._id , 'Expected null value to be ordered last when descending'
+
+    def test_allOnlyFields(self):
+        objs = OrderByModel.objects.orderBy('num', desc=True).limit(3).allOnlyFields(['name', 'num'])
+        sortedNums = sorted(NUMS, reverse=True)
+
+        assert [ obj.num for obj in objs ] == sortedNums[:3] , 'Expected only fields to follow order. Got: %s' %(repr([ obj.num for obj in objs ]), )
+        assert [ obj.name for obj in objs ] == [ NAMES[NUMS.index(num)] for num in sortedNums[:3] ] , 'Expected names fetched'
+        assert not [ obj for obj in objs if obj.other == 'x' ] , 'Expected other fields not fetched'
+
+        fullObjs = OrderByModel.objects.orderBy('num', desc=True).limit(3).all()
+        assert [ obj._id for obj in objs ] == [ obj._id for obj in fullObjs ] , 'Expected primary keys set on partial objects'
+
+        objs = OrderByModel.objects.filter(color__ne='blue').limit(2).allOnlyFields(['name'])
+        redNames = [ NAMES[i] for i in range(len(NAMES)) if i % 2 == 0 ]
+        assert [ obj.name for obj in objs ] == redNames[:2] , 'Expected paged only fields in pk order. Got: %s' %(repr([ obj.name for obj in objs ]), )
+
+    def test_compressed(self):
+        objs = [ OrderByCompactModel(color='red', name=name) for name in NAMES ]
+        OrderByCompactModel.saver.save(objs)
+
+        objs = OrderByCompactModel.objects.orderBy('color').orderBy('_id', desc=True).limit(2).all()
+        assert len(objs) == 2 and objs[0]._id > objs[1]._id , 'Expected _id order on compact model'
+
+    def test_invalid(self):
+        for func in (
+            lambda : OrderByModel.objects.orderBy('nosuchfield'),
+            lambda : OrderByCompactModel.objects.orderBy('name'),
+            lambda : OrderByModel.objects.orderBy('name').afterPk(1),
+            lambda : OrderByModel.objects.afterPk(1).orderBy('name'),
+        ):
+            gotException = False
+            try:
+                func()
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Paging - GoodTests unit tests for limit, offset, and afterPk on queries
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, Or, scripts
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class PagingModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('color'), IRField('size'), IRField('num', valueType=int) ]
+
+    INDEXED_FIELDS = ['color', 'size']
+
+    KEY_NAME = 'Test_PagingModel'
+
+
+class TestPaging(object):
+
+    def setup_method(self, *args, **kwargs):
+        self.origProbeMax = scripts.PLANNER_PROBE_MAX_CARDINALITY
+        PagingModel.deleter.destroyModel()
+
+        colors = ['red', 'green', 'blue']
+        objs = [ PagingModel(color=colors[i % 3], size='big' if i % 2 else 'small', num=i) for i in range(30) ]
+        PagingModel.saver.save(objs)
+
+        self.allObjs = PagingModel.objects.allByAge()
+
+    def teardown_method(self, *args, **kwargs):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = self.origProbeMax
+        PagingModel.deleter.destroyModel()
+
+    def _expectedPks(self, func):
+        return [ obj._id for obj in self.allObjs if func(obj) ]
+
+    def test_limitOffset(self):
+        allPks = self._expectedPks(lambda obj : True)
+
+        assert PagingModel.objects.limit(5).getPrimaryKeys() == allPks[:5] , 'Expected first 5 pks'
+        assert PagingModel.objects.limit(5).offset(10).getPrimaryKeys() == allPks[10:15] , 'Expected pks 10-15'
+        assert PagingModel.objects.offset(25).getPrimaryKeys() == allPks[25:] , 'Expected offset without limit to return the rest'
+        assert PagingModel.objects.limit(5).offset(40).getPrimaryKeys() == [] , 'Expected empty page past the end'
+        assert PagingModel.objects.limit(0).getPrimaryKeys() == [] , 'Expected limit(0) to return nothing'
+
+        objs = PagingModel.objects.limit(3).offset(3).all()
+        assert [ obj.num for obj in objs ] == [3, 4, 5] , 'Expected objects on page, in order. Got: %s' %(repr([ obj.num for obj in objs ]), )
+
+        assert PagingModel.objects.limit(3).count() == 30 , 'Expected count to ignore paging'
+
+    def test_filteredPages(self):
+        queries = [
+            ( PagingModel.objects.filter(color='red'), lambda obj : obj.color == 'red' ),
+            ( PagingModel.objects.filter(color='red', size='big'), lambda obj : obj.color == 'red' and obj.size == 'big' ),
+            ( PagingModel.objects.filter(color__ne='red'), lambda obj : obj.color != 'red' ),
+            ( PagingModel.objects.filter(color__in=['red', 'blue'], size__ne='big'), lambda obj : obj.color in ('red', 'blue') and obj.size != 'big' ),
+            ( PagingModel.objects.filter(Or(color='green', size='small')), lambda obj : obj.color == 'green' or obj.size == 'small' ),
+        ]
+        for query, func in queries:
+            expected = self._expectedPks(func)
+
+            assert query.limit(3).offset(2).getPrimaryKeys() == expected[2:5] , 'Wrong page for %s. Expected %s' %(repr(query.filters), repr(expected[2:5]))
+
+            # Walk through all pages with afterPk
+            pages = []
+            page = query.limit(4).all()
+            while page:
+                pages.append( [ obj._id for obj in page ] )
+                page = query.afterPk(page[-1]._id).limit(4).all()
+
+            assert sum(pages, []) == expected , 'Expected cursor paging to return every match once, in order. Got: %s' %(repr(pages), )
+            assert max( [ len(p) for p in pages ] ) <= 4 , 'Expected no page larger than limit'
+
+    def test_storedResults(self):
+        # Without probing, multi-index and negative results are stored in a temporary set on the server, and paged there
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 0
+
+        self.test_filteredPages()
+
+        expected = self._expectedPks(lambda obj : obj.color != 'red' and obj.size == 'big')
+        query = PagingModel.objects.filter(color__ne='red', size='big')
+        assert query.afterPk(expected[2]).limit(3).offset(1).getPrimaryKeys() == expected[4:7] , 'Expected offset to apply after cursor'
+        assert query.afterPk(expected[2]).getPrimaryKeys() == expected[3:] , 'Expected all pks after cursor without limit'
+        assert [ obj.num for obj in query.afterPk(expected[-2]).limit(5).all() ] == [ PagingModel.objects.get(expected[-1]).num ] , 'Expected last object after cursor'
+
+        conn = PagingModel.objects._get_connection()
+        tempKeys = conn.keys(PagingModel.objects._get_ids_key() + '__*')
+        assert not tempKeys , 'Expected temporary keys to be removed. Got: %s' %(repr(tempKeys), )
+
+    def test_afterPk(self):
+        allPks = self._expectedPks(lambda obj : True)
+
+        assert PagingModel.objects.afterPk(allPks[9]).getPrimaryKeys() == allPks[10:] , 'Expected pks after cursor'
+        assert PagingModel.objects.afterPk(allPks[9]).limit(2).offset(1).getPrimaryKeys() == allPks[11:13] , 'Expected offset to apply after cursor'
+        assert PagingModel.objects.afterPk(allPks[-1]).limit(5).all() == [] , 'Expected nothing after last pk'
+
+        assert PagingModel.objects.afterPk(allPks[9]).first().num == 10 , 'Expected first() to honor cursor'
+
+    def test_pagedDelete(self):
+        PagingModel.objects.limit(5).delete()
+
+        assert PagingModel.objects.count() == 25 , 'Expected only the page to be deleted'
+        assert PagingModel.objects.limit(1).first().num == 5 , 'Expected the oldest objects to be deleted'
+
+    def test_invalid(self):
+        for func in ( lambda : PagingModel.objects.limit(-1), lambda : PagingModel.objects.offset(-5) ):
+            gotError = False
+            try:
+                func()
+            except ValueError:
+                gotError = True
+            assert gotError , 'Expected ValueError'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
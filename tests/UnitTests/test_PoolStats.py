@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_PoolStats - GoodTests unit tests for connection pool statistics (getPoolStats)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+import redis
+
+import IndexedRedis
+from IndexedRedis import IndexedRedisModel, IRField, getRedisPool, getPoolStats, resetPoolStats
+from IndexedRedis.connection_pool import IRConnectionPool, CHECKOUT_LATENCY_BUCKETS
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class PoolStatsModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name') ]
+
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_PoolStatsModel'
+
+
+class TestPoolStats(object):
+
+    def setup_method(self, *args, **kwargs):
+        PoolStatsModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        PoolStatsModel.deleter.destroyModel()
+
+    def _getStatsForModel(self):
+        pool = getRedisPool(PoolStatsModel.REDIS_CONNECTION_PARAMS)
+        allStats = getPoolStats()
+
+        matching = [ stats for hashValue, stats in allStats.items() if IndexedRedis.RedisPools.get(hashValue) is pool ]
+        assert len(matching) == 1 , 'Expected stats for the model\'s pool. Got: %s' %(repr(allStats), )
+
+        return matching[0]
+
+    def test_statsRecorded(self):
+        assert isinstance(getRedisPool(PoolStatsModel.REDIS_CONNECTION_PARAMS), IRConnectionPool) , 'Expected managed pool to be an IRConnectionPool'
+
+        resetPoolStats()
+
+        obj = PoolStatsModel(name='one')
+        obj.save()
+        PoolStatsModel.objects.filter(name='one').all()
+
+        stats = self._getStatsForModel()
+
+        assert stats['numCheckouts'] >= 2 , 'Expected checkouts to be counted. Got: %s' %(repr(stats), )
+        assert sum( [ count for (bound, count) in stats['latencyHistogram'] ] ) == stats['numCheckouts'] , 'Expected every checkout to be in the histogram'
+        assert len(stats['latencyHistogram']) == len(CHECKOUT_LATENCY_BUCKETS) + 1 , 'Expected a bucket for each bound, plus overflow'
+        assert stats['latencyHistogram'][-1][0] is None , 'Expected last bucket to be unbounded'
+        assert stats['inUse'] == 0 , 'Expected no connections in use after operations complete'
+        assert stats['idle'] >= 1 , 'Expected at least one idle connection'
+        assert stats['maxInUse'] >= 1 , 'Expected maxInUse to be recorded'
+        assert stats['numExhausted'] == 0 and stats['numErrors'] == 0 , 'Expected no failures'
+
+        resetPoolStats()
+        stats = self._getStatsForModel()
+        assert stats['numCheckouts'] == 0 and stats['maxInUse'] == 0 , 'Expected stats to be reset'
+
+    def test_exhausted(self):
+        pool = IRConnectionPool(host=TestProperties.REDIS_CONNECTION_PARAMS['host'], port=TestProperties.REDIS_CONNECTION_PARAMS['port'], max_connections=1)
+        try:
+            held = pool.get_connection()
+
+            gotError = False
+            try:
+                pool.get_connection()
+            except redis.ConnectionError:
+                gotError = True
+
+            assert gotError , 'Expected second checkout to fail with max_connections=1'
+
+            stats = pool.getStats()
+            assert stats['numExhausted'] == 1 , 'Expected exhausted checkout to be counted. Got: %s' %(repr(stats), )
+            assert stats['inUse'] == 1 and stats['maxInUse'] == 1 , 'Expected one connection in use. Got: %s' %(repr(stats), )
+            assert stats['maxConnections'] == 1 , 'Expected maxConnections to be reported'
+
+            pool.release(held)
+            stats = pool.getStats()
+            assert stats['inUse'] == 0 and stats['idle'] == 1 , 'Expected connection to be idle after release. Got: %s' %(repr(stats), )
+        finally:
+            pool.disconnect()
+
+    def test_connectErrors(self):
+        # Nothing should be listening on port 1
+        pool = IRConnectionPool(host='127.0.0.1', port=1, socket_connect_timeout=1)
+        try:
+            gotError = False
+            try:
+                pool.get_connection()
+            except Exception:
+                gotError = True
+
+            assert gotError , 'Expected connect to port 1 to fail'
+            stats = pool.getStats()
+            assert stats['numErrors'] == 1 and stats['numCheckouts'] == 0 , 'Expected failed connect to be counted as an error. Got: %s' %(repr(stats), )
+        finally:
+            pool.disconnect()
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
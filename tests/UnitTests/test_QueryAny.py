@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_QueryAny - GoodTests unit tests for checking whether anything matches a query (any / exists)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, Or
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class QueryAnyModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('active'), IRField('color') ]
+
+    INDEXED_FIELDS = ['name', 'active', 'color']
+
+    KEY_NAME = 'Test_QueryAnyModel'
+
+
+class TestQueryAny(object):
+
+    def setup_method(self, *args, **kwargs):
+        QueryAnyModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        QueryAnyModel.deleter.destroyModel()
+
+    def _saveSome(self):
+        colors = ['red', 'green', 'blue']
+        objs = [ QueryAnyModel(name='n%d' %(i % 5, ), active='yes' if i % 2 else 'no', color=colors[i % 3]) for i in range(60) ]
+        QueryAnyModel.saver.save(objs)
+
+    def test_empty(self):
+        assert QueryAnyModel.objects.any() is False , 'Expected no match on empty model'
+        assert QueryAnyModel.objects.filter(name='n1').any() is False , 'Expected no match on empty model with filter'
+        assert QueryAnyModel.objects.filter(name__ne='n1').any() is False , 'Expected no match on empty model with negative filter'
+
+        QueryAnyModel(name='n1', active='yes', color='red').save()
+        assert QueryAnyModel.objects.any() is True , 'Expected match after save'
+
+    def test_matchesCount(self):
+        self._saveSome()
+
+        queries = [
+            { },
+            { 'name' : 'n1' },
+            { 'name' : 'n9' },
+            { 'active' : 'yes', 'color' : 'red' },
+            { 'active' : 'yes', 'color' : 'red', 'name' : 'n2' },
+            { 'active' : 'yes', 'color' : 'red', 'name' : 'n1' },
+            { 'active' : 'yes', 'color__ne' : 'red' },
+            { 'color__ne' : 'red', 'name__ne' : 'n0' },
+            { 'color' : 'purple', 'active' : 'yes' },
+            { 'color__in' : ['red', 'purple'], 'active' : 'no' },
+            { 'color__in' : ['purple', 'orange'] },
+            { 'color__in' : [] },
+        ]
+        for query in queries:
+            expected = QueryAnyModel.objects.filter(**query).count() > 0
+            got = QueryAnyModel.objects.filter(**query).any()
+            assert got is expected , 'Wrong any() for %s. Expected %s, got %s' %(repr(query), repr(expected), repr(got))
+            assert QueryAnyModel.objects.filter(**query).exists() is expected , 'Expected exists() without pk to match any() for %s' %(repr(query), )
+
+        assert QueryAnyModel.objects.filter(Or(color='red', name='n1'), active='yes', name__ne='n3').any() is True , 'Expected Or filter to match'
+        assert QueryAnyModel.objects.filter(Or(color='purple', name='n9'), active='yes').any() is False , 'Expected Or filter to not match'
+
+    def test_existsPk(self):
+        obj = QueryAnyModel(name='n1', active='yes', color='red')
+        obj.save()
+
+        assert QueryAnyModel.objects.exists(obj._id) , 'Expected exists(pk) to still check the primary key'
+        assert not QueryAnyModel.objects.exists(obj._id + 1) , 'Expected exists(pk) to be false for missing pk'
+
+    def test_scansBatches(self):
+        # Only one object matches, so the smallest index must be scanned across several SSCAN batches
+        objs = [ QueryAnyModel(name='big', active='yes', color='red') for i in range(1500) ]
+        objs.append( QueryAnyModel(name='big', active='no', color='blue') )
+        objs += [ QueryAnyModel(name='other', active='no', color='blue') for i in range(2000) ]
+        QueryAnyModel.saver.save(objs)
+
+        assert QueryAnyModel.objects.filter(name='big', color='blue').any() is True , 'Expected the one match to be found'
+        assert QueryAnyModel.objects.filter(name='big', active__ne='yes').any() is True , 'Expected the one match to be found with negative filter'
+        assert QueryAnyModel.objects.filter(name='big', active='no', color='red').any() is False , 'Expected no match'
+        assert QueryAnyModel.objects.filter(Or(name='big', active='no'), color='green').any() is False , 'Expected no match'
+
+        conn = QueryAnyModel.objects._get_connection()
+        tempKeys = conn.keys(QueryAnyModel.objects._get_ids_key() + '__*')
+        assert not tempKeys , 'Expected no temporary keys. Got: %s' %(repr(tempKeys), )
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_QueryDelete - GoodTests unit tests for deleting the results of a query on the server, in batches
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, Or, INDEX_VALUE_FIELD_PREFIX, scripts
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class QueryDeleteModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name', hashIndex=True), IRField('active'), IRField('color'), IRField('num', valueType=int) ]
+
+    INDEXED_FIELDS = ['name', 'active', 'color', 'num']
+
+    KEY_NAME = 'Test_QueryDeleteModel'
+
+
+class TestQueryDelete(object):
+
+    def setup_method(self, *args, **kwargs):
+        QueryDeleteModel.deleter.destroyModel()
+
+        self.origProbeMax = scripts.PLANNER_PROBE_MAX_CARDINALITY
+
+    def teardown_method(self, *args, **kwargs):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = self.origProbeMax
+
+        QueryDeleteModel.deleter.destroyModel()
+
+    def _saveSome(self):
+        colors = ['red', 'green', 'blue']
+        objs = [ QueryDeleteModel(name='n%d' %(i % 5, ), active='yes' if i % 2 else 'no', color=colors[i % 3], num=i) for i in range(60) ]
+        QueryDeleteModel.saver.save(objs)
+
+        return QueryDeleteModel.objects.allByAge()
+
+    def _checkRemaining(self, remaining):
+        assert QueryDeleteModel.objects.getPrimaryKeys(sortByAge=True) == [ obj._id for obj in remaining ] , 'Wrong remaining objects'
+
+        for fieldName in QueryDeleteModel.INDEXED_FIELDS:
+            for value in set( [ getattr(obj, fieldName) for obj in remaining ] ):
+                expected = [ obj._id for obj in remaining if getattr(obj, fieldName) == value ]
+                got = QueryDeleteModel.objects.filter(**{ fieldName : value }).getPrimaryKeys(sortByAge=True)
+                assert got == expected , 'Wrong index for %s=%s. Expected %s, got %s' %(fieldName, repr(value), repr(expected), repr(got))
+
+        conn = QueryDeleteModel.objects._get_connection()
+        tempKeys = conn.keys(QueryDeleteModel.objects._get_ids_key() + '__*')
+        assert not tempKeys , 'Expected temporary keys to be removed. Got: %s' %(repr(tempKeys), )
+
+    def _checkQueries(self):
+        queries = [
+            ( { 'color' : 'red' }, lambda obj : obj.color == 'red' ),
+            ( { 'active' : 'yes', 'name' : 'n1' }, lambda obj : obj.active == 'yes' and obj.name == 'n1' ),
+            ( { 'active' : 'no', 'color__ne' : 'blue' }, lambda obj : obj.active == 'no' and obj.color != 'blue' ),
+            ( { 'name__ne' : 'n0' }, lambda obj : obj.name != 'n0' ),
+        ]
+        for filters, matches in queries:
+            QueryDeleteModel.deleter.destroyModel()
+            objs = self._saveSome()
+
+            expected = [ obj for obj in objs if matches(obj) ]
+            numDeleted = QueryDeleteModel.objects.filter(**filters).delete(batchSize=7)
+            assert numDeleted == len(expected) , 'Expected %d deleted for %s. Got %d' %(len(expected), repr(filters), numDeleted)
+
+            self._checkRemaining( [ obj for obj in objs if not matches(obj) ] )
+
+    def test_probePath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 1000
+        self._checkQueries()
+
+    def test_setOperationPath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 0
+        self._checkQueries()
+
+    def test_progress(self):
+        objs = self._saveSome()
+
+        progress = []
+        numDeleted = QueryDeleteModel.objects.filter(active='yes').delete(batchSize=8, progressCallback=lambda numDeleted, numMatched : progress.append( (numDeleted, numMatched) ))
+
+        assert numDeleted == 30 , 'Expected 30 deleted. Got %d' %(numDeleted, )
+        assert progress == [ (8, 30), (16, 30), (24, 30), (30, 30) ] , 'Expected progress after each batch. Got: %s' %(repr(progress), )
+
+        self._checkRemaining( [ obj for obj in objs if obj.active != 'yes' ] )
+
+    def test_orAndPaged(self):
+        objs = self._saveSome()
+
+        numDeleted = QueryDeleteModel.objects.filter(Or(color='red', name='n1')).delete()
+        remaining = [ obj for obj in objs if not (obj.color == 'red' or obj.name == 'n1') ]
+        assert numDeleted == len(objs) - len(remaining) , 'Expected Or matches deleted'
+        self._checkRemaining(remaining)
+
+        assert QueryDeleteModel.objects.filter(color__in=[]).delete() == 0 , 'Expected nothing deleted for empty __in'
+        assert QueryDeleteModel.objects.filter(color='purple').delete() == 0 , 'Expected nothing deleted for no matches'
+
+        numDeleted = QueryDeleteModel.objects.filter(active='no').limit(3).delete()
+        assert numDeleted == 3 , 'Expected only the page to be deleted. Got %d' %(numDeleted, )
+        noPks = [ obj._id for obj in remaining if obj.active == 'no' ]
+        self._checkRemaining( [ obj for obj in remaining if obj._id not in noPks[:3] ] )
+
+    def test_notRecorded(self):
+        objs = self._saveSome()
+
+        # Simulate objects saved before index values were recorded
+        conn = QueryDeleteModel.objects._get_connection()
+        for obj in objs[:10]:
+            conn.hdel(QueryDeleteModel.objects._get_key_for_id(obj._id), INDEX_VALUE_FIELD_PREFIX + 'name')
+
+        numDeleted = QueryDeleteModel.objects.filter(color__ne='green').delete(batchSize=4)
+        assert numDeleted == 40 , 'Expected 40 deleted. Got %d' %(numDeleted, )
+        self._checkRemaining( [ obj for obj in objs if obj.color == 'green' ] )
+
+    def test_invalidBatchSize(self):
+        gotException = False
+        try:
+            QueryDeleteModel.objects.filter(color='red').delete(batchSize=0)
+        except ValueError:
+            gotException = True
+
+        assert gotException , 'Expected ValueError for batchSize 0'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_QueryPlanner - GoodTests unit tests for the server-side filter planner used by getPrimaryKeys
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, scripts
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class PlannerModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('active'), IRField('color'), IRField('num', valueType=int) ]
+
+    INDEXED_FIELDS = ['name', 'active', 'color', 'num']
+
+    KEY_NAME = 'Test_PlannerModel'
+
+
+class TestQueryPlanner(object):
+
+    def setup_method(self, *args, **kwargs):
+        PlannerModel.deleter.destroyModel()
+
+        self.origProbeMax = scripts.PLANNER_PROBE_MAX_CARDINALITY
+
+        colors = ['red', 'green', 'blue']
+        objs = [ PlannerModel(name='n%d' %(i % 5, ), active='yes' if i % 2 else 'no', color=colors[i % 3], num=i) for i in range(60) ]
+        PlannerModel.saver.save(objs)
+
+        self.allObjs = PlannerModel.objects.all()
+
+    def teardown_method(self, *args, **kwargs):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = self.origProbeMax
+
+        PlannerModel.deleter.destroyModel()
+
+    def _expected(self, **kwargs):
+        ret = []
+        for obj in self.allObjs:
+            matches = True
+            for key, value in kwargs.items():
+                if key.endswith('__ne'):
+                    if getattr(obj, key[:-4]) == value:
+                        matches = False
+                elif getattr(obj, key) != value:
+                    matches = False
+            if matches:
+                ret.append(obj._id)
+
+        return sorted(ret)
+
+    def _checkQueries(self):
+        queries = [
+            { 'active' : 'yes', 'color' : 'red' },
+            { 'active' : 'yes', 'color' : 'red', 'name' : 'n1' },
+            { 'active' : 'yes', 'color__ne' : 'red' },
+            { 'active' : 'yes', 'color' : 'blue', 'name__ne' : 'n3', 'num__ne' : 7 },
+            { 'color__ne' : 'red', 'name__ne' : 'n0' },
+            { 'color' : 'purple', 'active' : 'yes' },
+            { 'active' : 'yes', 'color__ne' : 'purple' },
+            { 'active' : 'no', 'name' : 'n1' },
+        ]
+        for query in queries:
+            expected = self._expected(**query)
+            got = PlannerModel.objects.filter(**query).getPrimaryKeys(sortByAge=True)
+            assert got == expected , 'Wrong result for %s (probeMax=%d). Expected %s, got %s' %(repr(query), scripts.PLANNER_PROBE_MAX_CARDINALITY, repr(expected), repr(got))
+
+    def test_probePath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 1000
+        self._checkQueries()
+
+    def test_setOperationPath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 0
+        self._checkQueries()
+
+    def test_noTempKeysLeft(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 0
+        PlannerModel.objects.filter(active='yes', color='red', name__ne='n1').all()
+
+        conn = PlannerModel.objects._get_connection()
+        tempKeys = [ key for key in conn.keys(PlannerModel.objects._get_ids_key() + '__*') ]
+        assert not tempKeys , 'Expected temporary keys to be removed. Got: %s' %(repr(tempKeys), )
+
+    def test_largeProbe(self):
+        # More candidates than are probed in one SMISMEMBER call
+        objs = [ PlannerModel(name='big', active='maybe', color='red' if i % 4 else 'blue', num=1000 + i) for i in range(2500) ]
+        PlannerModel.saver.save(objs)
+
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 5000
+
+        assert PlannerModel.objects.filter(name='big', active='maybe', color='red').count() == 1875
+        pks = PlannerModel.objects.filter(name='big', active='maybe', color='red').getPrimaryKeys()
+        assert len(pks) == 1875 , 'Expected 1875 matches. Got %d' %(len(pks), )
+        pks = PlannerModel.objects.filter(name='big', color__ne='red').getPrimaryKeys()
+        assert len(pks) == 625 , 'Expected 625 matches. Got %d' %(len(pks), )
+
+    def test_scriptNotCached(self):
+        conn = PlannerModel.objects._get_connection()
+        conn.script_flush()
+
+        expected = self._expected(active='yes', color='red')
+        got = PlannerModel.objects.filter(active='yes', color='red').getPrimaryKeys(sortByAge=True)
+        assert got == expected , 'Expected planner to load script when not cached'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
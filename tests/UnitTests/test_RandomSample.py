@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_RandomSample - GoodTests unit tests for picking random records from a query (random, sample)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, Or, scripts
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class RandomSampleModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('active'), IRField('color') ]
+
+    INDEXED_FIELDS = ['name', 'active', 'color']
+
+    KEY_NAME = 'Test_RandomSampleModel'
+
+
+class TestRandomSample(object):
+
+    def setup_method(self, *args, **kwargs):
+        RandomSampleModel.deleter.destroyModel()
+
+        self.origProbeMax = scripts.PLANNER_PROBE_MAX_CARDINALITY
+
+        colors = ['red', 'green', 'blue']
+        objs = [ RandomSampleModel(name='n%d' %(i % 5, ), active='yes' if i % 2 else 'no', color=colors[i % 3]) for i in range(60) ]
+        RandomSampleModel.saver.save(objs)
+
+    def teardown_method(self, *args, **kwargs):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = self.origProbeMax
+
+        RandomSampleModel.deleter.destroyModel()
+
+    def _getQueries(self):
+        return [
+            RandomSampleModel.objects,
+            RandomSampleModel.objects.filter(color='red'),
+            RandomSampleModel.objects.filter(color='red', active='yes'),
+            RandomSampleModel.objects.filter(color__ne='red'),
+            RandomSampleModel.objects.filter(active='yes', name__ne='n1'),
+            RandomSampleModel.objects.filter(Or(color='red', name='n2'), active='no'),
+        ]
+
+    def _checkQueries(self):
+        for query in self._getQueries():
+            matchedPks = set(query.getPrimaryKeys())
+
+            obj = query.random()
+            assert obj is not None and obj._id in matchedPks , 'Expected random to return a matching object for %s' %(repr(query.filters), )
+
+            objs = query.sample(4)
+            pks = [ obj._id for obj in objs ]
+            assert len(pks) == 4 , 'Expected 4 objects. Got %d' %(len(pks), )
+            assert len(set(pks)) == 4 , 'Expected distinct objects. Got: %s' %(repr(pks), )
+            assert not set(pks) - matchedPks , 'Expected only matching objects. Got: %s' %(repr(pks), )
+
+            objs = query.sample(1000)
+            assert sorted( [ obj._id for obj in objs ] ) == sorted(matchedPks) , 'Expected sample larger than matches to return all matches'
+
+            assert query.sample(0) == [] , 'Expected empty sample'
+
+    def test_probePath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 1000
+        self._checkQueries()
+
+    def test_setOperationPath(self):
+        scripts.PLANNER_PROBE_MAX_CARDINALITY = 0
+        self._checkQueries()
+
+        conn = RandomSampleModel.objects._get_connection()
+        tempKeys = conn.keys(RandomSampleModel.objects._get_ids_key() + '__*')
+        assert not tempKeys , 'Expected temporary keys to be removed. Got: %s' %(repr(tempKeys), )
+
+    def test_noMatches(self):
+        assert RandomSampleModel.objects.filter(color='purple').random() is None , 'Expected None with no matches'
+        assert RandomSampleModel.objects.filter(color='red', name='nope').random() is None , 'Expected None with no matches'
+        assert RandomSampleModel.objects.filter(color__in=[]).sample(3) == [] , 'Expected empty sample with empty __in'
+        assert RandomSampleModel.objects.filter(color='red', active='maybe').sample(3) == [] , 'Expected empty sample with no matches'
+
+    def test_isRandom(self):
+        seen = set()
+        for i in range(30):
+            seen.add( RandomSampleModel.objects.filter(color='red', active='yes').random()._id )
+
+        assert len(seen) > 1 , 'Expected different objects to be picked'
+
+    def test_invalid(self):
+        gotException = False
+        try:
+            RandomSampleModel.objects.sample(-1)
+        except ValueError:
+            gotException = True
+
+        assert gotException , 'Expected ValueError on negative sample size'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
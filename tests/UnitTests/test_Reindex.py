@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Reindex - GoodTests unit tests for rebuilding indexes in batches (Model.objects.reindex)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, INDEX_VALUE_FIELD_PREFIX, irNull
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class ReindexBeforeModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('color'), IRField('num', valueType=int) ]
+
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_ReindexModel'
+
+
+class ReindexAfterModel(IndexedRedisModel):
+    '''
+        The same data, after "color" and "num" were added to INDEXED_FIELDS, and "extra" to FIELDS
+    '''
+
+    FIELDS = [ IRField('name'), IRField('color'), IRField('num', valueType=int), IRField('extra') ]
+
+    INDEXED_FIELDS = ['name', 'color', 'num', 'extra']
+
+    KEY_NAME = 'Test_ReindexModel'
+
+
+COLORS = ['red', 'green', 'blue']
+
+
+class TestReindex(object):
+
+    def setup_method(self, *args, **kwargs):
+        ReindexBeforeModel.deleter.destroyModel()
+        ReindexBeforeModel.saver.save( [ ReindexBeforeModel(name='n%d' %(i % 4, ), color=COLORS[i % 3], num=i) for i in range(50) ] )
+
+    def teardown_method(self, *args, **kwargs):
+        ReindexBeforeModel.deleter.destroyModel()
+
+    def _checkColorIndex(self):
+        for color in COLORS:
+            assert ReindexAfterModel.objects.filter(color=color).count() == len( [ i for i in range(50) if COLORS[i % 3] == color ] ) , 'Expected index on color=%s' %(color, )
+
+    def test_reindexAll(self):
+        assert ReindexAfterModel.objects.filter(color='red').count() == 0 , 'Expected no index before reindex'
+
+        progress = []
+        numReindexed = ReindexAfterModel.objects.reindex(batchSize=15, progressCallback=lambda numReindexed, numMatched : progress.append( (numReindexed, numMatched) ))
+        assert numReindexed == 50 , 'Expected all reindexed. Got: %s' %(repr(numReindexed), )
+        assert progress == [ (15, 50), (30, 50), (45, 50), (50, 50) ] , 'Expected progress after each batch. Got: %s' %(repr(progress), )
+
+        self._checkColorIndex()
+        assert ReindexAfterModel.objects.filter(num=7).first().num == 7 , 'Expected int index'
+        assert ReindexAfterModel.objects.filter(extra=irNull).count() == 50 , 'Expected field missing from the objects indexed on its default'
+        assert ReindexAfterModel.objects.filter(name='n1').count() == 13 , 'Expected existing index kept'
+
+        conn = ReindexAfterModel.objects._get_connection()
+        pk = ReindexAfterModel.objects.filter(color='blue').first()._id
+        assert conn.hget(ReindexAfterModel.objects._get_key_for_id(pk), INDEX_VALUE_FIELD_PREFIX + 'color') is None , 'Expected no copy of the stored value recorded'
+
+        ReindexAfterModel.objects.filter(color='red').delete()
+        assert ReindexAfterModel.objects.filter(color='red').count() == 0 and ReindexAfterModel.objects.count() == 33 , 'Expected server-side delete after reindex'
+
+    def test_singleIndex(self):
+        assert ReindexAfterModel.objects.reindex('color') == 50 , 'Expected all reindexed'
+
+        self._checkColorIndex()
+        assert ReindexAfterModel.objects.filter(num=7).count() == 0 , 'Expected only the named index rebuilt'
+
+        assert ReindexAfterModel.objects.filter(name='n2').reindex( ['num'] ) == 12 , 'Expected only matching objects reindexed'
+        assert sorted( [ obj.num for obj in ReindexAfterModel.objects.filter(num__in=[2, 3, 6]).all() ] ) == [2, 6] , 'Expected only matching objects in the index'
+
+    def test_workers(self):
+        progress = []
+        numReindexed = ReindexAfterModel.objects.reindex( ['color', 'num'], batchSize=4, workers=3, progressCallback=lambda numReindexed, numMatched : progress.append(numReindexed))
+        assert numReindexed == 50 , 'Expected all reindexed with workers'
+        assert len(progress) == 13 and max(progress) == 50 , 'Expected progress for each batch. Got: %s' %(repr(progress), )
+
+        self._checkColorIndex()
+        assert ReindexAfterModel.objects.filter(num__in=list(range(50))).count() == 50 , 'Expected int index'
+
+    def test_workerError(self):
+        def failingCallback(numReindexed, numMatched):
+            raise KeyError('failed')
+
+        gotException = False
+        try:
+            ReindexAfterModel.objects.reindex( ['color'], batchSize=4, workers=3, progressCallback=failingCallback)
+        except KeyError:
+            gotException = True
+
+        assert gotException , 'Expected the error from a worker to be raised'
+        assert ReindexAfterModel.objects.filter(color='red').count() < 17 , 'Expected reindexing to stop after the error'
+
+    def test_invalid(self):
+        for func in (
+            lambda : ReindexAfterModel.objects.reindex('notAField'),
+            lambda : ReindexAfterModel.objects.reindex( ['color', 'notAField'] ),
+            lambda : ReindexAfterModel.objects.reindex(batchSize=0),
+            lambda : ReindexAfterModel.objects.reindex(workers=0),
+        ):
+            gotException = False
+            try:
+                func()
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError'
+
+        assert ReindexAfterModel.objects.filter(color__in=[]).reindex() == 0 , 'Expected nothing reindexed'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
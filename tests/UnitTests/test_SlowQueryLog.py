@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_SlowQueryLog - GoodTests unit tests for the slow query log (enableSlowQueryLog)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, Or, enableSlowQueryLog, disableSlowQueryLog, getSlowQueryLog, clearSlowQueryLog
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class SlowQueryModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('active'), IRField('status') ]
+
+    INDEXED_FIELDS = ['name', 'active', 'status']
+
+    KEY_NAME = 'Test_SlowQueryModel'
+
+
+class TestSlowQueryLog(object):
+
+    def setup_method(self, *args, **kwargs):
+        SlowQueryModel.deleter.destroyModel()
+        clearSlowQueryLog()
+
+        objs = [ SlowQueryModel(name='n%d' %(i, ), active='yes', status='new' if i % 2 else 'old') for i in range(10) ]
+        SlowQueryModel.saver.save(objs)
+
+    def teardown_method(self, *args, **kwargs):
+        disableSlowQueryLog()
+        clearSlowQueryLog()
+        SlowQueryModel.deleter.destroyModel()
+
+    def test_disabledByDefault(self):
+        SlowQueryModel.objects.filter(active='yes').all()
+
+        assert not getSlowQueryLog() , 'Expected nothing logged when slow query log is not enabled'
+
+    def test_logsQueries(self):
+        enableSlowQueryLog(0)
+
+        results = SlowQueryModel.objects.filter(active='yes', name='n3').filter(status__ne='old').all()
+        assert len(results) == 1 , 'Expected one result'
+
+        entries = getSlowQueryLog()
+        assert len(entries) == 1 , 'Expected one logged query. Got: %s' %(repr(entries), )
+
+        entry = entries[0]
+        assert entry.model is SlowQueryModel , 'Expected model on entry'
+        assert entry.operation == 'getPrimaryKeys' , 'Expected operation to be getPrimaryKeys'
+        assert entry.numMatched == 1 , 'Expected matched count of 1'
+        assert entry.elapsed >= 0 , 'Expected elapsed time'
+        assert entry.filterShape == 'active=? AND name=? AND NOT status=?' , 'Unexpected filter shape: %s' %(entry.filterShape, )
+
+        filterCardinalities = dict( [ (fieldName, cardinality) for (fieldName, value, cardinality) in entry.filters ] )
+        assert filterCardinalities == { 'active' : 10, 'name' : 1 } , 'Expected SCARD of each filter index. Got: %s' %(repr(filterCardinalities), )
+        assert entry.notFilters == [ ('status', 'old', 5) ] , 'Expected SCARD of the negative filter index. Got: %s' %(repr(entry.notFilters), )
+        assert entry.totalCardinality is None , 'Expected no total cardinality with positive filters'
+
+        clearSlowQueryLog()
+        assert SlowQueryModel.objects.filter(status__ne='new').count() == 5
+        entries = getSlowQueryLog()
+        assert len(entries) == 1 and entries[0].operation == 'count' , 'Expected count to be logged'
+        assert entries[0].totalCardinality == 10 , 'Expected total cardinality with only negative filters'
+
+    def test_orFilters(self):
+        enableSlowQueryLog(0)
+
+        assert SlowQueryModel.objects.filter(Or(name='n1', status='new'), active='yes').count() == 5
+
+        entry = getSlowQueryLog()[-1]
+        assert entry.filterShape == 'active=? AND (name=? OR status=?)' , 'Unexpected filter shape: %s' %(entry.filterShape, )
+        assert sorted(entry.orFilters[0]) == [ ('name', 'n1', 1), ('status', 'new', 5) ] , 'Expected SCARD of each Or index. Got: %s' %(repr(entry.orFilters), )
+
+    def test_thresholdAndCallback(self):
+        called = []
+        enableSlowQueryLog(60, callback=called.append)
+
+        SlowQueryModel.objects.filter(active='yes').all()
+        assert not getSlowQueryLog() and not called , 'Expected fast queries to not be logged'
+
+        enableSlowQueryLog(0, maxEntries=2, callback=called.append)
+        for i in range(3):
+            SlowQueryModel.objects.filter(name='n%d' %(i, )).count()
+
+        entries = getSlowQueryLog()
+        assert len(entries) == 2 , 'Expected only maxEntries to be kept'
+        assert entries[-1].filters[0][1] == 'n2' , 'Expected newest entries to be kept'
+        assert len(called) == 3 , 'Expected callback for each logged query'
+
+        gotError = False
+        try:
+            enableSlowQueryLog(-1)
+        except ValueError:
+            gotError = True
+        assert gotError , 'Expected negative threshold to raise ValueError'
+
+    def test_badCallback(self):
+        def badCallback(entry):
+            raise ValueError('bad')
+
+        enableSlowQueryLog(0, callback=badCallback)
+        oldStderr = sys.stderr
+        try:
+            sys.stderr = open('/dev/null', 'w')
+            count = SlowQueryModel.objects.filter(active='yes').count()
+        finally:
+            sys.stderr.close()
+            sys.stderr = oldStderr
+
+        assert count == 10 , 'Expected query to succeed even when the callback raises'
+        assert len(getSlowQueryLog()) == 1 , 'Expected query to still be logged'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Snapshot - GoodTests unit tests for exporting query results to a snapshot file and importing them back (export / importFrom)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import io
+import os
+import sys
+import subprocess
+import tempfile
+
+from IndexedRedis import IndexedRedisModel, IRField, InvalidSnapshotException, irNull
+from IndexedRedis.fields import IRFixedPointField, IRBytesField, IRCompressedField
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class SnapshotModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('color'), IRField('description', hashIndex=True), IRField('num', valueType=int), IRFixedPointField('price', decimalPlaces=2), IRBytesField('data'), IRCompressedField('blob'), IRField('other') ]
+
+    INDEXED_FIELDS = ['name', 'color', 'description', 'num']
+
+    KEY_NAME = 'Test_SnapshotModel'
+
+
+class SnapshotCompactModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('color'), IRField('more') ]
+
+    INDEXED_FIELDS = ['color']
+
+    COMPACT_STORAGE = True
+
+    COMPRESS_FIELD_NAMES = True
+
+    VERSIONED = True
+
+    KEY_NAME = 'Test_SnapshotCompactModel'
+
+
+class SnapshotFewerFieldsModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('color'), IRField('extra', defaultValue='dflt') ]
+
+    INDEXED_FIELDS = ['color']
+
+    KEY_NAME = 'Test_SnapshotFewerFieldsModel'
+
+
+MODELS = (SnapshotModel, SnapshotCompactModel, SnapshotFewerFieldsModel)
+
+COLORS = ['red', 'green', 'blue']
+
+
+def makeObjs(num):
+    return [ SnapshotModel(name='n%d' %(i % 7, ), color=COLORS[i % 3], description='Description %d' %(i % 2, ), num=i, price=i / 4.0, data=b'\x00\xff' + str(i).encode('ascii'), blob=b'blob' * i, other=(irNull if i % 5 == 0 else 'o%d' %(i, ))) for i in range(num) ]
+
+
+class TestSnapshot(object):
+
+    def setup_method(self, *args, **kwargs):
+        for model in MODELS:
+            model.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        for model in MODELS:
+            model.deleter.destroyModel()
+
+    def _roundTrip(self, query, model, **kwargs):
+        stream = io.BytesIO()
+        numExported = query.export(stream, **kwargs)
+
+        return (numExported, stream.getvalue())
+
+    def test_exportImport(self):
+        objs = makeObjs(230)
+        SnapshotModel.saver.save(objs)
+        # Leave gaps in the primary keys
+        SnapshotModel.objects.filter(num__in=[3, 50, 229]).delete()
+        expected = { obj._id : obj.asDict() for obj in SnapshotModel.objects.all() }
+
+        (numExported, data) = self._roundTrip(SnapshotModel.objects, SnapshotModel, batchSize=50)
+        assert numExported == 227 , 'Expected all exported. Got: %d' %(numExported, )
+
+        SnapshotModel.deleter.destroyModel()
+
+        progress = []
+        numImported = SnapshotModel.saver.importFrom(io.BytesIO(data), progressCallback=lambda numImported, rate : progress.append(numImported))
+        assert numImported == 227 , 'Expected all imported. Got: %d' %(numImported, )
+        assert progress == [50, 100, 150, 200, 227] , 'Expected progress per chunk. Got: %s' %(repr(progress), )
+
+        fetched = SnapshotModel.objects.all()
+        assert { obj._id : obj.asDict() for obj in fetched } == expected , 'Expected same objects and primary keys'
+
+        for color in COLORS:
+            assert SnapshotModel.objects.filter(color=color).count() == len( [ d for d in expected.values() if d['color'] == color ] ) , 'Expected index rebuilt on color=%s' %(color, )
+        assert SnapshotModel.objects.filter(description='Description 1').count() == len( [ d for d in expected.values() if d['num'] % 2 == 1 ] ) , 'Expected hashed index rebuilt'
+
+        newObj = SnapshotModel(name='after', color='red', num=-1)
+        newObj.save()
+        assert newObj._id == 230 , 'Expected next primary key after the largest imported. Got: %s' %(repr(newObj._id), )
+
+        SnapshotModel.objects.filter(color='red').delete()
+        assert SnapshotModel.objects.filter(color='red').count() == 0 , 'Expected server-side delete of imported objects'
+
+    def test_filteredAndPaged(self):
+        SnapshotModel.saver.save(makeObjs(30))
+
+        (numExported, data) = self._roundTrip(SnapshotModel.objects.filter(color='green', name__ne='n1'), SnapshotModel, batchSize=4)
+        expectedPks = SnapshotModel.objects.filter(color='green', name__ne='n1').getPrimaryKeys()
+        assert numExported == len(expectedPks) , 'Expected only matching objects exported'
+
+        SnapshotModel.deleter.destroyModel()
+        SnapshotModel.saver.importFrom(io.BytesIO(data), batchSize=3)
+        assert sorted(SnapshotModel.objects.getPrimaryKeys()) == sorted(expectedPks) , 'Expected matching objects imported'
+
+        SnapshotModel.deleter.destroyModel()
+        SnapshotModel.saver.save(makeObjs(30))
+
+        (numExported, data) = self._roundTrip(SnapshotModel.objects.filter(color='red').orderBy('num', desc=True).limit(3), SnapshotModel)
+        assert numExported == 3 , 'Expected only the page exported'
+
+        SnapshotModel.deleter.destroyModel()
+        SnapshotModel.saver.importFrom(io.BytesIO(data))
+        assert sorted( [ obj.num for obj in SnapshotModel.objects.all() ] ) == [21, 24, 27] , 'Expected page imported'
+
+        (numExported, data) = self._roundTrip(SnapshotModel.objects.filter(color__in=[]), SnapshotModel)
+        assert numExported == 0 , 'Expected nothing exported'
+        assert SnapshotModel.saver.importFrom(io.BytesIO(data)) == 0 , 'Expected empty snapshot importable'
+
+    def test_compactAndOtherModel(self):
+        SnapshotCompactModel.saver.save( [ SnapshotCompactModel(name='n%d' %(i, ), color=COLORS[i % 3], more='m' * i) for i in range(20) ] )
+
+        (numExported, data) = self._roundTrip(SnapshotCompactModel.objects, SnapshotCompactModel)
+        assert numExported == 20 , 'Expected all exported'
+
+        SnapshotCompactModel.deleter.destroyModel()
+        SnapshotCompactModel.saver.importFrom(io.BytesIO(data))
+        fetched = SnapshotCompactModel.objects.filter(color='blue').all()
+        assert sorted( [ obj.name for obj in fetched ] ) == sorted( [ 'n%d' %(i, ) for i in range(20) if i % 3 == 2 ] ) , 'Expected compact model imported'
+        assert not [ obj for obj in fetched if obj.more != 'm' * int(obj.name[1:]) or obj._version != 1 ] , 'Expected packed values, at version 1'
+
+        # Into a model with different fields
+        SnapshotFewerFieldsModel.saver.importFrom(io.BytesIO(data))
+        fetched = SnapshotFewerFieldsModel.objects.filter(color='red').all()
+        assert len(fetched) == 7 , 'Expected imported into another model'
+        assert not [ obj for obj in fetched if obj.extra != 'dflt' ] , 'Expected missing field set to default'
+
+    def test_file(self):
+        SnapshotModel.saver.save(makeObjs(12))
+        expected = sorted( [ obj.asDict(includeMeta=True) for obj in SnapshotModel.objects.all() ], key=lambda d : d['_id'] )
+
+        fd, path = tempfile.mkstemp(suffix='.irsnap')
+        os.close(fd)
+        try:
+            assert SnapshotModel.objects.export(path) == 12 , 'Expected number exported'
+            SnapshotModel.deleter.destroyModel()
+            assert SnapshotModel.saver.importFrom(path) == 12 , 'Expected number imported'
+        finally:
+            os.remove(path)
+
+        assert sorted( [ obj.asDict(includeMeta=True) for obj in SnapshotModel.objects.all() ], key=lambda d : d['_id'] ) == expected , 'Expected same objects from file'
+
+    def test_invalid(self):
+        SnapshotModel.saver.save(makeObjs(10))
+        (numExported, data) = self._roundTrip(SnapshotModel.objects, SnapshotModel)
+
+        for badData in (b'', b'not a snapshot', data[:-10]):
+            gotException = False
+            try:
+                SnapshotModel.saver.importFrom(io.BytesIO(badData))
+            except InvalidSnapshotException:
+                gotException = True
+
+            assert gotException , 'Expected InvalidSnapshotException on %s' %(repr(badData[:20]), )
+
+        for func in (
+            lambda : SnapshotModel.objects.export(io.BytesIO(), batchSize=0),
+            lambda : SnapshotModel.saver.importFrom(io.BytesIO(data), batchSize=0),
+        ):
+            gotException = False
+            try:
+                func()
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_ThreadSafety - GoodTests unit tests for connection pool locking and per-thread connection / helper reuse
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+import threading
+
+from IndexedRedis import IndexedRedisModel, IRField, getRedisPool
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class ThreadSafetyModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name') ]
+
+    INDEXED_FIELDS = ['name']
+
+    KEY_NAME = 'Test_ThreadSafetyModel'
+
+
+class TestThreadSafety(object):
+
+    def setup_method(self, *args, **kwargs):
+        ThreadSafetyModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        ThreadSafetyModel.deleter.destroyModel()
+
+    def _runInThreads(self, func, numThreads=16):
+        results = [None] * numThreads
+        startEvent = threading.Event()
+
+        def runOne(i):
+            startEvent.wait()
+            results[i] = func()
+
+        threads = [ threading.Thread(target=runOne, args=(i, )) for i in range(numThreads) ]
+        for thread in threads:
+            thread.start()
+
+        startEvent.set()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_concurrentPoolCreation(self):
+        pools = self._runInThreads( lambda : getRedisPool( { 'db' : 1 } ) )
+
+        assert len(set( [ id(pool) for pool in pools ] )) == 1 , 'Expected all threads to get the same pool for the same params'
+
+    def test_helpersReusedPerThread(self):
+        assert ThreadSafetyModel.saver is ThreadSafetyModel.saver , 'Expected saver to be reused within a thread'
+        assert ThreadSafetyModel.deleter is ThreadSafetyModel.deleter , 'Expected deleter to be reused within a thread'
+        assert ThreadSafetyModel.objects is not ThreadSafetyModel.objects , 'Expected a new query for each access to objects'
+
+        assert ThreadSafetyModel.objects._get_connection() is ThreadSafetyModel.saver._get_connection() , 'Expected connection to be shared within a thread'
+
+        otherSavers = self._runInThreads( lambda : ThreadSafetyModel.saver, numThreads=4 )
+        assert len(set( [ id(saver) for saver in otherSavers ] + [ id(ThreadSafetyModel.saver) ] )) == 5 , 'Expected each thread to have its own saver'
+
+    def test_concurrentSaves(self):
+        def doSave():
+            obj = ThreadSafetyModel(name='x')
+            obj.save()
+            return obj._id
+
+        ids = self._runInThreads(doSave)
+
+        assert len(set(ids)) == len(ids) , 'Expected every save to get a unique id'
+        assert ThreadSafetyModel.objects.filter(name='x').count() == len(ids) , 'Expected all objects to be saved'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
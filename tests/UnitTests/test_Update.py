@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Update - GoodTests unit tests for setting fields on the server without fetching objects (update)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import sys
+import subprocess
+
+from IndexedRedis import IndexedRedisModel, IRField, INDEX_VALUE_FIELD_PREFIX
+from IndexedRedis.fields import IRFixedPointField
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class UpdateModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('status'), IRField('description', hashIndex=True), IRField('num', valueType=int), IRFixedPointField('price', decimalPlaces=2), IRField('other') ]
+
+    INDEXED_FIELDS = ['name', 'status', 'description', 'num']
+
+    KEY_NAME = 'Test_UpdateModel'
+
+
+class UpdatePkFieldModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('pk'), IRField('status') ]
+
+    INDEXED_FIELDS = ['pk', 'status']
+
+    KEY_NAME = 'Test_UpdatePkFieldModel'
+
+
+class UpdateCompactModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('customer_name'), IRField('customer_status'), IRField('customer_notes') ]
+
+    INDEXED_FIELDS = ['customer_status']
+
+    COMPRESS_FIELD_NAMES = True
+
+    COMPACT_STORAGE = True
+
+    KEY_NAME = 'Test_UpdateCompactModel'
+
+
+class TestUpdate(object):
+
+    def setup_method(self, *args, **kwargs):
+        UpdateModel.deleter.destroyModel()
+        UpdateCompactModel.deleter.destroyModel()
+        UpdatePkFieldModel.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        UpdateModel.deleter.destroyModel()
+        UpdateCompactModel.deleter.destroyModel()
+        UpdatePkFieldModel.deleter.destroyModel()
+
+    def _saveSome(self):
+        objs = [ UpdateModel(name='n%d' %(i % 3, ), status='pending' if i % 2 else 'new', description='A long description', num=i, price=i / 4.0, other='x') for i in range(10) ]
+        UpdateModel.saver.save(objs)
+
+        return UpdateModel.objects.allByAge()
+
+    def _checkIndexes(self):
+        objs = UpdateModel.objects.allByAge()
+        for obj in objs:
+            for fieldName in UpdateModel.INDEXED_FIELDS:
+                expected = [ otherObj._id for otherObj in objs if getattr(otherObj, fieldName) == getattr(obj, fieldName) ]
+                got = UpdateModel.objects.filter(**{ fieldName : getattr(obj, fieldName) }).getPrimaryKeys(sortByAge=True)
+                assert got == expected , 'Wrong index for %s=%s. Expected %s, got %s' %(fieldName, repr(getattr(obj, fieldName)), repr(expected), repr(got))
+
+    def test_updateByPk(self):
+        objs = self._saveSome()
+        obj = objs[3]
+
+        assert UpdateModel.objects.update(obj._id, status='done', other='y', price=1.5) == 1 , 'Expected one object updated'
+
+        fetched = UpdateModel.objects.get(obj._id)
+        assert fetched.status == 'done' , 'Expected status updated. Got: %s' %(repr(fetched.status), )
+        assert fetched.other == 'y' , 'Expected other updated'
+        assert fetched.price == 1.5 , 'Expected fixed point value converted for storage. Got: %s' %(repr(fetched.price), )
+        assert fetched.name == obj.name and fetched.num == obj.num , 'Expected other fields unchanged'
+
+        assert UpdateModel.objects.filter(status='done').getPrimaryKeys() == [ obj._id ] , 'Expected object in new index'
+        assert obj._id not in UpdateModel.objects.filter(status='pending').getPrimaryKeys() , 'Expected object removed from old index'
+        self._checkIndexes()
+
+        assert UpdateModel.objects.update(9999, status='done') == 0 , 'Expected nothing updated for missing pk'
+        assert UpdateModel.objects.get(9999) is None , 'Expected missing pk to not be created'
+
+    def test_updateIndexConverted(self):
+        objs = self._saveSome()
+
+        UpdateModel.objects.update(objs[0]._id, num='42', description='Changed')
+        fetched = UpdateModel.objects.get(objs[0]._id)
+        assert fetched.num == 42 , 'Expected value converted through the field'
+
+        assert UpdateModel.objects.filter(num=42).getPrimaryKeys() == [ objs[0]._id ] , 'Expected int index updated'
+        assert UpdateModel.objects.filter(description='Changed').getPrimaryKeys() == [ objs[0]._id ] , 'Expected hashed index updated'
+        assert objs[0]._id not in UpdateModel.objects.filter(description='A long description').getPrimaryKeys() , 'Expected removed from old hashed index'
+        self._checkIndexes()
+
+    def test_updateFiltered(self):
+        objs = self._saveSome()
+        pendingPks = [ obj._id for obj in objs if obj.status == 'pending' ]
+
+        assert UpdateModel.objects.filter(status='pending').update(status='cancelled', other='z') == len(pendingPks) , 'Expected all pending updated'
+        assert UpdateModel.objects.filter(status='pending').count() == 0 , 'Expected none left pending'
+        assert UpdateModel.objects.filter(status='cancelled').getPrimaryKeys(sortByAge=True) == pendingPks , 'Expected all moved to cancelled'
+        assert set( [ obj.other for obj in UpdateModel.objects.filter(status='cancelled').all() ] ) == set(['z']) , 'Expected other set on all'
+        self._checkIndexes()
+
+        assert UpdateModel.objects.filter(name='n1', status__ne='new').update(name='n9') == len( [ obj for obj in objs if obj.name == 'n1' and obj.status == 'pending' ] ) , 'Expected negative filter update'
+        assert UpdateModel.objects.filter(status='nothing').update(other='q') == 0 , 'Expected nothing updated for no matches'
+        assert UpdateModel.objects.filter(status__in=[]).update(other='q') == 0 , 'Expected nothing updated for empty in'
+        self._checkIndexes()
+
+        assert UpdateModel.objects.filter(status='new').limit(2).update(other='paged') == 2 , 'Expected only page updated'
+        assert len( [ obj for obj in UpdateModel.objects.all() if obj.other == 'paged' ] ) == 2 , 'Expected two updated'
+
+        assert UpdateModel.objects.update(other='all') == len(objs) , 'Expected update with no filters to update everything'
+
+        conn = UpdateModel.objects._get_connection()
+        tempKeys = conn.keys(UpdateModel.objects._get_ids_key() + '__*')
+        assert not tempKeys , 'Expected no temporary keys. Got: %s' %(repr(tempKeys), )
+
+    def test_notRecorded(self):
+        objs = self._saveSome()
+
+        # Simulate objects saved before index values were recorded
+        conn = UpdateModel.objects._get_connection()
+        for obj in objs[:4]:
+            conn.hdel(UpdateModel.objects._get_key_for_id(obj._id), INDEX_VALUE_FIELD_PREFIX + 'description')
+
+        assert UpdateModel.objects.filter(name='n0').update(status='done', description='Another description') == len( [ obj for obj in objs if obj.name == 'n0' ] ) , 'Expected objects without recorded index values to be updated too'
+        assert UpdateModel.objects.filter(status='done').count() == len( [ obj for obj in objs if obj.name == 'n0' ] ) , 'Expected all moved index'
+        self._checkIndexes()
+
+    def test_compact(self):
+        objs = [ UpdateCompactModel(customer_name='c%d' %(i, ), customer_status='open', customer_notes='notes') for i in range(4) ]
+        UpdateCompactModel.saver.save(objs)
+
+        assert UpdateCompactModel.objects.update(objs[1]._id, customer_status='closed') == 1 , 'Expected update of indexed field on compact model'
+        fetched = UpdateCompactModel.objects.get(objs[1]._id)
+        assert fetched.customer_status == 'closed' and fetched.customer_name == 'c1' and fetched.customer_notes == 'notes' , 'Expected compact object intact'
+        assert UpdateCompactModel.objects.filter(customer_status='closed').getPrimaryKeys() == [ objs[1]._id ] , 'Expected index updated'
+        assert UpdateCompactModel.objects.filter(customer_status='open').count() == 3 , 'Expected removed from old index'
+
+    def test_fieldNamedPk(self):
+        objs = [ UpdatePkFieldModel(pk='a%d' %(i, ), status='new') for i in range(3) ]
+        UpdatePkFieldModel.saver.save(objs)
+
+        assert UpdatePkFieldModel.objects.update(objs[0]._id, pk='changed') == 1 , 'Expected update of a field named pk'
+        assert UpdatePkFieldModel.objects.get(objs[0]._id).pk == 'changed' , 'Expected field named pk updated'
+        assert UpdatePkFieldModel.objects.filter(pk='changed').getPrimaryKeys() == [ objs[0]._id ] , 'Expected index on field named pk updated'
+
+        assert UpdatePkFieldModel.objects.filter(status='new').update(pk='all') == 3 , 'Expected filtered update of a field named pk'
+        assert UpdatePkFieldModel.objects.filter(pk='all').count() == 3 , 'Expected all updated'
+
+    def test_invalid(self):
+        objs = self._saveSome()
+
+        for func in (
+            lambda : UpdateModel.objects.update(objs[0]._id),
+            lambda : UpdateModel.objects.update(objs[0]._id, nosuchfield='x'),
+            lambda : UpdateModel.objects.filter(status='new').update(nosuchfield='x'),
+            lambda : UpdateCompactModel.objects.update(1, customer_notes='x'),
+        ):
+            gotException = False
+            try:
+                func()
+            except ValueError:
+                gotException = True
+
+            assert gotException , 'Expected ValueError'
+
+        assert UpdateModel.objects.allByAge() == objs , 'Expected nothing changed'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab
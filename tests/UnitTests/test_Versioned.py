@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017 Timothy Savannah under LGPL version 2.1. See LICENSE for more information.
+#
+# test_Versioned - GoodTests unit tests for optimistic concurrency on VERSIONED models (version checks on save)
+#
+
+# Import and apply the properties (like Redis connection parameters) for this test.
+import TestProperties
+
+import pickle
+import sys
+import subprocess
+
+import redis
+
+from IndexedRedis import IndexedRedisModel, IRField, VersionConflictError
+
+# vim: set ts=4 sw=4 expandtab
+
+
+class VersionedModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('status'), IRField('views', valueType=int), IRField('other') ]
+
+    INDEXED_FIELDS = ['name', 'status']
+
+    VERSIONED = True
+
+    KEY_NAME = 'Test_VersionedModel'
+
+
+class VersionedCompactModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('other') ]
+
+    INDEXED_FIELDS = ['name']
+
+    COMPACT_STORAGE = True
+
+    COMPRESS_FIELD_NAMES = True
+
+    VERSIONED = True
+
+    KEY_NAME = 'Test_VersionedCompactModel'
+
+
+class VersionedCoalesceModel(IndexedRedisModel):
+
+    FIELDS = [ IRField('name'), IRField('other') ]
+
+    INDEXED_FIELDS = ['name']
+
+    VERSIONED = True
+
+    COALESCE_WINDOW = 0.001
+
+    KEY_NAME = 'Test_VersionedCoalesceModel'
+
+
+MODELS = (VersionedModel, VersionedCompactModel, VersionedCoalesceModel)
+
+
+class TestVersioned(object):
+
+    def setup_method(self, *args, **kwargs):
+        for model in MODELS:
+            model.deleter.destroyModel()
+
+    def teardown_method(self, *args, **kwargs):
+        for model in MODELS:
+            model.deleter.destroyModel()
+
+    def _expectConflict(self, func):
+        try:
+            func()
+        except VersionConflictError as e:
+            return e
+
+        raise AssertionError('Expected VersionConflictError')
+
+    def test_versionBumped(self):
+        obj = VersionedModel(name='one', status='new', views=0, other='x')
+        assert obj._version == 0 , 'Expected unsaved object at version 0'
+
+        obj.save()
+        assert obj._version == 1 , 'Expected version 1 after insert. Got: %s' %(repr(obj._version), )
+        assert VersionedModel.objects.get(obj._id)._version == 1 , 'Expected fetched version 1'
+
+        obj.save()
+        assert obj._version == 1 , 'Expected save with no changes to keep the version'
+
+        obj.status = 'done'
+        obj.save()
+        assert obj._version == 2 , 'Expected version bumped on change'
+
+        fetched = VersionedModel.objects.get(obj._id)
+        assert fetched._version == 2 , 'Expected fetched version 2'
+        assert fetched == obj , 'Expected version to not be a field'
+        assert sorted(fetched.asDict().keys()) == sorted( [ str(field) for field in VersionedModel.FIELDS ] ) , 'Expected version to not show up as a field'
+
+        partial = VersionedModel.objects.getOnlyFields(obj._id, ['status'])
+        assert partial._version == 2 , 'Expected version fetched with only fields'
+
+        partial = VersionedModel.objects.filter(name='one').limit(1).allOnlyFields(['other'])[0]
+        assert partial._version == 2 , 'Expected version fetched on paged only fields'
+
+    def test_conflict(self):
+        obj = VersionedModel(name='one', status='new', views=0, other='x')
+        obj.save()
+
+        first = VersionedModel.objects.get(obj._id)
+        second = VersionedModel.objects.get(obj._id)
+
+        first.status = 'first'
+        first.save()
+
+        second.other = 'second'
+        e = self._expectConflict(second.save)
+        assert e.pks == [ obj._id ] , 'Expected conflicting pk on the error. Got: %s' %(repr(e.pks), )
+
+        fetched = VersionedModel.objects.get(obj._id)
+        assert fetched.status == 'first' and fetched.other == 'x' , 'Expected nothing saved on conflict'
+        assert second.hasUnsavedChanges() , 'Expected changes kept on the object after a conflict'
+
+        second.reload()
+        assert second._version == fetched._version , 'Expected reload to take the current version'
+        second.other = 'second'
+        second.save()
+
+        fetched = VersionedModel.objects.get(obj._id)
+        assert fetched.status == 'first' and fetched.other == 'second' , 'Expected both changes after reload'
+
+    def test_saveMultiple(self):
+        objs = [ VersionedModel(name='n%d' %(i, ), status='new', views=i, other='x') for i in range(5) ]
+        VersionedModel.saver.save(objs)
+
+        stale = VersionedModel.objects.getMultiple( [ obj._id for obj in objs ] )
+
+        objs[1].other = 'changed'
+        objs[3].other = 'changed'
+        VersionedModel.saver.saveMultiple( [ objs[1], objs[3] ] )
+
+        for obj in stale:
+            obj.status = 'stale'
+
+        e = self._expectConflict(lambda : VersionedModel.saver.saveMultiple(stale))
+        assert sorted(e.pks) == sorted( [ objs[1]._id, objs[3]._id ] ) , 'Expected only the changed objects reported. Got: %s' %(repr(e.pks), )
+        assert VersionedModel.objects.filter(status='stale').count() == 0 , 'Expected nothing saved, not even the unchanged objects'
+
+        # Inserts mixed with updates are fine
+        fresh = VersionedModel.objects.getMultiple( [ obj._id for obj in objs ] )
+        for obj in fresh:
+            obj.status = 'fresh'
+        VersionedModel.saver.saveMultiple( list(fresh) + [ VersionedModel(name='new', status='fresh', views=0, other='y') ] )
+        assert VersionedModel.objects.filter(status='fresh').count() == 6 , 'Expected all saved'
+
+    def test_watchConflict(self):
+        obj = VersionedModel(name='one', status='new', views=0, other='x')
+        obj.save()
+
+        obj.status = 'done'
+
+        # Simulate a change between the version check and the write
+        saver = VersionedModel.saver
+        origCheckVersions = saver._checkVersions
+        def checkThenChange(pipeline, versionChecks):
+            origCheckVersions(pipeline, versionChecks)
+            redis.Redis(connection_pool=saver._get_new_connection().connection_pool).hset(saver._get_key_for_id(obj._id), 'other', 'sneaky')
+        saver._checkVersions = checkThenChange
+        try:
+            self._expectConflict(obj.save)
+        finally:
+            del saver._checkVersions
+
+        assert obj._version == 1 , 'Expected version restored after the conflict'
+        assert obj.hasUnsavedChanges() , 'Expected changes kept on the object after the conflict'
+        assert VersionedModel.objects.filter(status='done').count() == 0 , 'Expected nothing saved'
+
+        obj.save()
+        assert VersionedModel.objects.filter(status='done').count() == 1 , 'Expected save to work after'
+
+    def test_updateAndIncrement(self):
+        obj = VersionedModel(name='one', status='new', views=0, other='x')
+        obj.save()
+
+        VersionedModel.objects.update(obj._id, other='y')
+        obj.status = 'done'
+        self._expectConflict(obj.save)
+
+        obj = VersionedModel.objects.get(obj._id)
+        assert obj._version == 2 , 'Expected update to bump the version'
+
+        VersionedModel.objects.increment(obj._id, 'views')
+        obj.status = 'done'
+        self._expectConflict(obj.save)
+        assert VersionedModel.objects.get(obj._id)._version == 3 , 'Expected increment to bump the version'
+
+    def test_compactAndCoalesce(self):
+        for model in (VersionedCompactModel, VersionedCoalesceModel):
+            obj = model(name='one', other='x')
+            obj.save()
+
+            stale = model.objects.get(obj._id)
+            assert stale._version == 1 , 'Expected version on %s' %(model.__name__, )
+
+            obj.other = 'y'
+            obj.save()
+
+            stale.other = 'z'
+            self._expectConflict(stale.save)
+            assert model.objects.get(obj._id).other == 'y' , 'Expected nothing saved on conflict on %s' %(model.__name__, )
+
+    def test_copyAndPickle(self):
+        obj = VersionedModel(name='one', status='new', views=0, other='x')
+        obj.save()
+        obj.status = 'done'
+        obj.save()
+
+        assert obj.copy(copyPrimaryKey=True)._version == 2 , 'Expected linked copy to keep version'
+        assert obj.copy()._version == 0 , 'Expected unlinked copy to be a new object'
+        assert pickle.loads(pickle.dumps(obj))._version == 2 , 'Expected version pickled'
+
+
+if __name__ == '__main__':
+    sys.exit(subprocess.Popen('GoodTests.py -n1 "%s" %s' %(sys.argv[0], ' '.join(['"%s"' %(arg.replace('"', '\\"'), ) for arg in sys.argv[1:]]) ), shell=True).wait())
+
+# vim: set ts=4 sw=4 expandtab